@@ -0,0 +1,211 @@
+from collections import OrderedDict
+import json
+import os
+import time
+from math import ceil
+from typing import Dict, Tuple
+
+import numpy as np
+import pkg_resources
+import pygame
+from PIL import Image
+
+from .asset_bundle import AssetBundle
+from .spritesheet import Spritesheet
+
+
+def surface_bytes(surface: pygame.Surface):
+    w, h = surface.get_size()
+    return w * h * surface.get_bytesize()
+
+
+class AssetStore:
+    """
+    Images of an asset bundle, shared by all renderers using it: loaded files, sprite sheets,
+    parsed sprite frames, scaled variants (LRU bounded by max_scaled_images) and rotated scaled
+    variants (LRU bounded by max_rotated_images).
+    Surfaces handed out are shared, renderers must not draw on them.
+    """
+
+    def __init__(self, asset_bundle: AssetBundle, max_scaled_images=2048, max_rotated_images=1024):
+        self.asset_bundle = asset_bundle
+        self.max_scaled_images = max_scaled_images
+        self.max_rotated_images = max_rotated_images
+        self.sprite_sheets: Dict[str, Spritesheet] = {}
+        self.frames: Dict[Tuple[str, str], pygame.Surface] = {}
+        self.scaled_images: OrderedDict = OrderedDict()
+        self.rotated_images: OrderedDict = OrderedDict()
+        self.image_arrays: Dict[Tuple[str, str], np.ndarray] = {}
+        self.sprite_sheet_data = {}
+        self.users = 0
+        self.load_time = 0.0
+        self.frame_loads = 0
+        self.frame_hits = 0
+        self.scaled_hits = 0
+        self.scaled_misses = 0
+        self.scaled_evictions = 0
+        self.rotated_hits = 0
+        self.rotated_misses = 0
+        self.rotated_evictions = 0
+
+    def get_asset_fullpath(self, path):
+        if path.startswith("/"):
+            return path
+        filepath = os.path.join(self.asset_bundle.path, path)
+        if os.path.exists(filepath):
+            return filepath
+        else:
+            return pkg_resources.resource_filename(__name__, path)
+
+    def get_frame(self, path, frame_id=None) -> pygame.Surface:
+        """
+        Image file (frame_id None) or sprite sheet frame, loaded on first use
+        """
+        key = (path, frame_id)
+        image = self.frames.get(key)
+        if image is not None:
+            self.frame_hits += 1
+            return image
+
+        start_time = time.time()
+        full_path = self.get_asset_fullpath(path)
+        try:
+            if frame_id is None:
+                image = pygame.image.load(full_path).convert_alpha()
+            else:
+                if path not in self.sprite_sheets:
+                    self.sprite_sheets[path] = Spritesheet(full_path)
+                image = self.sprite_sheets[path].parse_sprite(frame_id)
+        except Exception as e:
+            print(f"Error loading {path} {full_path}")
+            raise e
+        self.frames[key] = image
+        self.frame_loads += 1
+        self.load_time += time.time() - start_time
+        return image
+
+    def get_image_array(self, path, frame_id=None) -> np.ndarray:
+        """
+        RGBA uint8 array (rows, cols, 4) of an image or sprite sheet frame, loaded with PIL so no display
+        is needed. Sprite frames are transparent where black, matching their pygame colorkey.
+        """
+        key = (path, frame_id)
+        image_array = self.image_arrays.get(key)
+        if image_array is not None:
+            return image_array
+        full_path = self.get_asset_fullpath(path)
+        if frame_id is None:
+            image_array = np.asarray(Image.open(full_path).convert("RGBA"))
+        else:
+            data = self.sprite_sheet_data.get(path)
+            if data is None:
+                with open(full_path.replace('png', 'json')) as f:
+                    data = json.load(f)
+                data = (np.asarray(Image.open(full_path).convert("RGB")), data)
+                self.sprite_sheet_data[path] = data
+            sheet, meta = data
+            frame = meta['frames'][frame_id]['frame']
+            x, y, w, h = frame["x"], frame["y"], frame["w"], frame["h"]
+            rgb = sheet[y:y + h, x:x + w]
+            alpha = np.where(rgb.any(axis=2), 255, 0).astype(np.uint8)
+            image_array = np.concatenate([rgb, alpha[:, :, None]], axis=2)
+        self.image_arrays[key] = image_array
+        return image_array
+
+    def load_images(self) -> Dict[str, pygame.Surface]:
+        """
+        Bundle images by image id
+        """
+        self.users += 1
+        return {k: self.get_frame(path, frame_id) for k, (path, frame_id) in self.asset_bundle.image_assets.items()}
+
+    def get_scaled_image(self, path, frame_id, scale_x, scale_y) -> pygame.Surface:
+        key = (path, frame_id, scale_x, scale_y)
+        img = self.scaled_images.get(key)
+        if img is not None:
+            self.scaled_hits += 1
+            self.scaled_images.move_to_end(key)
+            return img
+
+        self.scaled_misses += 1
+        img_orig = self.get_frame(path, frame_id)
+        body_w, body_h = img_orig.get_size()
+        image_size = ceil(body_w*scale_x), ceil(body_h*scale_y)
+        if image_size[0] > 500:
+            image_size = 500, 500
+        img = pygame.transform.scale(img_orig, image_size)
+        self.scaled_images[key] = img
+        if len(self.scaled_images) > self.max_scaled_images:
+            self.scaled_images.popitem(last=False)
+            self.scaled_evictions += 1
+        return img
+
+    def get_rotated_image(self, path, frame_id, scale_x, scale_y, angle) -> pygame.Surface:
+        """
+        Scaled image rotated by angle degrees, callers quantize angle so rotations are reused
+        """
+        key = (path, frame_id, scale_x, scale_y, angle)
+        img = self.rotated_images.get(key)
+        if img is not None:
+            self.rotated_hits += 1
+            self.rotated_images.move_to_end(key)
+            return img
+
+        self.rotated_misses += 1
+        img = pygame.transform.rotate(self.get_scaled_image(path, frame_id, scale_x, scale_y), angle)
+        self.rotated_images[key] = img
+        if len(self.rotated_images) > self.max_rotated_images:
+            self.rotated_images.popitem(last=False)
+            self.rotated_evictions += 1
+        return img
+
+    def stats(self):
+        """
+        Cache sizes and counters, saved_bytes is what the extra users would have held as private copies
+        """
+        frame_bytes = sum(surface_bytes(s) for s in self.frames.values())
+        sheet_bytes = sum(surface_bytes(s.sprite_sheet) for s in self.sprite_sheets.values())
+        scaled_bytes = sum(surface_bytes(s) for s in self.scaled_images.values())
+        rotated_bytes = sum(surface_bytes(s) for s in self.rotated_images.values())
+        return {
+            'users': self.users,
+            'frames': len(self.frames),
+            'sprite_sheets': len(self.sprite_sheets),
+            'scaled_images': len(self.scaled_images),
+            'frame_bytes': frame_bytes + sheet_bytes,
+            'scaled_bytes': scaled_bytes,
+            'rotated_images': len(self.rotated_images),
+            'rotated_bytes': rotated_bytes,
+            'saved_bytes': max(self.users - 1, 0) * (frame_bytes + sheet_bytes),
+            'load_time': self.load_time,
+            'frame_loads': self.frame_loads,
+            'frame_hits': self.frame_hits,
+            'scaled_hits': self.scaled_hits,
+            'scaled_misses': self.scaled_misses,
+            'scaled_evictions': self.scaled_evictions,
+            'rotated_hits': self.rotated_hits,
+            'rotated_misses': self.rotated_misses,
+            'rotated_evictions': self.rotated_evictions,
+        }
+
+
+asset_stores: Dict[str, AssetStore] = {}
+
+
+def get_asset_store(asset_bundle: AssetBundle, max_scaled_images=2048, max_rotated_images=1024) -> AssetStore:
+    """
+    Process wide store for the asset bundle path, created on first use. The store's cache limits grow to the
+    largest ones requested, so every renderer sharing it gets at least the limits it asked for.
+    """
+    store = asset_stores.get(asset_bundle.path)
+    if store is None:
+        store = AssetStore(asset_bundle, max_scaled_images=max_scaled_images, max_rotated_images=max_rotated_images)
+        asset_stores[asset_bundle.path] = store
+    else:
+        store.max_scaled_images = max(store.max_scaled_images, max_scaled_images)
+        store.max_rotated_images = max(store.max_rotated_images, max_rotated_images)
+    return store
+
+
+def clear_asset_stores():
+    asset_stores.clear()
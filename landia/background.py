@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from math import ceil, floor
+from typing import Callable, Dict, Tuple
+import weakref
+
+import pygame
+
+
+class TileIdGrid:
+    """
+    Image ids of the map layers at each tile coord, looked up from the game map once per coord.
+    Only holds a weak reference to the game map, so the grids cache does not keep it alive.
+    """
+
+    def __init__(self, gamemap):
+        self.gamemap_ref = weakref.ref(gamemap)
+        self.layers = list(gamemap.get_layers())
+        self.tile_ids: Dict[Tuple[int, int], Tuple[str, ...]] = {}
+
+    def get(self, tile_x, tile_y) -> Tuple[str, ...]:
+        key = (tile_x, tile_y)
+        ids = self.tile_ids.get(key)
+        if ids is None:
+            gamemap = self.gamemap_ref()
+            ids = tuple(gamemap.get_image_by_loc(tile_x, tile_y, z) for z in self.layers)
+            self.tile_ids[key] = ids
+        return ids
+
+
+# Game map -> TileIdGrid, dropped with the game map
+tile_id_grids = weakref.WeakKeyDictionary()
+
+
+def get_tile_id_grid(gamemap) -> TileIdGrid:
+    """
+    Process wide tile id grid of gamemap, shared by all renderers
+    """
+    grid = tile_id_grids.get(gamemap)
+    if grid is None:
+        grid = TileIdGrid(gamemap)
+        tile_id_grids[gamemap] = grid
+    return grid
+
+
+class Background:
+    """
+    Map background of a renderer, kept at screen scale in a surface covering the view plus a margin.
+
+    Tile (x, y) covers world [x*tile_size - tile_size/2, (x+1)*tile_size - tile_size/2) and is drawn from pixel
+    floor(x * tile_size * screen_factor), so pixel offsets between tiles never change while the view scrolls.
+    When the view moves the surface is scrolled in place and only the newly exposed tile strips are drawn.
+    Tiles are composited and scaled once per layer ids and pixel size, LRU bounded by max_scaled_tiles.
+    """
+
+    def __init__(self, tile_size, get_image: Callable[[str], pygame.Surface], margin=2, max_scaled_tiles=1024):
+        self.tile_size = tile_size
+        self.get_image = get_image
+        self.margin = margin
+        self.max_scaled_tiles = max_scaled_tiles
+        self.tile_id_grid: TileIdGrid = None
+        self.scaled_tiles: OrderedDict = OrderedDict()
+        self.scaled_tile_evictions = 0
+        self.surface: pygame.Surface = None
+        self.screen_factor = None
+        self.tile_px = None
+        self.origin = None
+        self.tiles = None
+        self.full_updates = 0
+        self.strip_updates = 0
+
+    def set_gamemap(self, gamemap):
+        tile_id_grid = get_tile_id_grid(gamemap)
+        if tile_id_grid is not self.tile_id_grid:
+            self.tile_id_grid = tile_id_grid
+            self.surface = None
+
+    def get_scaled_tile(self, ids, width, height):
+        key = (ids, width, height)
+        tile = self.scaled_tiles.get(key)
+        if tile is not None:
+            self.scaled_tiles.move_to_end(key)
+            return tile
+
+        tile = pygame.Surface((self.tile_size, self.tile_size))
+        for image_id in ids:
+            if image_id is not None:
+                tile.blit(self.get_image(image_id), (0, 0))
+        tile = pygame.transform.scale(tile, (width, height))
+        self.scaled_tiles[key] = tile
+        if len(self.scaled_tiles) > self.max_scaled_tiles:
+            self.scaled_tiles.popitem(last=False)
+            self.scaled_tile_evictions += 1
+        return tile
+
+    def tile_pixel(self, tile_x, tile_y):
+        return floor(tile_x * self.tile_px[0]), floor(tile_y * self.tile_px[1])
+
+    def draw_tiles(self, x_range, y_range):
+        ox, oy = self.tile_pixel(*self.origin)
+        for tile_x in x_range:
+            px, px_next = floor(tile_x * self.tile_px[0]), floor((tile_x + 1) * self.tile_px[0])
+            for tile_y in y_range:
+                py, py_next = floor(tile_y * self.tile_px[1]), floor((tile_y + 1) * self.tile_px[1])
+                tile = self.get_scaled_tile(self.tile_id_grid.get(tile_x, tile_y), px_next - px, py_next - py)
+                self.surface.blit(tile, (px - ox, py - oy))
+
+    def rebuild(self, origin, screen_factor, tiles):
+        self.screen_factor = screen_factor
+        self.tile_px = self.tile_size * screen_factor[0], self.tile_size * screen_factor[1]
+        self.origin = origin
+        self.tiles = tiles
+        size = ceil(tiles[0] * self.tile_px[0]) + 1, ceil(tiles[1] * self.tile_px[1]) + 1
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size)
+            self.surface.fill((0, 0, 0))
+        self.draw_tiles(range(origin[0], origin[0] + tiles[0]), range(origin[1], origin[1] + tiles[1]))
+        self.full_updates += 1
+
+    def scroll(self, origin):
+        """
+        Moves the surface to start at tile origin, drawing only the tiles not covered before
+        """
+        old_x, old_y = self.origin
+        new_x, new_y = origin
+        old_px = self.tile_pixel(old_x, old_y)
+        new_px = self.tile_pixel(new_x, new_y)
+        self.surface.scroll(old_px[0] - new_px[0], old_px[1] - new_px[1])
+        self.origin = origin
+        cols, rows = self.tiles
+        x_range = range(new_x, new_x + cols)
+        y_range = range(new_y, new_y + rows)
+        # Columns then rows newly exposed
+        if new_x > old_x:
+            self.draw_tiles(range(old_x + cols, new_x + cols), y_range)
+        elif new_x < old_x:
+            self.draw_tiles(range(new_x, old_x), y_range)
+        if new_y > old_y:
+            self.draw_tiles(x_range, range(old_y + rows, new_y + rows))
+        elif new_y < old_y:
+            self.draw_tiles(x_range, range(new_y, old_y))
+        self.strip_updates += 1
+
+    def draw(self, target: pygame.Surface, center, view_size, screen_factor, screen_view_center):
+        """
+        Draws the background of the view of view_size (world units) around center onto target
+        """
+        if self.tile_id_grid is None:
+            return
+        half = self.tile_size / 2
+        origin = (floor((center[0] - view_size[0] / 2 + half) / self.tile_size) - self.margin,
+                  floor((center[1] - view_size[1] / 2 + half) / self.tile_size) - self.margin)
+        tiles = (ceil(view_size[0] / self.tile_size) + 1 + self.margin * 2,
+                 ceil(view_size[1] / self.tile_size) + 1 + self.margin * 2)
+        screen_factor = (screen_factor[0], screen_factor[1])
+
+        if self.surface is None or screen_factor != self.screen_factor or tiles != self.tiles:
+            self.rebuild(origin, screen_factor, tiles)
+        elif origin != self.origin:
+            if abs(origin[0] - self.origin[0]) >= tiles[0] or abs(origin[1] - self.origin[1]) >= tiles[1]:
+                self.rebuild(origin, screen_factor, tiles)
+            else:
+                self.scroll(origin)
+
+        # Screen position of the surface's top left pixel
+        ox, oy = self.tile_pixel(*self.origin)
+        x = ox - self.tile_px[0] / 2 - center[0] * screen_factor[0] + screen_view_center[0]
+        y = oy - self.tile_px[1] / 2 - center[1] * screen_factor[1] + screen_view_center[1]
+        target.blit(self.surface, (round(x), round(y)))
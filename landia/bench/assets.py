@@ -0,0 +1,89 @@
+import argparse
+import logging
+import sys
+import time
+
+from landia.asset_store import clear_asset_stores
+from landia.config import RendererConfig
+from landia.env import LandiaEnv
+from landia.renderer import Renderer
+from landia.runner import LOG_LEVELS
+
+
+def run_renderers(env: LandiaEnv, renderer_count, frames, resolution, share_assets):
+    """
+    Initializes renderer_count renderers (as LandiaEnv does for agents and the admin client) and renders
+    frames from the agents' cameras, returns startup time, render time and image memory held
+    """
+    clear_asset_stores()
+    players = [client.player for client in env.agent_clients.values()]
+
+    start_time = time.time()
+    renderers = []
+    for _ in range(renderer_count):
+        config = RendererConfig()
+        config.resolution = resolution
+        config.render_to_screen = False
+        config.sound_enabled = False
+        config.share_assets = share_assets
+        renderer = Renderer(config, asset_bundle=env.content.get_asset_bundle())
+        renderer.initialize()
+        renderers.append(renderer)
+    startup_time = time.time() - start_time
+
+    start_time = time.time()
+    for _ in range(frames):
+        env.step({})
+        for i, renderer in enumerate(renderers):
+            renderer.process_frame(player=players[i % len(players)])
+            renderer.render_frame()
+    render_time = time.time() - start_time
+
+    stores = {id(r.asset_store): r.asset_store for r in renderers}
+    image_bytes = sum(s.stats()['frame_bytes'] + s.stats()['scaled_bytes'] for s in stores.values())
+    return startup_time, render_time, image_bytes
+
+
+def run(agent_count=16, frames=20, resolution=(42, 42), config_filename="base_config.json"):
+    """
+    Startup time, render time and image memory of agent_count + 1 renderers with private vs shared asset stores
+    """
+    agent_map = {str(i): {} for i in range(agent_count)}
+    env = LandiaEnv(agent_map=agent_map, config_filename=config_filename, include_state_observation=True)
+    try:
+        env.reset()
+        results = {'renderers': agent_count + 1}
+        for name, share_assets in [("private", False), ("shared", True)]:
+            startup_time, render_time, image_bytes = run_renderers(
+                env, agent_count + 1, frames, resolution, share_assets)
+            results[f"{name}_startup_ms"] = startup_time * 1000
+            results[f"{name}_render_ms_per_frame"] = render_time * 1000 / (frames * (agent_count + 1))
+            results[f"{name}_image_kbytes"] = image_bytes / 1024
+        results['saved_kbytes'] = results['private_image_kbytes'] - results['shared_image_kbytes']
+    finally:
+        env.close()
+        clear_asset_stores()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent_count", default=16, type=int)
+    parser.add_argument("--frames", default=20, type=int)
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        agent_count=args.agent_count,
+        frames=args.frames,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
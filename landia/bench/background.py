@@ -0,0 +1,84 @@
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+
+from landia.camera import Camera
+from landia.common import Vector2
+from landia.config import RendererConfig
+from landia.env import LandiaEnv
+from landia.renderer import Renderer
+from landia.runner import LOG_LEVELS
+
+
+class CameraPlayer:
+
+    def __init__(self, camera):
+        self.camera = camera
+
+    def get_camera(self):
+        return self.camera
+
+
+def time_frames(renderer: Renderer, distance, frames, speed):
+    times = []
+    for i in range(frames):
+        camera = Camera(center=Vector2(100 + i * speed, 50 + i * speed * 0.6), distance=distance)
+        start_time = time.time()
+        renderer.process_frame(CameraPlayer(camera))
+        renderer.render_frame()
+        times.append(time.time() - start_time)
+    # First frame builds the background
+    return np.array(times[1:]) * 1000
+
+
+def run(frames=300, speed=3.7, config_filename="base_config.json"):
+    """
+    Frame times (mean, p99, max in ms) while panning the camera across the map, per resolution
+    """
+    env = LandiaEnv(agent_map={"0": {}}, config_filename=config_filename, include_state_observation=True)
+    results = {'frames': frames, 'speed': speed}
+    try:
+        env.reset()
+        for resolution, distance in [((42, 42), 80), ((200, 150), 300), ((1280, 720), 720)]:
+            config = RendererConfig()
+            config.resolution = resolution
+            config.render_to_screen = False
+            config.sound_enabled = False
+            renderer = Renderer(config, asset_bundle=env.content.get_asset_bundle())
+            renderer.initialize()
+            times = time_frames(renderer, distance, frames, speed)
+            name = f"{resolution[0]}x{resolution[1]}"
+            results[f"{name}_mean_ms"] = times.mean()
+            results[f"{name}_p99_ms"] = np.percentile(times, 99)
+            results[f"{name}_max_ms"] = times.max()
+            results[f"{name}_background_full_updates"] = renderer.background.full_updates
+            results[f"{name}_background_strip_updates"] = renderer.background.strip_updates
+    finally:
+        env.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", default=300, type=int)
+    parser.add_argument("--speed", default=3.7, type=float)
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        frames=args.frames,
+        speed=args.speed,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
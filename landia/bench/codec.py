@@ -0,0 +1,96 @@
+import argparse
+import logging
+import random
+import sys
+import time
+
+import lz4.frame
+
+from landia import gamectx
+from landia.codec import codec_registry
+from landia.env import LandiaEnv
+from landia.runner import LOG_LEVELS
+from landia.survival.survival_utils import coord_to_vec
+
+
+def build_world(num_objects=1000, agent_count=4, config_filename="base_config.json", seed=1):
+    """
+    Loads a world and spawns copies of its non player objects on random map coords until it holds num_objects
+    """
+    agent_map = {str(i): {} for i in range(agent_count)}
+    env = LandiaEnv(agent_map=agent_map, config_filename=config_filename, include_state_observation=True)
+    env.reset()
+    rng = random.Random(seed)
+    config_ids = sorted(set(obj.config_id for obj in gamectx.object_manager.get_objects().values()
+                            if obj.player_id is None and obj.config_id))
+    boundary = gamectx.content.gamemap.boundary
+    while len(gamectx.object_manager.get_objects()) < num_objects:
+        obj = gamectx.content.create_object_from_config_id(rng.choice(config_ids))
+        coord = (rng.randint(boundary['x'][0] + 1, boundary['x'][1] - 1),
+                 rng.randint(boundary['y'][0] + 1, boundary['y'][1] - 1))
+        obj.spawn(position=coord_to_vec(coord))
+    env.step({})
+    return env
+
+
+def time_codec(codec, snapshot, repeats):
+    start_time = time.time()
+    for _ in range(repeats):
+        encoded = codec.encode(snapshot)
+    encode_ms = (time.time() - start_time) * 1000 / repeats
+
+    start_time = time.time()
+    for _ in range(repeats):
+        codec.decode(encoded)
+    decode_ms = (time.time() - start_time) * 1000 / repeats
+
+    start_time = time.time()
+    for _ in range(repeats):
+        compressed = lz4.frame.compress(encoded)
+    compress_ms = (time.time() - start_time) * 1000 / repeats
+    return {
+        'encode_ms': encode_ms,
+        'decode_ms': decode_ms,
+        'compress_ms': compress_ms,
+        'bytes': len(encoded),
+        'wire_bytes': len(compressed),
+    }
+
+
+def run(num_objects=1000, repeats=10, config_filename="base_config.json"):
+    """
+    Encode/decode time and size (raw and lz4 compressed, as sent by the server) of a full snapshot per codec
+    """
+    env = build_world(num_objects=num_objects, config_filename=config_filename)
+    try:
+        snapshot = gamectx.create_full_snapshot()
+    finally:
+        env.close()
+    results = {'num_objects': len(snapshot['om'])}
+    for name, codec in codec_registry.items():
+        for k, v in time_codec(codec, snapshot, repeats).items():
+            results[f"{name}_{k}"] = v
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_objects", default=1000, type=int)
+    parser.add_argument("--repeats", default=10, type=int)
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        num_objects=args.num_objects,
+        repeats=args.repeats,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import logging
+import random
+import sys
+import time
+
+from landia import gamectx
+from landia.common import Vector2
+from landia.config import RendererConfig
+from landia.env import LandiaEnv
+from landia.renderer import Renderer
+from landia.runner import LOG_LEVELS
+from landia.survival.survival_utils import coord_to_vec
+
+
+def scan_filter(renderer: Renderer, objs, camera):
+    """
+    Previous filter_objects_for_rendering: distance check on every object, sorted with a distance_to lambda
+    """
+    center = camera.get_center()
+    object_list_visheight_sorted = [[], [], [], []]
+    for k, o in objs.items():
+        if o is not None and o.is_enabled() and o.is_visible():
+            view_position = o.get_view_position()
+            if view_position is not None:
+                if o.get_view_position().distance_to(center) < renderer.view_width:
+                    object_list_visheight_sorted[o.visheight].append(o)
+    center_bottom = center - Vector2(0, 100)
+    for lst in object_list_visheight_sorted:
+        lst.sort(key=lambda o: o.get_position().distance_to(center_bottom))
+    return object_list_visheight_sorted
+
+
+def time_filter(filter_fn, frames):
+    start_time = time.time()
+    for _ in range(frames):
+        filter_fn()
+    return (time.time() - start_time) * 1000 / frames
+
+
+def run(world_objects=(0, 10000, 50000), world_size=1000, frames=50, resolution=(1280, 720),
+        config_filename="base_config.json", seed=1):
+    """
+    Per frame cost of finding the objects to draw by scanning all objects vs querying the physics space,
+    as objects are added outside the view
+    """
+    env = LandiaEnv(agent_map={"0": {}}, config_filename=config_filename, include_state_observation=True)
+    rng = random.Random(seed)
+    results = {'frames': frames}
+    try:
+        env.reset()
+        config = RendererConfig()
+        config.resolution = resolution
+        config.render_to_screen = False
+        config.sound_enabled = False
+        renderer = Renderer(config, asset_bundle=env.content.get_asset_bundle())
+        renderer.initialize()
+        player = next(iter(env.agent_clients.values())).player
+        renderer.process_frame(player)
+        camera = player.get_camera()
+
+        added = 0
+        for total in world_objects:
+            while added < total:
+                obj = env.content.create_object_from_config_id("rock1")
+                obj.spawn(position=coord_to_vec((rng.randint(-world_size, world_size), rng.randint(-world_size, world_size))))
+                added += 1
+            objs = gamectx.object_manager.get_objects()
+            results[f"objects_{len(objs)}_scan_ms"] = time_filter(
+                lambda: scan_filter(renderer, objs, camera), frames)
+            results[f"objects_{len(objs)}_space_ms"] = time_filter(
+                lambda: renderer.filter_objects_for_rendering(objs, camera), frames)
+    finally:
+        env.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--world_size", default=1000, type=int)
+    parser.add_argument("--frames", default=50, type=int)
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        world_size=args.world_size,
+        frames=args.frames,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
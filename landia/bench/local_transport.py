@@ -0,0 +1,202 @@
+import argparse
+import logging
+import multiprocessing as mp
+import secrets
+import sys
+import time
+
+import numpy as np
+
+from landia import gamectx
+from landia.client import send_request
+from landia.codec import get_codec
+from landia.config import ServerConfig
+from landia.env import LandiaEnv
+from landia.local_transport import SharedQueue, SnapshotReader
+from landia.runner import LOG_LEVELS
+from landia.server import GameServer
+from landia.transport import Connection
+
+
+def run_readers(server_address, first_client, clients, duration, send_rate, result_queue):
+    """
+    Simulated shared memory clients in a process of their own: each joins over UDP, then reads every frame
+    (expanding deltas, as ClientConnector does) and sends a keep alive through its input queue at send_rate
+    """
+    codec = get_codec("binary")
+    queues = []
+    readers = []
+    stats = {'frames': 0, 'bytes': 0, 'read_sec': 0.0, 'reads': [], 'resyncs': 0}
+    try:
+        connection = Connection(server_address)
+        for i in range(clients):
+            client_id = f"local_{first_client + i}"
+            queue = SharedQueue()
+            queues.append((client_id, queue))
+            info = {
+                'client_id': client_id,
+                'meta': {},
+                'snapshots_received': [],
+                'player_type': "default",
+                'is_human': False,
+                'name': client_id,
+                'message': "LOCAL",
+                'input_queue': queue.name}
+            response, _, _ = send_request({'info': info, 'items': []}, server_address, connection=connection)
+            readers.append(SnapshotReader(response['info']['snapshot_ring'], expand_deltas=True))
+        connection.close()
+
+        end_time = time.perf_counter() + duration
+        next_send = 0
+        while time.perf_counter() < end_time:
+            now = time.perf_counter()
+            if now >= next_send:
+                next_send = now + 1.0 / send_rate
+                for client_id, queue in queues:
+                    queue.put(codec.encode({'info': {
+                        'client_id': client_id,
+                        'meta': {},
+                        'snapshots_received': [],
+                        'player_type': "default",
+                        'is_human': False,
+                        'name': client_id,
+                        'message': "LOCAL"}, 'items': []}))
+            for reader in readers:
+                start_time = time.perf_counter()
+                frames = reader.read_new()
+                read_time = time.perf_counter()
+                stats['read_sec'] += read_time - start_time
+                for frame in frames:
+                    stats['frames'] += 1
+                    stats['bytes'] += frame.objects.nbytes + len(frame.snapshot_data)
+                    stats['reads'].append((frame.seq, read_time))
+            time.sleep(0.002)
+        stats['resyncs'] = sum(r.resyncs for r in readers)
+    finally:
+        for reader in readers:
+            reader.close()
+        for _, queue in queues:
+            queue.close()
+    result_queue.put(stats)
+
+
+def run(clients=32, processes=4, duration=10.0, tick_rate=60, send_rate=20, keyframe_interval=60,
+        config_filename="base_config.json", seed=1):
+    """
+    Shared memory clients, spread over several processes, attached to a GameServer ticked at tick_rate in this
+    one. Reports the server's tick phase times, frame sizes, how long after publishing frames were read
+    and the readers' time per frame.
+    """
+    env = LandiaEnv(agent_map={}, config_filename=config_filename, seed=seed)
+    env.reset()
+    config = ServerConfig()
+    config.shared_memory_name = f"landia_bench_{secrets.token_hex(4)}"
+    config.keyframe_interval = keyframe_interval
+    server = GameServer(conn=("127.0.0.1", 0), config=config).start()
+    gamectx.set_server(server)
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    per_process = [clients // processes + (1 if i < clients % processes else 0) for i in range(processes)]
+    reader_processes = []
+    first_client = 0
+    for count in per_process:
+        if count == 0:
+            continue
+        reader_processes.append(ctx.Process(
+            target=run_readers,
+            args=(server.server_address, first_client, count, duration, send_rate, result_queue),
+            daemon=True))
+        first_client += count
+    for process in reader_processes:
+        process.start()
+
+    profiler = gamectx.profiler
+    profiler.reset()
+    profiler.enable()
+    tick_time = 1.0 / tick_rate
+    ticks = 0
+    late_ticks = 0
+    publish_times = {}
+    all_stats = []
+    try:
+        next_tick = time.perf_counter()
+        while len(all_stats) < len(reader_processes):
+            gamectx.run_step()
+            if server.publisher is not None:
+                publish_times[server.publisher.ring.seq] = time.perf_counter()
+            ticks += 1
+            next_tick += tick_time
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                late_ticks += 1
+                next_tick = time.perf_counter()
+            while not result_queue.empty():
+                all_stats.append(result_queue.get())
+            if len(all_stats) < len(reader_processes) and not any(p.is_alive() for p in reader_processes):
+                raise Exception("Reader processes exited without results")
+        for process in reader_processes:
+            process.join()
+        local_clients = len(server.local_clients)
+    finally:
+        profiler.disable()
+        gamectx.set_server(None)
+        server.close()
+        env.close()
+
+    frames = sum(s['frames'] for s in all_stats)
+    ages = np.array([(t - publish_times[seq]) * 1000 for s in all_stats for seq, t in s['reads']
+                     if seq in publish_times] or [0.0])
+    results = {
+        'clients': clients,
+        'processes': len(reader_processes),
+        'ticks': ticks,
+        'late_ticks': late_ticks,
+        'local_clients': local_clients,
+        'frames_read_per_client_per_sec': frames / clients / duration,
+        'frame_bytes': sum(s['bytes'] for s in all_stats) / max(frames, 1),
+        'frame_age_ms': float(ages.mean()),
+        'frame_age_p90_ms': float(np.percentile(ages, 90)),
+        'read_ms_per_frame': sum(s['read_sec'] for s in all_stats) * 1000 / max(frames, 1),
+        'resyncs': sum(s['resyncs'] for s in all_stats),
+    }
+    phases = profiler.get_stats()['phases_ms']
+    for name in ["step", "requests", "publish"]:
+        summary = phases.get(name)
+        if summary is not None:
+            results[f"{name}_ms"] = summary['mean']
+            results[f"{name}_p90_ms"] = summary['p90']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default=32, type=int)
+    parser.add_argument("--processes", default=4, type=int, help="reader processes the clients are spread over")
+    parser.add_argument("--duration", default=10.0, type=float, help="seconds")
+    parser.add_argument("--tick_rate", default=60, type=int)
+    parser.add_argument("--send_rate", default=20, type=int, help="keep alives per second per client")
+    parser.add_argument("--keyframe_interval", default=60, type=int)
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        clients=args.clients,
+        processes=args.processes,
+        duration=args.duration,
+        tick_rate=args.tick_rate,
+        send_rate=args.send_rate,
+        keyframe_interval=args.keyframe_interval,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import json
+import logging
+import sys
+import time
+
+from landia import gamectx
+from landia.env import LandiaEnv
+from landia.metrics import TickProfiler
+from landia.runner import LOG_LEVELS
+
+
+def time_profiler_tick(phases, events, ticks=20000):
+    """
+    Cost (us) of profiling one tick with the given phase names and event count, without the game
+    """
+    profiler = TickProfiler(enabled=True)
+    event = object()
+    start_time = time.perf_counter()
+    for _ in range(ticks):
+        start = profiler.start()
+        for name in phases:
+            start = profiler.record(name, start)
+        for _ in range(events):
+            profiler.count_event(event)
+        profiler.end_tick()
+    return (time.perf_counter() - start_time) * 1e6 / ticks
+
+
+def run(agent_count=4, blocks=10, block_steps=200, headless=True, config_filename="base_config.json"):
+    """
+    Step time of LandiaEnv with the tick profiler disabled vs enabled (alternating blocks of steps)
+    and the profiler stats collected while enabled
+    """
+    agent_map = {str(i): {} for i in range(agent_count)}
+    env = LandiaEnv(
+        agent_map=agent_map,
+        config_filename=config_filename,
+        include_state_observation=headless,
+        headless=headless)
+    profiler = gamectx.profiler
+    times = {False: 0.0, True: 0.0}
+    try:
+        obs = env.reset()
+        profiler.reset()
+        for block in range(blocks * 2):
+            enabled = block % 2 == 1
+            if enabled:
+                profiler.enable()
+            else:
+                profiler.disable()
+            start_time = time.time()
+            for _ in range(block_steps):
+                obs, rewards, dones, infos = env.step(
+                    {agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+                if dones.get('__all__'):
+                    obs = env.reset()
+            times[enabled] += time.time() - start_time
+        profiler.disable()
+        stats = profiler.get_stats()
+    finally:
+        env.close()
+    steps = blocks * block_steps
+    # client_step is recorded once per agent
+    phases = [k for k in stats['phases_ms'].keys() if k != 'client_step'] + ['client_step'] * agent_count
+    tick_us = time_profiler_tick(phases, round(stats['events_per_tick']['mean']))
+    return {
+        'agent_count': agent_count,
+        'steps': steps,
+        'disabled_ms_per_step': times[False] * 1000 / steps,
+        'enabled_ms_per_step': times[True] * 1000 / steps,
+        'overhead_pct': (times[True] / times[False] - 1) * 100,
+        'profiler_us_per_tick': tick_us,
+        'profiler_pct_of_step': tick_us / 10 / (times[False] * 1000 / steps),
+        'phases_ms': json.dumps({k: round(v['mean'], 4) for k, v in stats['phases_ms'].items()}),
+        'events_per_tick': stats['events_per_tick']['mean'],
+        'event_counts': json.dumps(stats['event_counts']),
+        'object_counts': json.dumps(stats['object_counts']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent_count", default=4, type=int)
+    parser.add_argument("--blocks", default=10, type=int)
+    parser.add_argument("--block_steps", default=200, type=int)
+    parser.add_argument("--render", action="store_true", help="Render agent observations")
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        agent_count=args.agent_count,
+        blocks=args.blocks,
+        block_steps=args.block_steps,
+        headless=not args.render,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import logging
+import random
+import sys
+import time
+
+from landia.clock import clock
+from landia.event import DelayedEvent, PeriodicEvent
+from landia.event_manager import EventManager
+from landia.runner import LOG_LEVELS
+
+
+def build_events(num_timers, max_delay, periodic_fraction, seed=1):
+    rng = random.Random(seed)
+    events = []
+    for _ in range(num_timers):
+        if rng.random() < periodic_fraction:
+            events.append(PeriodicEvent(
+                lambda e, data: ([], False),
+                execution_step_interval=rng.randint(1, max_delay)))
+        else:
+            events.append(DelayedEvent(lambda e, data: [], rng.randint(1, max_delay)))
+    return events
+
+
+def run_polling(events, ticks):
+    """
+    Previous event processing: every pending timer event is run each tick and checks if it is due
+    """
+    event_manager = EventManager()
+    event_manager.add_events(events)
+    fired = 0
+    start_time = time.time()
+    for _ in range(ticks):
+        clock.tick()
+        for e in list(event_manager.get_events()):
+            if not isinstance(e, (DelayedEvent, PeriodicEvent)):
+                continue
+            last_run = getattr(e, 'last_run', None)
+            _, remove_event = e.run()
+            if getattr(e, 'last_run', None) != last_run or remove_event:
+                fired += 1
+            if remove_event:
+                event_manager.remove_event_by_id(e.get_id())
+    return time.time() - start_time, fired
+
+
+def run_scheduled(events, ticks):
+    """
+    Scheduler event processing: only due timers are popped, run and re-armed
+    """
+    event_manager = EventManager()
+    event_manager.add_events(events)
+    fired = 0
+    start_time = time.time()
+    for _ in range(ticks):
+        tick = clock.tick()
+        for e in event_manager.pop_due_events(tick):
+            _, remove_event = e.run()
+            fired += 1
+            if remove_event:
+                event_manager.remove_event_by_id(e.get_id())
+            else:
+                event_manager.reschedule_event(e)
+    return time.time() - start_time, fired
+
+
+def run(num_timers=100000, ticks=100, max_delay=1000, periodic_fraction=0.5):
+    """
+    Per tick cost of processing num_timers pending DelayedEvents/PeriodicEvents by polling vs the scheduler
+    """
+    clock.set_tick_rate(0)
+    start_tick = clock.get_ticks()
+    polling_time, polling_fired = run_polling(build_events(num_timers, max_delay, periodic_fraction), ticks)
+    clock.tick_time = start_tick
+    scheduled_time, scheduled_fired = run_scheduled(build_events(num_timers, max_delay, periodic_fraction), ticks)
+    return {
+        'num_timers': num_timers,
+        'ticks': ticks,
+        'polling_fired': polling_fired,
+        'scheduled_fired': scheduled_fired,
+        'polling_ms_per_tick': polling_time * 1000 / ticks,
+        'scheduled_ms_per_tick': scheduled_time * 1000 / ticks,
+        'speedup': polling_time / scheduled_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_timers", default=100000, type=int)
+    parser.add_argument("--ticks", default=100, type=int)
+    parser.add_argument("--max_delay", default=1000, type=int)
+    parser.add_argument("--periodic_fraction", default=0.5, type=float)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        num_timers=args.num_timers,
+        ticks=args.ticks,
+        max_delay=args.max_delay,
+        periodic_fraction=args.periodic_fraction)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
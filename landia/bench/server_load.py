@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing as mp
+import random
+import sys
+import time
+
+import lz4.frame
+import numpy as np
+
+from landia import gamectx
+from landia.codec import get_codec
+from landia.config import ServerConfig
+from landia.env import LandiaEnv
+from landia.runner import LOG_LEVELS
+from landia.server import SHARED_HEADER, GameServer
+from landia.transport import Reassembler, split_message
+
+
+class LoadClientProtocol(asyncio.DatagramProtocol):
+    """
+    Sends requests and reassembles the chunks of server replies for one simulated client
+    """
+
+    def __init__(self):
+        self.transport = None
+        self.reassembler = Reassembler()
+        self.next_seq = 0
+        self.reply: asyncio.Future = None
+        self.on_reply = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, data):
+        for chunk in split_message(self.next_seq, data):
+            self.transport.sendto(chunk)
+        self.next_seq += 1
+
+    def datagram_received(self, data, addr):
+        data = self.reassembler.add(data)
+        if data is None:
+            return
+        if self.on_reply is not None:
+            self.on_reply(data)
+        elif self.reply is not None and not self.reply.done():
+            self.reply.set_result(data)
+
+
+def decode_own_part(codec, data):
+    # Only the client's own part is needed to confirm the snapshot
+    shared_size, = SHARED_HEADER.unpack_from(data)
+    return codec.decode(lz4.frame.decompress(data[SHARED_HEADER.size + shared_size:]))
+
+
+def make_input_items(client_id, player_id, event_count, keys, rng):
+    if player_id is None:
+        return []
+    return [[{'_type': 'InputEvent', 'data': {
+        'id': f"{client_id}_{event_count}",
+        'creation_time': 0,
+        'is_client_event': False,
+        'is_server_event': True,
+        'player_id': player_id,
+        'input_data': {'keydown': [rng.choice(keys)], 'keyup': [], 'mouse_pos': "", 'mouse_rel': "",
+                       'focused': ""}}}]]
+
+
+async def run_client(client_id, server_address, end_time, request_interval, codec, keys, rng, stats):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(LoadClientProtocol, remote_addr=server_address)
+    info = {
+        'client_id': client_id,
+        'meta': {},
+        'snapshots_received': [],
+        'player_type': "default",
+        'is_human': False,
+        'name': client_id,
+        'message': "UPDATE"}
+    player_id = None
+    event_count = 0
+    # Spread the first requests over one interval
+    await asyncio.sleep(rng.random() * request_interval)
+    try:
+        while time.perf_counter() < end_time:
+            event_count += 1
+            items = make_input_items(client_id, player_id, event_count, keys, rng)
+            start_time = time.perf_counter()
+            protocol.reply = loop.create_future()
+            protocol.send(lz4.frame.compress(codec.encode({'info': info, 'items': items})))
+            try:
+                data = await asyncio.wait_for(protocol.reply, timeout=1.0)
+            except asyncio.TimeoutError:
+                stats['timeouts'] += 1
+                continue
+            stats['latencies'].append((time.perf_counter() - start_time) * 1000)
+            stats['bytes_in'] += len(data)
+            response = decode_own_part(codec, data)
+            info['snapshots_received'] = [response['info']['snapshot_timestamp']]
+            player_id = response['info']['player_id']
+            await asyncio.sleep(max(request_interval - (time.perf_counter() - start_time), 0))
+    finally:
+        transport.close()
+
+
+async def run_stream_client(client_id, server_address, end_time, send_interval, codec, keys, rng, stats):
+    """
+    Sends inputs and acks every send_interval while snapshots arrive from the server's broadcast
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(LoadClientProtocol, remote_addr=server_address)
+    acks = []
+    last_ack = []
+    player_id = None
+    last_received = None
+
+    def on_reply(data):
+        nonlocal player_id, last_received
+        now = time.perf_counter()
+        if last_received is not None:
+            stats['intervals'].append((now - last_received) * 1000)
+        last_received = now
+        stats['bytes_in'] += len(data)
+        response = decode_own_part(codec, data)
+        acks.append(response['info']['snapshot_timestamp'])
+        player_id = response['info']['player_id']
+        stats['snapshots'] += 1
+
+    protocol.on_reply = on_reply
+    event_count = 0
+    await asyncio.sleep(rng.random() * send_interval)
+    try:
+        while time.perf_counter() < end_time:
+            event_count += 1
+            if len(acks) > 0:
+                last_ack = acks[-1:]
+            snapshots_received = list(acks) or last_ack
+            acks.clear()
+            info = {
+                'client_id': client_id,
+                'meta': {},
+                'snapshots_received': snapshots_received,
+                'player_type': "default",
+                'is_human': False,
+                'name': client_id,
+                'message': "STREAM"}
+            items = make_input_items(client_id, player_id, event_count, keys, rng)
+            protocol.send(lz4.frame.compress(codec.encode({'info': info, 'items': items})))
+            await asyncio.sleep(send_interval)
+    finally:
+        transport.close()
+
+
+def run_clients(server_address, clients, duration, request_rate, codec_name, keys, seed, stream, result_queue):
+    """
+    Simulated clients in a process of their own. Polling clients send request_rate update requests per second
+    with one random input event and wait for each reply, streaming clients send inputs and acks at request_rate
+    and receive the server's broadcast.
+    """
+    codec = get_codec(codec_name)
+    stats = {'latencies': [], 'timeouts': 0, 'bytes_in': 0, 'snapshots': 0, 'intervals': []}
+    rng = random.Random(seed)
+    end_time = time.perf_counter() + duration
+    client_fn = run_stream_client if stream else run_client
+
+    async def run_all():
+        await asyncio.gather(*[
+            client_fn(f"load_{i}", server_address, end_time, 1.0 / request_rate, codec, keys, rng, stats)
+            for i in range(clients)])
+
+    asyncio.run(run_all())
+    result_queue.put(stats)
+
+
+def run(clients=200, duration=10.0, request_rate=20, tick_rate=60, codec_name="binary", delta_snapshots=True,
+        stream=False, snapshot_rate=20, config_filename="base_config.json", seed=1):
+    """
+    Loopback load test: clients simulated in another process against a GameServer ticked at tick_rate
+    in this one. Reports replies (latencies when polling, intervals between snapshots when streaming)
+    and the server's tick phase times.
+    """
+    env = LandiaEnv(agent_map={}, config_filename=config_filename, seed=seed)
+    env.reset()
+    config = ServerConfig()
+    config.delta_snapshots = delta_snapshots
+    config.snapshot_rate = snapshot_rate
+    server = GameServer(conn=("127.0.0.1", 0), config=config).start()
+    gamectx.set_server(server)
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    client_process = ctx.Process(
+        target=run_clients,
+        args=(server.server_address, clients, duration, request_rate, codec_name,
+              list(env.content.agent_key_list), seed, stream, result_queue),
+        daemon=True)
+    client_process.start()
+
+    profiler = gamectx.profiler
+    profiler.reset()
+    profiler.enable()
+    tick_time = 1.0 / tick_rate
+    ticks = 0
+    late_ticks = 0
+    stats = None
+    try:
+        next_tick = time.perf_counter()
+        while stats is None:
+            gamectx.run_step()
+            ticks += 1
+            next_tick += tick_time
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                late_ticks += 1
+                next_tick = time.perf_counter()
+            if not result_queue.empty():
+                stats = result_queue.get()
+            elif not client_process.is_alive():
+                raise Exception("Client process exited without results")
+        client_process.join()
+    finally:
+        profiler.disable()
+        gamectx.set_server(None)
+        server.close()
+        env.close()
+
+    phases = profiler.get_stats()['phases_ms']
+    replies = stats['snapshots'] if stream else len(stats['latencies'])
+    results = {
+        'clients': clients,
+        'codec': codec_name,
+        'delta_snapshots': delta_snapshots,
+        'stream': stream,
+        'ticks': ticks,
+        'late_ticks': late_ticks,
+        'replies': replies,
+        'replies_per_sec': replies / duration,
+    }
+    if stream:
+        intervals = np.array(stats['intervals'] or [0.0])
+        results['snapshot_interval_ms'] = float(intervals.mean())
+        results['snapshot_interval_p90_ms'] = float(np.percentile(intervals, 90))
+        results['snapshot_interval_p99_ms'] = float(np.percentile(intervals, 99))
+    else:
+        latencies = np.array(stats['latencies'] or [0.0])
+        results['timeouts'] = stats['timeouts']
+        results['latency_ms'] = float(latencies.mean())
+        results['latency_p90_ms'] = float(np.percentile(latencies, 90))
+        results['latency_p99_ms'] = float(np.percentile(latencies, 99))
+    results.update({
+        'reply_bytes': stats['bytes_in'] / max(replies, 1),
+        'server_replies': server.replies_sent,
+        'encodes_per_reply': server.encodes / max(server.replies_sent, 1),
+        'shared_encodes': server.shared_encodes,
+    })
+    for name in ["step", "requests", "snapshot", "snapshot_encode"]:
+        summary = phases.get(name)
+        if summary is not None:
+            results[f"{name}_ms"] = summary['mean']
+            results[f"{name}_p90_ms"] = summary['p90']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default=200, type=int)
+    parser.add_argument("--duration", default=10.0, type=float, help="seconds")
+    parser.add_argument("--request_rate", default=20, type=int, help="requests (or stream messages) per second per client")
+    parser.add_argument("--stream", action="store_true", help="clients receive the server's snapshot broadcast instead of polling")
+    parser.add_argument("--snapshot_rate", default=20, type=int, help="broadcast snapshots per second")
+    parser.add_argument("--tick_rate", default=60, type=int)
+    parser.add_argument("--codec", default="binary", type=str)
+    parser.add_argument("--full_snapshots", action="store_true", help="disable delta snapshots")
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        clients=args.clients,
+        duration=args.duration,
+        request_rate=args.request_rate,
+        tick_rate=args.tick_rate,
+        codec_name=args.codec,
+        delta_snapshots=not args.full_snapshots,
+        stream=args.stream,
+        snapshot_rate=args.snapshot_rate,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
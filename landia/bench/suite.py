@@ -0,0 +1,336 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from landia import gamectx
+from landia.bench.codec import time_codec
+from landia.client import send_request
+from landia.codec import codec_registry, get_codec
+from landia.config import RendererConfig, ServerConfig
+from landia.env import LandiaEnv
+from landia.renderer import Renderer
+from landia.runner import LOG_LEVELS
+from landia.server import GameServer
+
+SMALL_MAP = "map_16x16_empty.txt"
+LARGE_MAP = "map_large_1.txt"
+
+# name -> (config_filename, agent_count, map layer file or None for the config's own map)
+SCENARIOS = {
+    "base_large_1": ("base_config.json", 1, LARGE_MAP),
+    "base_large_16": ("base_config.json", 16, LARGE_MAP),
+    "base_large_64": ("base_config.json", 64, LARGE_MAP),
+    "base_large_256": ("base_config.json", 256, LARGE_MAP),
+    "base_small_4": ("base_config.json", 4, SMALL_MAP),
+    "base_small_64": ("base_config.json", 64, SMALL_MAP),
+    "forager_4": ("forager.json", 4, None),
+    "infection_16": ("infection.json", 16, None),
+    "ctf_8": ("ctf.json", 8, None),
+}
+
+
+def time_repeats(fn, repeats):
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start_time) * 1000 / repeats
+
+
+def time_udp_round_trips(requests, codec_name="json"):
+    """
+    Round trips of client update requests to a GameServer on the loopback interface, answered by the game loop
+    stepping as fast as it can
+    """
+    server = GameServer(conn=("127.0.0.1", 0), config=ServerConfig()).start()
+    gamectx.set_server(server)
+    codec = get_codec(codec_name)
+    info = {
+        'client_id': "bench_client",
+        'meta': {},
+        'snapshots_received': [],
+        'player_type': "default",
+        'is_human': False,
+        'name': "bench",
+        'message': "UPDATE"}
+    times = []
+    bytes_in = 0
+
+    def send_requests():
+        nonlocal bytes_in
+        for _ in range(requests):
+            start_time = time.perf_counter()
+            response, _, response_bytes = send_request(
+                {'info': info, 'items': []}, server_address=server.server_address, codec=codec)
+            times.append((time.perf_counter() - start_time) * 1000)
+            bytes_in += response_bytes
+            info['snapshots_received'] = [response['info']['snapshot_timestamp']]
+
+    client_thread = threading.Thread(target=send_requests, daemon=True)
+    client_thread.start()
+    try:
+        while client_thread.is_alive():
+            gamectx.run_step()
+    finally:
+        gamectx.set_server(None)
+        server.close()
+    times = np.array(times)
+    return {
+        'udp_round_trip_ms': float(times.mean()),
+        'udp_round_trip_p90_ms': float(np.percentile(times, 90)),
+        'udp_response_bytes': bytes_in / requests,
+    }
+
+
+def run_scenario(name, steps=200, seed=1, repeats=20, render_agents=16, udp_requests=50):
+    """
+    Runs one scenario in this process: tick rate, observation building, pixel rendering,
+    snapshot encode/decode and loopback UDP round trips
+    """
+    config_filename, agent_count, map_file = SCENARIOS[name]
+    content_overrides = {}
+    if map_file is not None:
+        content_overrides = {"maps": {"main": {"static_layers": [map_file]}}}
+    np.random.seed(seed)
+    random.seed(seed)
+    rng = np.random.RandomState(seed)
+    env = LandiaEnv(
+        agent_map={str(i): {} for i in range(agent_count)},
+        config_filename=config_filename,
+        content_overrides=content_overrides,
+        include_state_observation=True,
+        seed=seed)
+    results = {'agent_count': agent_count, 'steps': steps}
+    try:
+        obs = env.reset()
+        num_actions = env.action_spaces["0"].n
+
+        def step():
+            nonlocal obs
+            actions = {agent_id: int(a) for agent_id, a in zip(obs.keys(), rng.randint(0, num_actions, len(obs)))}
+            obs, _, dones, _ = env.step(actions)
+            if dones.get('__all__'):
+                obs = env.reset()
+
+        for _ in range(10):
+            step()
+
+        # Tick rate
+        profiler = gamectx.profiler
+        profiler.reset()
+        profiler.enable()
+        start_time = time.perf_counter()
+        for _ in range(steps):
+            step()
+        elapsed = time.perf_counter() - start_time
+        profiler.disable()
+        stats = profiler.get_stats()
+        results['env_steps_per_sec'] = steps / elapsed
+        results['tick_ms'] = stats['phases_ms']['step']['mean']
+        results['tick_p90_ms'] = stats['phases_ms']['step']['p90']
+        results['object_count'] = len(gamectx.object_manager.get_objects())
+
+        # Observation building
+        players = [c.player for c in env.agent_clients.values() if c.player is not None]
+        objs = [gamectx.object_manager.get_by_id(p.get_object_id()) for p in players]
+        objs = [o for o in objs if o is not None]
+        results['state_obs_ms'] = time_repeats(lambda: env.content.get_observations(objs), repeats)
+        out = np.zeros((len(players), 42, 42, 3), dtype=np.uint8)
+        results['symbolic_obs_ms'] = time_repeats(lambda: env.content.get_symbolic_observations(players, out), repeats)
+
+        # Pixel rendering, as an agent client renders its observation
+        renderer_config = RendererConfig()
+        renderer_config.resolution = (42, 42)
+        renderer_config.render_to_screen = False
+        renderer_config.sound_enabled = False
+        renderer = Renderer(renderer_config, asset_bundle=env.content.get_asset_bundle())
+        renderer.initialize()
+        frame = np.zeros((42, 42, 3), dtype=np.uint8)
+        rendered = players[:render_agents]
+
+        def render():
+            for player in rendered:
+                renderer.process_frame(player)
+                renderer.render_frame()
+                renderer.get_last_frame(out=frame)
+
+        render()
+        results['render_frame_ms'] = time_repeats(render, repeats) / max(len(rendered), 1)
+
+        # Snapshot encode/decode
+        snapshot = gamectx.create_full_snapshot()
+        for codec_name, codec in codec_registry.items():
+            for k, v in time_codec(codec, snapshot, repeats).items():
+                results[f"snapshot_{codec_name}_{k}"] = v
+
+        results.update(time_udp_round_trips(udp_requests))
+    finally:
+        env.close()
+    return results
+
+
+def run_scenario_subprocess(name, steps, seed, timeout=1800):
+    """
+    Runs a scenario in a fresh interpreter, the game context and content are process wide
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "scenario.json")
+        env = dict(os.environ)
+        env.setdefault("SDL_VIDEODRIVER", "dummy")
+        env.setdefault("SDL_AUDIODRIVER", "dummy")
+        proc = subprocess.run(
+            [sys.executable, "-m", "landia.bench.suite",
+             "--scenario", name,
+             "--steps", str(steps),
+             "--seed", str(seed),
+             "--scenario_output", output],
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout)
+        if proc.returncode != 0 or not os.path.exists(output):
+            return {'error': proc.stderr.decode(errors="replace")[-2000:]}
+        with open(output) as f:
+            return json.load(f)
+
+
+def get_meta(steps, seed):
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL).stdout.decode().strip()
+    except OSError:
+        revision = None
+    return {
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'revision': revision or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'steps': steps,
+        'seed': seed,
+    }
+
+
+def metric_direction(metric):
+    """
+    1 if larger is better, -1 if smaller is better, 0 if the metric is not compared
+    """
+    if metric.endswith("_per_sec"):
+        return 1
+    if metric.endswith("_ms") or metric.endswith("bytes"):
+        return -1
+    return 0
+
+
+def compare(results, baseline, tolerance=0.1, noise_floor_ms=0.05):
+    """
+    Relative change of each compared metric against the baseline results. Regressions are changes for the worse
+    larger than tolerance, and for times also larger than noise_floor_ms
+    """
+    rows = []
+    for name, metrics in results['scenarios'].items():
+        base_metrics = baseline.get('scenarios', {}).get(name)
+        if base_metrics is None or 'error' in metrics or 'error' in base_metrics:
+            continue
+        for metric, value in metrics.items():
+            direction = metric_direction(metric)
+            base_value = base_metrics.get(metric)
+            if direction == 0 or base_value is None or base_value == 0:
+                continue
+            change = value / base_value - 1
+            regression = change * direction < -tolerance
+            if metric.endswith("_ms") and abs(value - base_value) <= noise_floor_ms:
+                regression = False
+            rows.append({
+                'scenario': name,
+                'metric': metric,
+                'baseline': base_value,
+                'value': value,
+                'change': change,
+                'regression': regression,
+            })
+    return rows
+
+
+def run(scenarios=None, steps=200, seed=1, baseline=None, tolerance=0.1):
+    """
+    Runs the scenarios (all by default), each in its own process, and compares them with the baseline results if given
+    """
+    results = {'meta': get_meta(steps, seed), 'scenarios': {}}
+    for name in scenarios or SCENARIOS.keys():
+        logging.info(f"Running {name}")
+        results['scenarios'][name] = run_scenario_subprocess(name, steps, seed)
+        if 'error' in results['scenarios'][name]:
+            logging.error(f"{name} failed:\n{results['scenarios'][name]['error']}")
+    if baseline is not None:
+        base_meta = baseline.get('meta', {})
+        for k in ['steps', 'seed']:
+            if base_meta.get(k) != results['meta'][k]:
+                logging.warning(f"Baseline was run with {k}={base_meta.get(k)}, now {results['meta'][k]}, "
+                                f"game states differ")
+        results['comparison'] = compare(results, baseline, tolerance)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=None, type=str, help="comma separated, one of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--steps", default=200, type=int)
+    parser.add_argument("--seed", default=1, type=int)
+    parser.add_argument("--output", default=None, type=str, help="write results JSON to this file")
+    parser.add_argument("--baseline", default=None, type=str, help="results JSON to compare with")
+    parser.add_argument("--tolerance", default=0.1, type=float, help="relative change counted as a regression")
+    parser.add_argument("--fail_on_regression", action="store_true")
+    parser.add_argument("--scenario", default=None, type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--scenario_output", default=None, type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    if args.scenario is not None:
+        # Worker process of run_scenario_subprocess
+        result = run_scenario(args.scenario, steps=args.steps, seed=args.seed)
+        with open(args.scenario_output, "w") as f:
+            json.dump(result, f)
+        return
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    scenarios = args.scenarios.split(",") if args.scenarios else None
+    results = run(scenarios=scenarios, steps=args.steps, seed=args.seed, baseline=baseline, tolerance=args.tolerance)
+
+    for name, metrics in results['scenarios'].items():
+        for k, v in metrics.items():
+            if k != 'error':
+                logging.info(f"{name} {k}: {v}")
+    regressions = [row for row in results.get('comparison', []) if row['regression']]
+    for row in results.get('comparison', []):
+        marker = " REGRESSION" if row['regression'] else ""
+        logging.info(f"{row['scenario']} {row['metric']}: {row['baseline']:.4g} -> {row['value']:.4g} "
+                     f"({row['change'] * 100:+.1f}%){marker}")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Results written to {args.output}")
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+
+from landia import gamectx
+from landia.env import LandiaEnv
+from landia.runner import LOG_LEVELS
+
+
+def run(agent_count=16, max_steps=200, resolution=(42, 42), config_filename="base_config.json"):
+    """
+    Per step cost of rendering agent observations with pygame (process_frame, render_frame, get_last_frame)
+    vs rasterizing them all at once with TileRasterizer, and how close the two are
+    """
+    agent_map = {str(i): {} for i in range(agent_count)}
+    env = LandiaEnv(
+        agent_map=agent_map,
+        resolution=resolution,
+        config_filename=config_filename,
+        headless=False)
+    try:
+        obs = env.reset()
+        clients = list(env.agent_clients.values())
+        out = np.zeros((len(clients), resolution[1], resolution[0], 3), dtype=np.uint8)
+        gamectx.content.get_symbolic_observations([c.player for c in clients], out)
+
+        render_time = 0
+        symbolic_time = 0
+        diffs = []
+        for _ in range(max_steps):
+            env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+
+            start_time = time.time()
+            frames = []
+            for client in clients:
+                client.render()
+                frames.append(client.get_rgb_array())
+            render_time += time.time() - start_time
+
+            start_time = time.time()
+            gamectx.content.get_symbolic_observations([c.player for c in clients], out)
+            symbolic_time += time.time() - start_time
+
+            diffs.append(np.abs(np.stack(frames).astype(np.int16) - out).mean())
+    finally:
+        env.close()
+    return {
+        'agent_count': agent_count,
+        'max_steps': max_steps,
+        'render_ms_per_step': render_time * 1000 / max_steps,
+        'symbolic_ms_per_step': symbolic_time * 1000 / max_steps,
+        'speedup': render_time / symbolic_time,
+        'mean_abs_pixel_diff': float(np.mean(diffs)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent_count", default=16, type=int)
+    parser.add_argument("--max_steps", default=200, type=int)
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        agent_count=args.agent_count,
+        max_steps=args.max_steps,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import logging
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+
+from landia.runner import LOG_LEVELS
+from landia.transport import CHUNK_HEADER, DEFAULT_CHUNK_SIZE, Connection, Reassembler, split_message
+
+MESSAGE_ID = struct.Struct("<I")
+
+
+class LossyConnection(Connection):
+    """
+    Connection dropping each outgoing datagram (data, NACK or retransmit) with probability loss
+    """
+
+    def __init__(self, remote_address, loss, seed, **kwargs):
+        super().__init__(remote_address, **kwargs)
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.datagrams = 0
+        self.lost = 0
+
+    def sendto(self, datagram):
+        self.datagrams += 1
+        if self.rng.random() < self.loss:
+            self.lost += 1
+            return
+        super().sendto(datagram)
+
+
+def time_reassembly(size, chunk_size=DEFAULT_CHUNK_SIZE, repeats=20, seed=1):
+    """
+    Reassembly time of one message: concatenating chunks as they arrive, as the client did, and the Reassembler
+    copying shuffled chunks into a preallocated buffer
+    """
+    data = random.Random(seed).randbytes(size)
+    chunks = split_message(0, data, chunk_size)
+    payloads = [c[CHUNK_HEADER.size:] for c in chunks]
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        all_data = b''
+        for payload in payloads:
+            all_data += payload
+    concat_ms = (time.perf_counter() - start_time) * 1000 / repeats
+
+    shuffled = list(chunks)
+    random.Random(seed).shuffle(shuffled)
+    start_time = time.perf_counter()
+    for i in range(repeats):
+        reassembler = Reassembler()
+        for chunk in shuffled:
+            message = reassembler.add(chunk)
+    reassemble_ms = (time.perf_counter() - start_time) * 1000 / repeats
+    assert message == data
+    return {'concat_ms': concat_ms, 'reassemble_ms': reassemble_ms}
+
+
+def run_loopback(messages=300, size=20000, loss=0.0, rate=50, chunk_size=DEFAULT_CHUNK_SIZE, seed=1,
+                 idle_timeout=1.0):
+    """
+    Sends messages at rate per second between two connections on the loopback interface, dropping datagrams in
+    both directions with probability loss. Reports delivered and intact messages, throughput and retransmits.
+    """
+    receiver = LossyConnection(None, loss, seed + 1, local_address=("127.0.0.1", 0), chunk_size=chunk_size)
+    sender = LossyConnection(receiver.get_address(), loss, seed, local_address=("127.0.0.1", 0),
+                             chunk_size=chunk_size, history_size=messages)
+    receiver.remote_address = sender.get_address()
+    for connection in [sender, receiver]:
+        connection.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    body = random.Random(seed).randbytes(size - MESSAGE_ID.size)
+
+    sending = True
+    receiving = True
+    received = set()
+    corrupt = 0
+    last_received = None
+
+    def serve_nacks():
+        while receiving:
+            try:
+                sender.receive(timeout=0.1)
+            except socket.timeout:
+                pass
+            except OSError:
+                break
+
+    def receive():
+        nonlocal corrupt, last_received
+        while len(received) < messages:
+            try:
+                message = receiver.receive(timeout=idle_timeout)
+            except socket.timeout:
+                if not sending:
+                    break
+                continue
+            last_received = time.perf_counter()
+            message_id, = MESSAGE_ID.unpack_from(message)
+            if message[MESSAGE_ID.size:] != body:
+                corrupt += 1
+            received.add(message_id)
+
+    threads = [threading.Thread(target=serve_nacks, daemon=True), threading.Thread(target=receive, daemon=True)]
+    for thread in threads:
+        thread.start()
+    start_time = time.perf_counter()
+    try:
+        for i in range(messages):
+            sender.send(MESSAGE_ID.pack(i) + body)
+            delay = start_time + (i + 1) / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sending = False
+        threads[1].join()
+    finally:
+        sending = False
+        receiving = False
+        threads[0].join()
+        sender.close()
+        receiver.close()
+
+    elapsed = (last_received or time.perf_counter()) - start_time
+    return {
+        'messages': messages,
+        'size': size,
+        'loss': loss,
+        'delivered': len(received),
+        'delivery_rate': len(received) / messages,
+        'corrupt': corrupt,
+        'throughput_mb_per_sec': len(received) * size / elapsed / 1e6,
+        'chunks_per_message': len(split_message(0, body, chunk_size)),
+        'datagrams_lost': sender.lost + receiver.lost,
+        'nacks_sent': receiver.nacks_sent,
+        'retransmits': sender.retransmits,
+        'incomplete_dropped': receiver.reassembler.dropped,
+    }
+
+
+def run(messages=300, sizes=(2000, 20000, 200000), losses=(0.0, 0.05), rate=50, chunk_size=DEFAULT_CHUNK_SIZE,
+        seed=1):
+    results = {}
+    for size in sizes:
+        for k, v in time_reassembly(size, chunk_size, seed=seed).items():
+            results[f"{size}_{k}"] = v
+        for loss in losses:
+            loopback = run_loopback(messages, size, loss, rate, chunk_size, seed)
+            for k in ['delivery_rate', 'corrupt', 'throughput_mb_per_sec', 'nacks_sent', 'retransmits',
+                      'incomplete_dropped']:
+                results[f"{size}_loss_{loss}_{k}"] = loopback[k]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", default=300, type=int)
+    parser.add_argument("--sizes", default="2000,20000,200000", type=str, help="comma separated message sizes")
+    parser.add_argument("--losses", default="0,0.05", type=str, help="comma separated datagram loss rates")
+    parser.add_argument("--rate", default=50, type=int, help="messages per second")
+    parser.add_argument("--chunk_size", default=DEFAULT_CHUNK_SIZE, type=int)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        messages=args.messages,
+        sizes=[int(s) for s in args.sizes.split(",")],
+        losses=[float(s) for s in args.losses.split(",")],
+        rate=args.rate,
+        chunk_size=args.chunk_size)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import logging
+import sys
+import time
+
+from landia.env import VectorLandiaEnv, multi_agent_run
+from landia.runner import LOG_LEVELS
+
+
+def run_vector_env(num_envs, agent_count, max_steps, resolution=(42, 42), config_filename="base_config.json"):
+    agent_map = {str(i): {} for i in range(agent_count)}
+    env = VectorLandiaEnv(
+        num_envs=num_envs,
+        env_kwargs={
+            'agent_map': agent_map,
+            'resolution': resolution,
+            'config_filename': config_filename,
+            'tick_rate': 0})
+    try:
+        env.reset()
+        start_time = time.time()
+        for _ in range(max_steps):
+            env.step(env.sample_actions())
+        elapsed = time.time() - start_time
+    finally:
+        env.close()
+    return max_steps * num_envs / elapsed
+
+
+def run_baseline(agent_count, max_steps, resolution=(42, 42), config_filename="base_config.json"):
+    args = argparse.Namespace(
+        max_steps=max_steps,
+        agent_count=agent_count,
+        verbose=False,
+        compute_profile=False,
+        mem_profile=False,
+        render=False,
+        remote_client=False,
+        tick_rate=0,
+        config_filename=config_filename)
+    return multi_agent_run(resolution, (400, 400), args)
+
+
+def run(num_envs=4, agent_count=4, max_steps=1000, config_filename="base_config.json"):
+    """
+    Compares env steps/sec of multi_agent_run (one world in this process) with VectorLandiaEnv
+    """
+    vector_steps_per_sec = run_vector_env(num_envs, agent_count, max_steps, config_filename=config_filename)
+    baseline_steps_per_sec = run_baseline(agent_count, max_steps, config_filename=config_filename)
+    return {
+        'num_envs': num_envs,
+        'agent_count': agent_count,
+        'max_steps': max_steps,
+        'baseline_steps_per_sec': baseline_steps_per_sec,
+        'vector_steps_per_sec': vector_steps_per_sec,
+        'speedup': vector_steps_per_sec / baseline_steps_per_sec,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_envs", default=4, type=int)
+    parser.add_argument("--agent_count", default=4, type=int)
+    parser.add_argument("--max_steps", default=1000, type=int)
+    parser.add_argument("--config_filename", default="base_config.json", type=str)
+    parser.add_argument("--log_level", default="info", type=str)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(LOG_LEVELS.get(args.log_level))
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    results = run(
+        num_envs=args.num_envs,
+        agent_count=args.agent_count,
+        max_steps=args.max_steps,
+        config_filename=args.config_filename)
+    for k, v in results.items():
+        logging.info(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,12 @@ import math
 import os
 import random
 import socket
-import struct
 import sys
 import threading
 import time
-from multiprocessing import Queue
-from typing import List
+from collections import deque
+from queue import Queue
+from typing import Any, Dict, List
 from typing import Tuple
 
 import lz4.frame
@@ -22,9 +22,14 @@ from .object import GObject
 from .config import ClientConfig, GameConfig
 from .content import Content
 from .common import StateDecoder, StateEncoder, Base
+from .codec import SnapshotCodec, get_codec
 from .player import Player
 from .inputs import get_input_events
+from .interpolation import InterpolationBuffer
 from .renderer import Renderer
+from .server import SHARED_HEADER
+from .transport import Connection
+from .local_transport import SharedQueue, SnapshotReader
 from .utils import gen_id
 from .event import InputEvent, Event
 from .utils import TickPerSecCounter
@@ -33,43 +38,44 @@ from .clock import clock, StepClock
 import gym
 import sys
 
-HEADER_SIZE = 16
 LATENCY_LOG_SIZE = 10000
 
 
-def receive_data(sock):
-    done = False
-    all_data = b''
-    while not done:
-        sock.settimeout(1.0)
-        data, server = sock.recvfrom(4096)
-        # TODO: Use qq for windows!!, not sure why
-        chunk_num, chunks = struct.unpack('ll', data[:HEADER_SIZE])
-        all_data += data[HEADER_SIZE:]
-        if chunk_num == chunks:
-            done = True
-    bytes_in = sys.getsizeof(all_data)
-    all_data = lz4.frame.decompress(all_data)
-    return all_data.decode("utf-8"), bytes_in
-
-
-def send_request(request_data, server_address):
+def decode_response(data, codec: SnapshotCodec):
+    """
+    Decodes a server reply: the snapshot part shared with the client's interest group, if any, followed by the
+    client's own part. Shared objects and players are merged into the client's snapshot.
+    """
+    shared_size, = SHARED_HEADER.unpack_from(data)
+    offset = SHARED_HEADER.size
+    response = codec.decode(lz4.frame.decompress(data[offset + shared_size:]))
+    if shared_size > 0:
+        shared = codec.decode(lz4.frame.decompress(data[offset:offset + shared_size]))
+        snapshot = response['snapshot']
+        snapshot['om'] = shared['om'] + snapshot['om']
+        shared['pm'].update(snapshot['pm'])
+        snapshot['pm'] = shared['pm']
+    return response
+
+
+def send_request(request_data, server_address, codec: SnapshotCodec = None, connection: Connection = None):
+    """
+    Sends a request and waits for the reply, on the given connection or on a new one to server_address
+    """
+    if codec is None:
+        codec = get_codec("binary")
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    owned = connection is None
+    if owned:
+        connection = Connection(server_address)
     try:
-        data_st = json.dumps(request_data, cls=StateEncoder)
-        # Send data
-        data_bytes = bytes(data_st, 'utf-8')
-        data_bytes = lz4.frame.compress(data_bytes)
-        bytes_out = sys.getsizeof(data_bytes)
-        sent = sock.sendto(data_bytes,
-                           server_address)
-        data, bytes_in = receive_data(sock)
-        if data is None:
-            raise Exception("No data found")
+        data_bytes = lz4.frame.compress(codec.encode(request_data))
+        bytes_out = connection.send(data_bytes)
+        data = connection.receive()
     finally:
-        sock.close()
-    return json.loads(data, cls=StateDecoder), bytes_out, bytes_in
+        if owned:
+            connection.close()
+    return decode_response(data, codec), bytes_out, len(data)
 
 
 class RemoteClient:
@@ -86,6 +92,121 @@ class RemoteClient:
         self.request_counter = 0
         self.unconfirmed_messages = set()
         self.outgoing_events: List[Event] = []
+        # Attached to the server's shared memory ring, which carries its events
+        self.shared_memory = False
+        # Delta snapshots: object state the client confirmed and object state sent but not yet confirmed
+        self.acked_objects: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self.pending_objects: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        # Interest management: objects in the client's region and ids that left it, with the time they left
+        self.interest_objects = set()
+        self.unconfirmed_removals: Dict[str, int] = {}
+
+    def reset_object_baseline(self):
+        self.acked_objects = {}
+        self.pending_objects = {}
+
+    def reset_interest(self):
+        self.interest_objects = set()
+        self.unconfirmed_removals = {}
+
+    def update_interest(self, snapshot_timestamp, obj_ids):
+        """
+        Sets the objects in the client's region and returns the ids that entered it. Ids that left are
+        sent as removals until a snapshot containing them is confirmed.
+        """
+        entered = obj_ids - self.interest_objects
+        for obj_id in self.interest_objects - obj_ids:
+            self.unconfirmed_removals[obj_id] = snapshot_timestamp
+            # The client drops its copy, so the next snapshot of this object must be complete
+            self.acked_objects.pop(obj_id, None)
+            for pending in self.pending_objects.values():
+                pending.pop(obj_id, None)
+        for obj_id in entered:
+            self.unconfirmed_removals.pop(obj_id, None)
+        self.interest_objects = obj_ids
+        return entered
+
+    def confirm_snapshot(self, snapshot_timestamp):
+        """
+        Makes the object state sent with snapshot_timestamp the new baseline. Older pending snapshots
+        are dropped, the client either received them or the confirmed snapshot superseded them.
+        """
+        for obj_id in [k for k, t in self.unconfirmed_removals.items() if t <= snapshot_timestamp]:
+            del self.unconfirmed_removals[obj_id]
+
+        confirmed = self.pending_objects.pop(snapshot_timestamp, None)
+        if confirmed is None:
+            return
+        for obj_id, data in confirmed.items():
+            acked = self.acked_objects.get(obj_id)
+            if acked is None or acked[0] <= snapshot_timestamp:
+                self.acked_objects[obj_id] = (snapshot_timestamp, data)
+        for timestamp in [t for t in self.pending_objects.keys() if t < snapshot_timestamp]:
+            del self.pending_objects[timestamp]
+
+    def create_object_deltas(self, snapshot_timestamp, obj_snapshots: List[Dict[str, Any]], diff_cache=None):
+        """
+        Replaces object snapshots with field level diffs against the confirmed baseline. A field is sent if it
+        differs from the baseline or from any unconfirmed snapshot, so the client ends up with the same state
+        whichever unconfirmed snapshots it received. Objects without a baseline are sent in full.
+
+        :param diff_cache: diffs by (snapshot, baseline) identity, shared by clients given the same snapshot dicts
+            while they stay unchanged (e.g. during one tick). Only used for objects without unconfirmed snapshots.
+        """
+        pending = self.pending_objects.get(snapshot_timestamp)
+        if pending is None:
+            pending = {}
+            # Snapshots created on the same tick hold the same object state, so they share one entry
+            self.pending_objects[snapshot_timestamp] = pending
+
+        results = []
+        for snapshot in obj_snapshots:
+            data = snapshot['data']
+            obj_id = data['id']
+            pending[obj_id] = data
+            acked = self.acked_objects.get(obj_id)
+            if acked is None:
+                results.append(snapshot)
+                continue
+            unconfirmed = [p[obj_id] for t, p in self.pending_objects.items() if t != snapshot_timestamp and obj_id in p]
+            base = acked[1]
+            if diff_cache is not None and len(unconfirmed) == 0:
+                key = (id(data), id(base))
+                if key in diff_cache:
+                    delta = diff_cache[key]
+                else:
+                    delta = self.diff_object(snapshot, base, unconfirmed)
+                    diff_cache[key] = delta
+            else:
+                delta = self.diff_object(snapshot, base, unconfirmed)
+            if delta is not None:
+                results.append(delta)
+
+        # Forget removed objects
+        if len(self.acked_objects) > 2 * len(gamectx.object_manager.get_objects()):
+            self.acked_objects = {
+                obj_id: v for obj_id, v in self.acked_objects.items() if gamectx.object_manager.get_by_id(obj_id) is not None}
+        return results
+
+    @staticmethod
+    def diff_object(snapshot, base, unconfirmed):
+        """
+        Diff of an object snapshot against its baseline and unconfirmed snapshots, None if nothing changed
+        """
+        data = snapshot['data']
+        if len(unconfirmed) == 0 and (data is base or data == base):
+            return None
+        changes = {}
+        for k, v in data.items():
+            if k == 'id' or k == 'last_change':
+                continue
+            if k not in base or base[k] != v or any(k not in u or u[k] != v for u in unconfirmed):
+                changes[k] = v
+        if len(changes) == 0:
+            return None
+        changes['id'] = data['id']
+        changes['last_change'] = data.get('last_change')
+        return {'_type': snapshot['_type'], '_delta': True, 'data': changes}
 
     def add_event(self, e: Event):
         self.outgoing_events.append(e)
@@ -124,6 +245,7 @@ class ClientConnector:
         self.outgoing_buffer: Queue = Queue()  # state buffer
         self.running = True
         self.client_id = self.config.client_id
+        self.codec = get_codec(self.config.codec)
         self.total_bytes_out = 0
         self.total_bytes_in = 0
         self.total_tx = 0
@@ -137,6 +259,9 @@ class ClientConnector:
         self.connection_clock = StepClock(self.ticks_per_second)
         self.tick_counter = TickPerSecCounter(2)
         self.last_received_snapshots = []
+        self.connection: Connection = None
+        self.player_id = None
+        self.stream_acks = deque()
         self.sync_freq = 0
         self.last_sync = 0
 
@@ -156,17 +281,18 @@ class ClientConnector:
         success = sum([1 for v in vals if v['success']])
         return success/len(vals)
 
-    def create_request(self):
-        request_info = {
+    def create_request_info(self, message, snapshots_received):
+        return {
             'client_id': "" if self.client_id is None else self.client_id,
             "meta": self.config.meta,
-            'snapshots_received': self.last_received_snapshots,
+            'snapshots_received': snapshots_received,
             'player_type': self.config.player_type,
             'is_human': self.config.is_human,
-            'message': "UPDATE"
+            'name': self.config.player_name,
+            'message': message
         }
 
-        # Get items:
+    def pull_outgoing_items(self):
         outgoing_items = []
         done = False
         while (not done):
@@ -178,22 +304,36 @@ class ClientConnector:
                 done = True
             else:
                 outgoing_items.append(outgoing_item)
+        return outgoing_items
+
+    def create_request(self):
+        request_info = self.create_request_info("UPDATE", self.last_received_snapshots)
+        outgoing_items = self.pull_outgoing_items()
 
         start_time = time.time()
         try:
             response, bytes_out, bytes_in = send_request({
                 'info': request_info,
                 'items': outgoing_items},
-                server_address=(self.config.server_hostname, self.config.server_port))
+                server_address=self.connection.remote_address,
+                codec=self.codec,
+                connection=self.connection)
         except Exception as e:
             print(f"Error communicating with server [{e}]. \tRetrying...")
             return
 
-        self.total_bytes_in += bytes_in
         self.total_bytes_out += bytes_out
-        self.total_tx += 1
         self.last_latency = time.time() - start_time
+        self.handle_response(response, bytes_in)
+        if response is not None:
+            self.last_received_snapshots = [
+                response['info']['snapshot_timestamp']]
+        self.connection_clock.tick()
+        self.report()
 
+    def handle_response(self, response, bytes_in):
+        self.total_bytes_in += bytes_in
+        self.total_tx += 1
         if response is None:
             print("Packet loss or error occurred")
             self.add_network_info(self.last_latency_ms, False)
@@ -201,8 +341,6 @@ class ClientConnector:
             # Log latency
             self.add_network_info(self.last_latency_ms, True)
             response_info = response['info']
-            self.last_received_snapshots = [
-                response_info['snapshot_timestamp']]
 
             # set clock
             # TODO: also sync fps/clock from server
@@ -217,9 +355,9 @@ class ClientConnector:
             if response_info['message'] == 'UPDATE':
                 self.incomming_buffer.put(response)
             self.request_counter += 1
-        self.connection_clock.tick()
         self.tick_counter.tick()
 
+    def report(self):
         if (time.time() - self.last_report) > self.report_freq:
             # kbytes_out_summary = self.total_bytes_out/self.total_tx * self.ticks_per_second/1024
             # kbytes_in_summary = self.total_bytes_in/self.total_tx * self.ticks_per_second/1024
@@ -233,11 +371,131 @@ class ClientConnector:
 
             self.last_report = time.time()
 
+    def send_stream_message(self):
+        """
+        Sends pending inputs and acks of the snapshots received since the last message, without waiting for a reply
+        """
+        snapshots_received = []
+        while len(self.stream_acks) > 0:
+            snapshots_received.append(self.stream_acks.popleft())
+        if len(snapshots_received) == 0:
+            # An empty list asks the server for a new baseline, so repeat the latest ack instead
+            snapshots_received = self.last_received_snapshots
+        self.last_received_snapshots = snapshots_received[-1:]
+        request_info = self.create_request_info("STREAM", snapshots_received)
+        data_bytes = lz4.frame.compress(self.codec.encode({'info': request_info, 'items': self.pull_outgoing_items()}))
+        self.total_bytes_out += self.connection.send(data_bytes)
+
+    def receive_snapshots(self):
+        while self.running:
+            try:
+                data = self.connection.receive()
+                response = decode_response(data, self.codec)
+            except socket.timeout:
+                continue
+            except OSError:
+                # Socket closed
+                break
+            except Exception as e:
+                logging.warning(f"Dropping undecodable snapshot: {e}")
+                continue
+            self.handle_response(response, len(data))
+            self.stream_acks.append(response['info']['snapshot_timestamp'])
+
     def start_connection(self, callback=None):
         print("Starting connection to server")
 
+        self.connection = Connection((self.config.server_hostname, self.config.server_port))
+        if self.config.local_transport and self.run_local():
+            return
+        if self.config.poll_snapshots:
+            try:
+                while self.running:
+                    self.create_request()
+            finally:
+                self.connection.close()
+            return
+
+        # Inputs and acks go out at send_rate, the server's broadcast arrives on the same socket in another thread
+        receiver_thread = threading.Thread(target=self.receive_snapshots, daemon=True)
+        self.send_stream_message()
+        receiver_thread.start()
+        send_clock = StepClock(self.config.send_rate)
+        try:
+            while self.running:
+                self.send_stream_message()
+                send_clock.tick()
+                self.report()
+        finally:
+            self.running = False
+            self.connection.close()
+
+    def join_local(self, queue: SharedQueue):
+        """
+        Registers the input queue with the server, returns the name of its snapshot ring
+        """
+        request_info = self.create_request_info("LOCAL", [])
+        request_info['input_queue'] = queue.name
         while self.running:
-            self.create_request()
+            try:
+                response, bytes_out, bytes_in = send_request(
+                    {'info': request_info, 'items': []},
+                    server_address=self.connection.remote_address,
+                    codec=self.codec,
+                    connection=self.connection)
+            except Exception as e:
+                print(f"Error communicating with server [{e}]. \tRetrying...")
+                continue
+            self.total_bytes_out += bytes_out
+            self.player_id = response['info']['player_id']
+            self.handle_response(response, bytes_in)
+            return response['info'].get('snapshot_ring')
+        return None
+
+    def run_local(self):
+        """
+        Reads the server's snapshot frames from shared memory and sends inputs through a shared memory queue.
+        Returns False if the server doesn't publish to shared memory.
+        """
+        queue = SharedQueue()
+        reader = None
+        try:
+            ring_name = self.join_local(queue)
+            if ring_name is None:
+                if self.running:
+                    print("Server has no shared memory transport, using UDP")
+                return False
+            self.connection.close()
+            reader = SnapshotReader(ring_name, expand_deltas=True)
+            request_codec = reader.codec
+            step_clock = StepClock(gamectx.config.tick_rate or 60)
+            send_period = 1.0 / self.config.send_rate
+            last_send = 0
+            while self.running:
+                for frame in reader.read_new():
+                    self.handle_response({
+                        'info': {
+                            'server_tick': frame.tick,
+                            'server_time': frame.server_time,
+                            'message': "UPDATE",
+                            'client_id': self.client_id,
+                            'player_id': self.player_id,
+                            'snapshot_timestamp': frame.tick},
+                        'snapshot': frame.snapshot}, len(frame.snapshot_data))
+                items = self.pull_outgoing_items()
+                # Messages double as keep alives
+                if len(items) > 0 or time.time() - last_send >= send_period:
+                    data = request_codec.encode({'info': self.create_request_info("LOCAL", []), 'items': items})
+                    if queue.put(data):
+                        self.total_bytes_out += len(data)
+                        last_send = time.time()
+                step_clock.tick()
+                self.report()
+        finally:
+            if reader is not None:
+                reader.close()
+            queue.close()
+        return True
 
 
 class GameClient:
@@ -255,6 +513,7 @@ class GameClient:
 
         self.server_info_history = TimeLoggingContainer(100)
         self.snapshot_history = TimeLoggingContainer(500)
+        self.interpolation_buffer = InterpolationBuffer(500)
         # TODO: move to history data managed for rendering consistency
         self.player: Player = None
         self.step_counter = 0
@@ -307,6 +566,9 @@ class GameClient:
                 self.snapshot_history.add(
                     incomming_data['info']['snapshot_timestamp'],
                     incomming_data['snapshot'])
+                self.interpolation_buffer.add(
+                    incomming_data['info']['snapshot_timestamp'],
+                    incomming_data['snapshot'].get('om', []))
                 self.server_info_history.add(
                     incomming_data['info']['snapshot_timestamp'],
                     incomming_data['info'])
@@ -322,18 +584,7 @@ class GameClient:
 
         if snap is not None:
             gamectx.load_snapshot(snap)
-
-            if snap1 is not None and snap2 is not None:
-                fraction = (clock.get_ticks()-snap1_timestamp) / \
-                    (snap2_timestamp-snap1_timestamp)
-                for odata in snap2['om']:
-                    obj2 = Base.create_from_snapshot(odata)
-                    obj1 = gamectx.get_object_by_id(obj2.get_id())
-                    if obj1 is not None:
-                        p1 = obj1.get_view_position()
-                        p2 = obj2.get_view_position()
-                        if p1 is not None and p2 is not None:
-                            obj1.view_position = (p2 - p1) * fraction + p1
+            self.interpolation_buffer.interpolate(clock.get_ticks(), gamectx.object_manager)
 
     def update_player_info(self):
         server_info_timestamp, server_info = self.server_info_history.get_latest_with_timestamp()
@@ -342,6 +593,7 @@ class GameClient:
                 str(server_info['player_id']))
 
     def run_step(self):
+        start = gamectx.profiler.start()
         if self.player is not None:
             input_events = self.player.pull_input_events()
             if self.config.is_human:
@@ -359,8 +611,10 @@ class GameClient:
             self.update_player_info()
         self.tick_counter.tick()
         self.step_counter += 1
+        gamectx.profiler.record("client_step", start)
 
     def render(self):
+        start = gamectx.profiler.start()
         # self.renderer.set_log_info("TPS: {} ".format(self.tick_counter.avg()))
         self.renderer.process_frame(player=self.player)
         self.content.post_process_frame(
@@ -369,6 +623,7 @@ class GameClient:
 
         if self.config.is_human:
             self.renderer.play_sounds(gamectx.get_sound_events())
+        gamectx.profiler.record("render", start)
 
-    def get_rgb_array(self):
-        return self.renderer.get_last_frame()
+    def get_rgb_array(self, out=None):
+        return self.renderer.get_last_frame(out=out)
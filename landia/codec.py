@@ -0,0 +1,452 @@
+import json
+import struct
+from typing import Dict, List
+
+import numpy as np
+from pygame import Vector2
+
+from .common import StateDecoder, StateEncoder
+
+codec_registry = {}
+
+
+def register_codec(codec):
+    codec_registry[codec.name] = codec
+
+
+def get_codec(name):
+    codec = codec_registry.get(name)
+    if codec is None:
+        raise ValueError(f"Unknown snapshot codec {name}, options: {', '.join(codec_registry.keys())}")
+    return codec
+
+
+def detect_codec(data: bytes):
+    """
+    Finds the codec a message was encoded with, falls back to json
+    """
+    for codec in codec_registry.values():
+        if codec.matches(data):
+            return codec
+    return codec_registry["json"]
+
+
+class SnapshotCodec:
+    """
+    Converts snapshots and network messages (nested dicts/lists of primitives and Vector2) to bytes and back.
+    Compression is left to the transport.
+    """
+
+    name = None
+
+    def encode(self, data) -> bytes:
+        raise NotImplementedError()
+
+    def decode(self, data: bytes):
+        raise NotImplementedError()
+
+    def matches(self, data: bytes) -> bool:
+        return False
+
+
+class JSONCodec(SnapshotCodec):
+
+    name = "json"
+
+    def encode(self, data) -> bytes:
+        return bytes(json.dumps(data, cls=StateEncoder), 'utf-8')
+
+    def decode(self, data: bytes):
+        return json.loads(data.decode('utf-8').strip(), cls=StateDecoder)
+
+    def matches(self, data: bytes) -> bool:
+        return data[:1] in (b"{", b"[")
+
+
+# Binary format tags
+_NONE = 0
+_TRUE = 1
+_FALSE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_VEC = 6
+_LIST = 7
+_DICT = 8
+_INT_ARRAY = 9
+_FLOAT_ARRAY = 10
+_VEC_ARRAY = 11
+_BOOL_ARRAY = 12
+_STR_ARRAY = 13
+_NONE_ARRAY = 14
+_TABLE = 15
+_NESTED = 16
+
+# Shorter sequences are written item by item
+_MIN_ARRAY_LEN = 4
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+_float_struct = struct.Struct("<d")
+_vec_struct = struct.Struct("<dd")
+
+
+def _json_key(k):
+    # Same key conversion json.dumps does
+    if isinstance(k, str):
+        return k
+    if k is True:
+        return "true"
+    if k is False:
+        return "false"
+    if k is None:
+        return "null"
+    if isinstance(k, int):
+        return int.__repr__(k)
+    if isinstance(k, float):
+        return float.__repr__(k)
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(k).__name__}")
+
+
+class _Encoder:
+
+    def __init__(self):
+        self.out = bytearray()
+        self.strings: Dict[str, int] = {}
+        self.shapes: Dict[tuple, int] = {}
+
+    def write_uint(self, n):
+        out = self.out
+        while n > 0x7F:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def write_int(self, n):
+        self.write_uint(n * 2 if n >= 0 else -n * 2 - 1)
+
+    def string_id(self, s):
+        sid = self.strings.get(s)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings[s] = sid
+        return sid
+
+    def shape_id(self, keys):
+        shape = self.shapes.get(keys)
+        if shape is None:
+            shape = len(self.shapes)
+            self.shapes[keys] = shape
+            for k in keys:
+                self.string_id(k)
+        return shape
+
+    def dict_shape(self, d: dict):
+        keys = tuple(d)
+        for k in keys:
+            if type(k) is not str:
+                keys = tuple(_json_key(k) for k in keys)
+                break
+        return self.shape_id(keys)
+
+    def write_value(self, v):
+        t = type(v)
+        if v is None:
+            self.out.append(_NONE)
+        elif t is bool:
+            self.out.append(_TRUE if v else _FALSE)
+        elif t is int:
+            self.out.append(_INT)
+            self.write_int(v)
+        elif t is float:
+            self.out.append(_FLOAT)
+            self.out += _float_struct.pack(v)
+        elif t is str:
+            self.out.append(_STR)
+            self.write_uint(self.string_id(v))
+        elif t is Vector2:
+            self.out.append(_VEC)
+            self.out += _vec_struct.pack(v.x, v.y)
+        elif t is dict:
+            self.out.append(_DICT)
+            self.write_uint(self.dict_shape(v))
+            for vv in v.values():
+                self.write_value(vv)
+        elif t is list or t is tuple:
+            self.write_seq(v)
+        elif isinstance(v, bool):
+            self.write_value(bool(v))
+        elif isinstance(v, int):
+            self.write_value(int(v))
+        elif isinstance(v, float):
+            self.write_value(float(v))
+        elif isinstance(v, str):
+            self.write_value(str(v))
+        elif isinstance(v, Vector2):
+            self.write_value(Vector2(v))
+        elif isinstance(v, dict):
+            self.write_value(dict(v))
+        elif isinstance(v, (list, tuple)):
+            self.write_seq(list(v))
+        else:
+            raise TypeError(f"Object of type {t.__name__} is not serializable")
+
+    def write_array(self, tag, arr: np.ndarray, n):
+        self.out.append(tag)
+        self.write_uint(n)
+        self.out += arr.tobytes()
+
+    def write_seq(self, values):
+        """
+        Writes a list, packing it as a typed array or a table when all items share a type
+        """
+        n = len(values)
+        if n >= _MIN_ARRAY_LEN:
+            types = set(map(type, values))
+            if len(types) == 1:
+                t = types.pop()
+                if t is int:
+                    if _INT64_MIN <= min(values) and max(values) <= _INT64_MAX:
+                        self.write_array(_INT_ARRAY, np.array(values, dtype="<i8"), n)
+                        return
+                elif t is float:
+                    self.write_array(_FLOAT_ARRAY, np.array(values, dtype="<f8"), n)
+                    return
+                elif t is Vector2:
+                    self.write_array(_VEC_ARRAY, np.array([(v.x, v.y) for v in values], dtype="<f8"), n)
+                    return
+                elif t is bool:
+                    self.write_array(_BOOL_ARRAY, np.array(values, dtype=np.uint8), n)
+                    return
+                elif t is str:
+                    string_id = self.string_id
+                    self.write_array(_STR_ARRAY, np.array([string_id(v) for v in values], dtype="<u4"), n)
+                    return
+                elif t is type(None):
+                    self.out.append(_NONE_ARRAY)
+                    self.write_uint(n)
+                    return
+                elif t is dict:
+                    self.write_table(values)
+                    return
+                elif t is list or t is tuple:
+                    # List of lists: lengths followed by the flattened items
+                    self.out.append(_NESTED)
+                    self.write_uint(n)
+                    self.out += np.array([len(v) for v in values], dtype="<u4").tobytes()
+                    self.write_seq([vv for v in values for vv in v])
+                    return
+
+        self.out.append(_LIST)
+        self.write_uint(n)
+        for v in values:
+            self.write_value(v)
+
+    def write_table(self, rows: List[dict]):
+        """
+        List of dicts stored column wise: one shape id per row, then the columns of each shape
+        in order of first appearance
+        """
+        n = len(rows)
+        dict_shape = self.dict_shape
+        row_shapes = [dict_shape(r) for r in rows]
+        groups: Dict[int, list] = {}
+        for shape, r in zip(row_shapes, rows):
+            group = groups.get(shape)
+            if group is None:
+                groups[shape] = [r]
+            else:
+                group.append(r)
+
+        self.out.append(_TABLE)
+        self.write_uint(n)
+        self.write_uint(len(groups))
+        if len(groups) > 1:
+            self.out += np.array(row_shapes, dtype="<u4").tobytes()
+        for shape, group in groups.items():
+            self.write_uint(shape)
+            for column in zip(*(r.values() for r in group)):
+                self.write_seq(column)
+
+
+def _vector2_hook(d):
+    # Same conversion as StateDecoder
+    return Vector2(d['x'], d['y'])
+
+
+class _Decoder:
+
+    def __init__(self, data, strings, shapes):
+        self.data = data
+        self.pos = 0
+        self.strings = strings
+        self.shapes = shapes
+        # Dicts with a _type key go through the json object hook
+        self.typed_shapes = set(i for i, keys in enumerate(shapes) if "_type" in keys)
+
+    def read_uint(self):
+        data = self.data
+        result = 0
+        shift = 0
+        while True:
+            b = data[self.pos]
+            self.pos += 1
+            result |= (b & 0x7F) << shift
+            if b < 0x80:
+                return result
+            shift += 7
+
+    def read_int(self):
+        z = self.read_uint()
+        return z >> 1 if z & 1 == 0 else -((z + 1) >> 1)
+
+    def read_array(self, dtype, n, width=1):
+        arr = np.frombuffer(self.data, dtype=dtype, count=n * width, offset=self.pos)
+        self.pos += arr.nbytes
+        return arr
+
+    def read_dict(self, shape):
+        keys = self.shapes[shape]
+        d = {k: self.read_value() for k in keys}
+        if shape in self.typed_shapes and d["_type"] == "Vector2":
+            return _vector2_hook(d)
+        return d
+
+    def read_value(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == _NONE:
+            return None
+        elif tag == _TRUE:
+            return True
+        elif tag == _FALSE:
+            return False
+        elif tag == _INT:
+            return self.read_int()
+        elif tag == _FLOAT:
+            v = _float_struct.unpack_from(self.data, self.pos)[0]
+            self.pos += 8
+            return v
+        elif tag == _STR:
+            return self.strings[self.read_uint()]
+        elif tag == _VEC:
+            x, y = _vec_struct.unpack_from(self.data, self.pos)
+            self.pos += 16
+            return Vector2(x, y)
+        elif tag == _DICT:
+            return self.read_dict(self.read_uint())
+        else:
+            return self.read_seq(tag)
+
+    def read_seq(self, tag=None):
+        if tag is None:
+            tag = self.data[self.pos]
+            self.pos += 1
+        n = self.read_uint()
+        if tag == _LIST:
+            return [self.read_value() for _ in range(n)]
+        elif tag == _INT_ARRAY:
+            return self.read_array("<i8", n).tolist()
+        elif tag == _FLOAT_ARRAY:
+            return self.read_array("<f8", n).tolist()
+        elif tag == _VEC_ARRAY:
+            return [Vector2(x, y) for x, y in self.read_array("<f8", n, 2).reshape(n, 2).tolist()]
+        elif tag == _BOOL_ARRAY:
+            return [v != 0 for v in self.read_array(np.uint8, n).tolist()]
+        elif tag == _STR_ARRAY:
+            strings = self.strings
+            return [strings[i] for i in self.read_array("<u4", n).tolist()]
+        elif tag == _NONE_ARRAY:
+            return [None] * n
+        elif tag == _TABLE:
+            return self.read_table(n)
+        elif tag == _NESTED:
+            lengths = self.read_array("<u4", n).tolist()
+            flat = self.read_seq()
+            result = []
+            start = 0
+            for length in lengths:
+                result.append(flat[start:start + length])
+                start += length
+            return result
+        raise ValueError(f"Unknown tag {tag}")
+
+    def read_table(self, n):
+        group_count = self.read_uint()
+        if group_count == 1:
+            return self.read_rows(self.read_uint(), n)
+
+        row_shapes = self.read_array("<u4", n).tolist()
+        counts = {}
+        for shape in row_shapes:
+            counts[shape] = counts.get(shape, 0) + 1
+        groups = {}
+        for _ in range(group_count):
+            shape = self.read_uint()
+            groups[shape] = iter(self.read_rows(shape, counts[shape]))
+        return [next(groups[shape]) for shape in row_shapes]
+
+    def read_rows(self, shape, n):
+        keys = self.shapes[shape]
+        columns = [self.read_seq() for _ in keys]
+        if len(keys) == 0:
+            return [{} for _ in range(n)]
+        rows = [dict(zip(keys, values)) for values in zip(*columns)]
+        if shape in self.typed_shapes:
+            rows = [_vector2_hook(r) if r["_type"] == "Vector2" else r for r in rows]
+        return rows
+
+
+class BinaryCodec(SnapshotCodec):
+    """
+    Compact binary format with the same semantics as JSONCodec (keys become strings, tuples become lists).
+
+    Layout: magic, string table, dict shape (key list) table, then the tagged value tree.
+    Strings (config ids, tags, keys, type names) are interned in the string table. Lists of dicts,
+    such as the object list of a snapshot, are stored as tables: the rows of each key layout
+    (in practice each snapshot class) are split into columns and uniform columns are packed as NumPy arrays.
+    """
+
+    name = "binary"
+    magic = b"\x00LBC1"
+
+    def encode(self, data) -> bytes:
+        enc = _Encoder()
+        enc.write_value(data)
+        body = enc.out
+
+        enc.out = bytearray(self.magic)
+        enc.write_uint(len(enc.strings))
+        for s in enc.strings:
+            b = s.encode('utf-8')
+            enc.write_uint(len(b))
+            enc.out += b
+        enc.write_uint(len(enc.shapes))
+        for keys in enc.shapes:
+            enc.write_uint(len(keys))
+            for k in keys:
+                enc.write_uint(enc.strings[k])
+        enc.out += body
+        return bytes(enc.out)
+
+    def decode(self, data: bytes):
+        reader = _Decoder(data, [], [])
+        reader.pos = len(self.magic)
+        strings = []
+        for _ in range(reader.read_uint()):
+            size = reader.read_uint()
+            strings.append(bytes(data[reader.pos:reader.pos + size]).decode('utf-8'))
+            reader.pos += size
+        shapes = []
+        for _ in range(reader.read_uint()):
+            shapes.append(tuple(strings[reader.read_uint()] for _ in range(reader.read_uint())))
+        body = _Decoder(data, strings, shapes)
+        body.pos = reader.pos
+        return body.read_value()
+
+    def matches(self, data: bytes) -> bool:
+        return data[:len(self.magic)] == self.magic
+
+
+register_codec(JSONCodec())
+register_codec(BinaryCodec())
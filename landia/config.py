@@ -5,6 +5,7 @@ from typing import Dict, Any
 class PhysicsConfig(Base):
     def __init__(self):
         self.engine = "grid"
+        self.space_type = "dict" # dict or array (see ArrayGridSpace)
         self.steps_per_second = 60
         self.clock_multiplier = 1
         self.tile_size = 16
@@ -31,6 +32,12 @@ class RendererConfig(Base):
         self.enable_resize = False
         self.info_filter = set()
         self.disable_hud = False
+        self.share_assets = True # use the process wide AssetStore of the asset bundle
+        self.max_scaled_images = 2048
+        self.max_rotated_images = 1024
+        self.max_text_surfaces = 1024
+        self.max_scaled_tiles = 1024 # composited map tiles kept at screen scale by the background
+        self.rotation_step = 1 # degrees, sprite rotations are rounded to it so rotated images can be cached
 
 def __repr__(self) -> str:
     return pprint.pformat(self.__dict__)
@@ -48,6 +55,11 @@ class ClientConfig(Base):
         self.server_port = None
         # TODO: additional customization for observations
         self.include_state_observation = False
+        self.codec = "binary" # snapshot codec used with the server: binary, or json as a fallback
+        self.meta = {}
+        self.poll_snapshots = False # request each snapshot instead of receiving the server's broadcast
+        self.send_rate = 20 # input and ack messages per second while receiving the broadcast
+        self.local_transport = False # read snapshots from the server's shared memory ring, same host only
 
     def __repr__(self) -> str:
         return pprint.pformat(self.__dict__)
@@ -56,7 +68,21 @@ class ServerConfig(Base):
     def __init__(self):
         self.enabled=False
         self.outgoing_chunk_size = 2048
+        self.resend_buffer_size = 1024 # recent replies kept for retransmitting lost chunks
         self.max_unconfirmed_messages_before_new_snapshot = 10
+        self.delta_snapshots = True # send field level object diffs against the last confirmed snapshot
+        # Only send objects within camera distance * interest_distance_scale + interest_margin (pixels), None to disable
+        self.interest_distance_scale = 2.0
+        self.interest_margin = 64
+        # Clients with camera centers in the same grid cell (pixels) get one set of interest objects
+        self.interest_group_size = 64
+        self.snapshot_rate = 20 # snapshots per second broadcast to streaming clients
+        self.client_timeout = 5.0 # seconds without a message before a streaming client is dropped
+        # Publish snapshots to a shared memory ring of this name for clients on the same host, None to disable
+        self.shared_memory_name = None
+        self.shared_memory_slots = 64
+        self.shared_memory_slot_size = 1 << 22
+        self.keyframe_interval = 60 # ticks between shared memory frames holding every object in full, below shared_memory_slots
         self.hostname="localhost"
         self.port = 10001
 
@@ -71,6 +97,10 @@ class GameConfig(Base):
         self.tick_rate = 60
         self.client_only_mode=False
         self.step_mode=False
+        # Tick profiler (see TickProfiler), stats are written to profile_dump_path every profile_dump_every ticks
+        self.profile_ticks = False
+        self.profile_dump_path = None
+        self.profile_dump_every = 1000
 
     def __repr__(self) -> str:
         return pprint.pformat(self.__dict__)
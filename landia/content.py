@@ -3,6 +3,7 @@ from landia.object import GObject
 from .player import Player
 from .asset_bundle import AssetBundle
 from abc import abstractmethod
+from typing import List
 
 
 class Content:
@@ -32,6 +33,24 @@ class Content:
     def get_observation(self,ob:GObject):
         raise NotImplementedError()
 
+    def get_sector_coord_from_pos(self,pos):
+        """
+        Sector used to index objects for remote client interest management
+        """
+        return pos[0] // 1024, pos[1] // 1024
+
+    def get_observations(self,obs:List[GObject]):
+        """
+        Observations for several objects at once, override to batch
+        """
+        return [self.get_observation(ob) for ob in obs]
+
+    def get_symbolic_observations(self, players: List[Player], out):
+        """
+        Rasterizes the camera views of players into out (N, rows, cols, 3) uint8 without a renderer
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def get_observation_space(self):
         raise NotImplementedError()
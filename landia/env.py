@@ -6,12 +6,13 @@ from landia.registry import load_game_content, GameDef
 import gym
 from gym import spaces
 import logging
-from landia.runner import get_game_def, get_player_def, UDPHandler, GameUDPServer, LOG_LEVELS
+from landia.runner import get_game_def, get_player_def, LOG_LEVELS
+from landia.server import GameServer
 from landia.event import InputEvent
 import threading
 import sys
 from landia.player import Player
-from landia.renderer import Renderer
+from landia.renderer import NullRenderer, Renderer
 from landia.utils import gen_id
 from landia import gamectx
 from landia.client import GameClient
@@ -24,6 +25,8 @@ from pyinstrument import Profiler
 from landia.clock import clock
 import os
 import random
+import multiprocessing as mp
+from multiprocessing import shared_memory
 
 class LandiaEnv:
 
@@ -46,8 +49,30 @@ class LandiaEnv:
                  setup_config={},
                  content_overrides={},
                  config_filename="base_config.json",
+                 headless=None,
+                 symbolic_observation=False,
+                 reuse_observation_buffer=False,
                  seed=1):
+        """
+        headless: agent clients get a NullRenderer and never initialize pygame. Defaults to
+        include_state_observation or symbolic_observation since frames are not rendered then, requires one of them when set.
+        The admin client (used by render(), and by render(player_id) to draw headless agents' views) is only created
+        on the first such call.
+        symbolic_observation: RGB observations of the agent cameras rasterized from the tile grid (see
+        TileRasterizer) instead of rendered with pygame, for all agents in one pass. Cameras must not rotate
+        (Camera view_type 1, as the survival content creates them).
+        reuse_observation_buffer: RGB observations are views into observation_buffer (num_agents, rows, cols, 3),
+        overwritten by the next step, instead of new arrays each step.
+        """
         random.seed(seed)
+        if include_state_observation and symbolic_observation:
+            raise ValueError("include_state_observation and symbolic_observation can't be combined")
+        if headless is None:
+            headless = include_state_observation or symbolic_observation
+        elif headless and not (include_state_observation or symbolic_observation):
+            raise ValueError("headless requires include_state_observation or symbolic_observation, agent observations are rendered frames otherwise")
+        self.headless = headless
+        self.symbolic_observation = symbolic_observation
         game_def = get_game_def(
             game_id=game_id,
             enable_server=enable_server,
@@ -95,13 +120,8 @@ class LandiaEnv:
         if not render_to_screen:
             self.admin_player_def.renderer_config.sdl_video_driver = "dummy"
 
-        self.admin_client = GameClient(
-            renderer=Renderer(
-                self.admin_player_def.renderer_config,
-                asset_bundle=self.content.get_asset_bundle()
-            ),
-            config=self.admin_player_def.client_config)
-        self.admin_client.renderer.initialize()
+        # Created by get_admin_client
+        self.admin_client = None
 
         player_def = None
         for agent_id, info in agent_map.items():
@@ -138,11 +158,16 @@ class LandiaEnv:
             player_def.renderer_config.sdl_audio_driver = 'dsp'
             player_def.renderer_config.sound_enabled = False
             player_def.renderer_config.show_console = False
+            if not render_to_screen:
+                player_def.renderer_config.sdl_video_driver = "dummy"
 
-            renderer = Renderer(
-                player_def.renderer_config,
-                asset_bundle=self.content.get_asset_bundle()
-            )
+            if headless:
+                renderer = NullRenderer(player_def.renderer_config)
+            else:
+                renderer = Renderer(
+                    player_def.renderer_config,
+                    asset_bundle=self.content.get_asset_bundle()
+                )
 
             # print(player_def.client_config)
             client = GameClient(
@@ -157,13 +182,23 @@ class LandiaEnv:
         self.action_spaces = {agent_id: self.content.get_action_space(
         ) for agent_id in self.agent_clients.keys()}
         if include_state_observation:
-            self.observation_spaces = {agent_id: self.content.get_observation_space(agent_id
-                                                                                    ) for agent_id in self.agent_clients.keys()}
+            self.observation_spaces = {agent_id: self.content.get_observation_space(
+            ) for agent_id in self.agent_clients.keys()}
         else:
             # TODO: Not working at momement
             self.observation_spaces = {agent_id: spaces.Box(low=0, high=255, shape=(
                 resolution[0], resolution[1], 3)) for agent_id in self.agent_clients.keys()}
 
+        # RGB observations of a step: pixel observations use the row of the agent (in agent_clients order),
+        # symbolic ones fill the first rows in the order of the agents observed
+        self.reuse_observation_buffer = reuse_observation_buffer
+        self.observation_buffer = None
+        if symbolic_observation or (reuse_observation_buffer and not include_state_observation):
+            self.observation_buffer = np.zeros((len(self.agent_clients), resolution[1], resolution[0], 3), dtype=np.uint8)
+        if symbolic_observation:
+            self.observation_spaces = {agent_id: spaces.Box(low=0, high=255, shape=(
+                resolution[1], resolution[0], 3), dtype=np.uint8) for agent_id in self.agent_clients.keys()}
+
         self.step_counter = 0
 
         self.ob = None
@@ -173,15 +208,11 @@ class LandiaEnv:
         self.first_start = True
 
         if game_def.server_config.enabled:
-            self.server = GameUDPServer(
+            self.server = GameServer(
                 conn=(game_def.server_config.hostname,
                       game_def.server_config.port),
-                handler=UDPHandler,
-                config=game_def.server_config)
-
-            server_thread = threading.Thread(target=self.server.serve_forever)
-            server_thread.daemon = True
-            server_thread.start()
+                config=game_def.server_config).start()
+            gamectx.set_server(self.server)
             logging.info(
                 f"Server started at {game_def.server_config.hostname} port {game_def.server_config.port}")
 
@@ -212,19 +243,44 @@ class LandiaEnv:
         rewards = {}
         infos = {}
 
-        for agent_id, client in self.agent_clients.items():
+        # State observations are built together once all step info is collected
+        state_obs_objs = {}
+        symbolic_players = {}
+        for i, (agent_id, client) in enumerate(self.agent_clients.items()):
             ob, reward, done, info, skip = self.content.get_step_info(
-                player=client.player, include_state_observation=client.config.include_state_observation)
+                player=client.player, include_state_observation=False)
             if skip:
                 continue
-            if not client.config.include_state_observation:
+            if client.config.include_state_observation:
+                # Remote clients have no player until the server's first reply, their observation is None
+                if client.player is not None:
+                    state_obs_objs[agent_id] = gamectx.object_manager.get_by_id(client.player.get_object_id())
+            elif self.symbolic_observation:
+                if client.player is not None:
+                    symbolic_players[agent_id] = client.player
+            else:
                 client.render()
-                ob = client.get_rgb_array()
+                if self.reuse_observation_buffer:
+                    ob = client.get_rgb_array(out=self.observation_buffer[i])
+                else:
+                    ob = client.get_rgb_array()
             obs[agent_id] = ob
             dones[agent_id] = done
             rewards[agent_id] = reward
             infos[agent_id] = info
 
+        if len(state_obs_objs) > 0:
+            state_obs = self.content.get_observations(list(state_obs_objs.values()))
+            for agent_id, ob in zip(state_obs_objs.keys(), state_obs):
+                obs[agent_id] = ob
+
+        if len(symbolic_players) > 0:
+            symbolic_obs = self.content.get_symbolic_observations(
+                list(symbolic_players.values()),
+                out=self.observation_buffer[:len(symbolic_players)])
+            for agent_id, ob in zip(symbolic_players.keys(), symbolic_obs):
+                obs[agent_id] = ob if self.reuse_observation_buffer else ob.copy()
+
         dones['__all__'] = self.content.reset_required()
 
         self.step_counter += 1
@@ -240,13 +296,32 @@ class LandiaEnv:
     def runtime_config_update(self):
         return True, "msg"
 
+    def get_admin_client(self) -> GameClient:
+        if self.admin_client is None:
+            self.admin_client = GameClient(
+                renderer=Renderer(
+                    self.admin_player_def.renderer_config,
+                    asset_bundle=self.content.get_asset_bundle()
+                ),
+                config=self.admin_player_def.client_config)
+            self.admin_client.renderer.initialize()
+        return self.admin_client
+
     def render(self, mode=None, player_id=None):
         if player_id is None:
-            self.admin_client.run_step()
-            self.admin_client.render()
-            return self.admin_client.get_rgb_array()
+            admin_client = self.get_admin_client()
+            admin_client.run_step()
+            admin_client.render()
+            return admin_client.get_rgb_array()
         else:
             client = self.agent_clients[player_id]
+            if isinstance(client.renderer, NullRenderer):
+                # Headless agents draw nothing, render the player's view with the admin renderer instead
+                renderer = self.get_admin_client().renderer
+                renderer.process_frame(player=client.player)
+                self.content.post_process_frame(player=client.player, renderer=renderer)
+                renderer.render_frame()
+                return renderer.get_last_frame()
             return client.get_rgb_array()
 
     def reset(self) -> Dict[str, Any]:
@@ -257,8 +332,175 @@ class LandiaEnv:
 
     def close(self):
         if self.server is not None:
-            self.server.shutdown()
-            self.server.server_close()
+            gamectx.set_server(None)
+            self.server.close()
+            self.server = None
+
+
+def _vector_env_worker(index, conn, num_envs, env_kwargs, seed):
+    """
+    Runs a single LandiaEnv inside a worker process. Observations are written into
+    the shared memory buffer owned by VectorLandiaEnv, everything else goes back over the pipe.
+    """
+    env = LandiaEnv(seed=seed, **env_kwargs)
+    agent_ids = env.players
+    obs = env.reset()
+
+    # Use an actual observation to describe the buffer, spaces don't always match the arrays
+    sample = next((ob for ob in obs.values() if ob is not None), None)
+    if sample is None:
+        space = env.observation_spaces[agent_ids[0]]
+        sample = np.zeros(space.shape, dtype=space.dtype)
+    sample = np.asarray(sample)
+    conn.send((agent_ids, sample.shape, sample.dtype.str, env.action_spaces[agent_ids[0]].n))
+
+    shm = shared_memory.SharedMemory(name=conn.recv())
+    obs_buffer = np.ndarray(
+        (num_envs, len(agent_ids)) + sample.shape,
+        dtype=sample.dtype,
+        buffer=shm.buf)[index]
+
+    def write_obs(obs):
+        valid = np.zeros(len(agent_ids), dtype=bool)
+        for i, agent_id in enumerate(agent_ids):
+            ob = obs.get(agent_id)
+            if ob is None:
+                obs_buffer[i] = 0
+            else:
+                obs_buffer[i] = ob
+                valid[i] = True
+        return valid
+
+    try:
+        while True:
+            cmd, data = conn.recv()
+            if cmd == "reset":
+                obs = env.reset()
+                conn.send(write_obs(obs))
+            elif cmd == "step":
+                obs, rewards, dones, infos = env.step(
+                    {agent_id: int(data[i]) for i, agent_id in enumerate(agent_ids)})
+                reward_arr = np.array([rewards.get(a) or 0 for a in agent_ids], dtype=np.float32)
+                done_arr = np.array([bool(dones.get(a, False)) for a in agent_ids], dtype=bool)
+                done_all = dones.get('__all__', False)
+                if done_all:
+                    # Auto reset so the batch never stalls on a finished world
+                    obs = env.reset()
+                valid = write_obs(obs)
+                conn.send((valid, reward_arr, done_arr, done_all, [infos.get(a) for a in agent_ids]))
+            elif cmd == "close":
+                break
+    finally:
+        del obs_buffer
+        shm.close()
+        env.close()
+        conn.close()
+
+
+class VectorLandiaEnv:
+    """
+    Runs num_envs independent LandiaEnv worlds, each in its own worker process (gamectx and clock are
+    process wide singletons so a process can only host one world).
+
+    Observations are stacked into a shared memory array of shape (num_envs, num_agents, *obs_shape) that the
+    workers write into directly. Worlds that finish an episode are reset automatically, the returned
+    observation for that world is then the first observation of the new episode.
+    """
+
+    def __init__(self,
+                 num_envs=2,
+                 env_kwargs={},
+                 seed=1,
+                 start_method="spawn"):
+        self.num_envs = num_envs
+        ctx = mp.get_context(start_method)
+
+        self.conns = []
+        self.processes = []
+        for i in range(num_envs):
+            parent_conn, child_conn = ctx.Pipe()
+            p = ctx.Process(
+                target=_vector_env_worker,
+                args=(i, child_conn, num_envs, env_kwargs, seed + i),
+                daemon=True)
+            p.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.processes.append(p)
+
+        specs = [conn.recv() for conn in self.conns]
+        self.agent_ids, obs_shape, dtype_str, num_actions = specs[0]
+        self.num_agents = len(self.agent_ids)
+        self.observation_shape = tuple(obs_shape)
+        self.observation_dtype = np.dtype(dtype_str)
+        self.action_space = spaces.Discrete(num_actions)
+
+        size = int(np.prod((num_envs, self.num_agents) + self.observation_shape)) * self.observation_dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.observations = np.ndarray(
+            (num_envs, self.num_agents) + self.observation_shape,
+            dtype=self.observation_dtype,
+            buffer=self._shm.buf)
+        for conn in self.conns:
+            conn.send(self._shm.name)
+
+        self.valid = np.zeros((num_envs, self.num_agents), dtype=bool)
+        self.rewards = np.zeros((num_envs, self.num_agents), dtype=np.float32)
+        self.dones = np.zeros((num_envs, self.num_agents), dtype=bool)
+        self.step_counter = 0
+        self.closed = False
+
+    def reset(self):
+        """
+        Resets all worlds and returns the stacked observations. The returned array is the shared buffer
+        itself and is overwritten by the next call to step/reset.
+        """
+        for conn in self.conns:
+            conn.send(("reset", None))
+        for i, conn in enumerate(self.conns):
+            self.valid[i] = conn.recv()
+        return self.observations
+
+    def step(self, actions):
+        """
+        :param actions: int array like of shape (num_envs, num_agents)
+        :return: observations (num_envs, num_agents, *obs_shape), rewards (num_envs, num_agents),
+                 dones (num_envs, num_agents), infos (list of dicts, one per world)
+        """
+        actions = np.asarray(actions)
+        for i, conn in enumerate(self.conns):
+            conn.send(("step", actions[i]))
+
+        infos = []
+        for i, conn in enumerate(self.conns):
+            valid, rewards, dones, done_all, agent_infos = conn.recv()
+            self.valid[i] = valid
+            self.rewards[i] = rewards
+            self.dones[i] = dones
+            infos.append({'__all__': done_all, 'valid': valid, 'agents': agent_infos})
+
+        self.step_counter += 1
+        return self.observations, self.rewards, self.dones, infos
+
+    def sample_actions(self):
+        return np.random.randint(0, self.action_space.n, size=(self.num_envs, self.num_agents))
+
+    def close(self):
+        if self.closed:
+            return
+        for conn in self.conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, EOFError):
+                pass
+        for p in self.processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        del self.observations
+        self._shm.close()
+        self._shm.unlink()
+        self.closed = True
 
 
 class LandiaEnvSingle(gym.Env):
@@ -396,6 +638,8 @@ def multi_agent_run(resolution, admin_resolution, args):
         profiler.stop()
         logging.info(profiler.output_text(
             unicode=True, color=True, show_all=True))
+    env.close()
+    return steps_per_sec
 
 
 def single_agent_run(resolution, admin_resolution, args):
@@ -1,6 +1,7 @@
 
 from landia.object import GObject
 from typing import Any, Dict, List
+import heapq
 from .utils import gen_id
 from .common import Base, Vector2
 from .clock import clock
@@ -61,7 +62,66 @@ class ObjectEvent(Event):
         return self.id
 
 
-class PeriodicEvent(Event):
+class TimerEvent(Event):
+    """
+    Event that only needs processing from a known tick on, see EventScheduler
+    """
+
+    def get_due_tick(self):
+        raise NotImplementedError()
+
+
+class EventScheduler:
+    """
+    Min-heap of (due tick, sequence, event id) so only due timers are visited.
+
+    Cancelling or re-arming leaves the old heap entry in place, entries whose sequence is no longer
+    current for the event are skipped when popped. The heap is rebuilt once most entries are stale.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.current_seq: Dict[str, int] = {}
+        self.seq = 0
+
+    def schedule(self, event_id, due_tick):
+        self.seq += 1
+        self.current_seq[event_id] = self.seq
+        heapq.heappush(self.heap, (due_tick, self.seq, event_id))
+        if len(self.heap) > 64 and len(self.heap) > 2 * len(self.current_seq):
+            self.compact()
+
+    def cancel(self, event_id):
+        self.current_seq.pop(event_id, None)
+
+    def compact(self):
+        self.heap = [entry for entry in self.heap if self.current_seq.get(entry[2]) == entry[1]]
+        heapq.heapify(self.heap)
+
+    def pop_due(self, tick) -> List[str]:
+        """
+        Ids of events due at or before tick, earliest first (ties in scheduling order). They are no longer scheduled.
+        """
+        heap = self.heap
+        current_seq = self.current_seq
+        due = []
+        while len(heap) > 0 and heap[0][0] <= tick:
+            _, seq, event_id = heapq.heappop(heap)
+            if current_seq.get(event_id) == seq:
+                del current_seq[event_id]
+                due.append(event_id)
+        return due
+
+    def next_due_tick(self):
+        while len(self.heap) > 0 and self.current_seq.get(self.heap[0][2]) != self.heap[0][1]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if len(self.heap) > 0 else None
+
+    def __len__(self):
+        return len(self.current_seq)
+
+
+class PeriodicEvent(TimerEvent):
 
     def __init__(self,
                 func, 
@@ -80,17 +140,22 @@ class PeriodicEvent(Event):
     def get_id(self):
         return self.id
 
+    def get_due_tick(self):
+        if self.last_run is None:
+            return clock.get_ticks()
+        return self.last_run + self.execution_step_interval
+
     def run(self):
         game_step = clock.get_ticks()
         new_events = []
-        remove_event = None
+        remove_event = False
         if self.last_run is None or self.last_run + self.execution_step_interval <= game_step:
             new_events, remove_event = self.func(self,self.data)
             self.last_run = game_step
 
-        return [], False
+        return new_events or [], bool(remove_event)
 
-class DelayedEvent(Event):
+class DelayedEvent(TimerEvent):
 
     def __init__(self,
                 func, 
@@ -108,6 +173,9 @@ class DelayedEvent(Event):
     def get_id(self):
         return self.id
 
+    def get_due_tick(self):
+        return self.execution_step
+
     def run(self):
         game_step = clock.get_ticks()
 
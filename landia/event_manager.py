@@ -2,20 +2,46 @@ from typing import Any, Dict, List
 from .utils import gen_id
 from .common import Base, Vector2
 
-from .event import Event, InputEvent, build_event_from_dict
+from .event import Event, EventScheduler, InputEvent, TimerEvent, build_event_from_dict
 
 
 class EventManager:
     """
-    Contains references to all game events
+    Contains references to all game events, also kept in a queue per event type (in order added).
+    TimerEvents are also scheduled on their due tick.
     """
 
     def __init__(self):
 
         self.events: Dict[str, Event] = {}
+        self.queues: Dict[type, Dict[str, Event]] = {}
+        self.scheduler = EventScheduler()
 
     def add_event(self, e: Event):
         self.events[e.get_id()] = e
+        queue = self.queues.get(type(e))
+        if queue is None:
+            queue = {}
+            self.queues[type(e)] = queue
+        queue[e.get_id()] = e
+        if isinstance(e, TimerEvent):
+            self.scheduler.schedule(e.get_id(), e.get_due_tick())
+
+    def reschedule_event(self, e: TimerEvent, min_tick=None):
+        """
+        Re-arms a timer event at its current due tick (no earlier than min_tick), call after changing it
+        """
+        if e.get_id() in self.events:
+            due_tick = e.get_due_tick()
+            if min_tick is not None and due_tick < min_tick:
+                due_tick = min_tick
+            self.scheduler.schedule(e.get_id(), due_tick)
+
+    def pop_due_events(self, tick) -> List[TimerEvent]:
+        """
+        Timer events due at or before tick. They stay in the manager but are unscheduled until re-armed.
+        """
+        return [self.events[event_id] for event_id in self.scheduler.pop_due(tick) if event_id in self.events]
 
     def add_events(self, events: List[Event]):
         for e in events:
@@ -27,14 +53,25 @@ class EventManager:
     def get_event_dict(self):
         return self.events
 
+    def get_events_by_type(self, cls) -> List[Event]:
+        queue = self.queues.get(cls)
+        if queue is None:
+            return []
+        return list(queue.values())
+
     def get_event_by_id(self, id):
         return self.events[id]
 
     def remove_event_by_id(self, id):
-        self.events.pop(id,None)
+        e = self.events.pop(id,None)
+        if e is not None:
+            self.queues[type(e)].pop(id,None)
+            self.scheduler.cancel(id)
 
     def clear(self):
         self.events: Dict[str, Event] = {}
+        self.queues: Dict[type, Dict[str, Event]] = {}
+        self.scheduler = EventScheduler()
 
     def get_snapshot(self):
         events = list(self.get_events())
@@ -44,11 +81,9 @@ class EventManager:
         return results
 
     def get_client_snapshot(self):
-        events = list(self.get_events())
         results = []
-        for e in events:
-            if type(e) == InputEvent:
-                results.append(e.get_snapshot())
+        for e in self.get_events_by_type(InputEvent):
+            results.append(e.get_snapshot())
         return results
 
     def load_snapshot(self,data):
@@ -58,7 +93,7 @@ class EventManager:
                 self.events[k].load_snapshot(e_data)
             else:
                 try:
-                    self.events[k] = build_event_from_dict(e_data)
+                    self.add_event(build_event_from_dict(e_data))
                 except Exception as e:
                     print(e_data)
                     print(e)
\ No newline at end of file
@@ -1,14 +1,16 @@
 import time
-from .common import register_base_cls, Base
+from .common import register_base_cls, Base, Vector2
 from .content import Content
 import sys
 import pygame
 from .event import RemoveObjectEvent
 from .event import (AdminCommandEvent, ContentEvent, Event, ObjectEvent,
-                    PeriodicEvent, PositionChangeEvent, ViewEvent, SoundEvent, DelayedEvent, InputEvent)
+                    PeriodicEvent, PositionChangeEvent, ViewEvent, SoundEvent, DelayedEvent, InputEvent, TimerEvent)
 from .physics_engine import GridPhysicsEngine
 from .player_manager import PlayerManager
 from .object_manager import GObjectManager
+from .interest import InterestIndex
+from .metrics import TickProfiler
 from .event_manager import EventManager
 from .clock import clock
 import json
@@ -35,6 +37,7 @@ class GameContext:
 
         self.object_manager: GObjectManager = None
         self.physics_engine: GridPhysicsEngine = None
+        self.interest_index: InterestIndex = None
         self.player_manager: PlayerManager = None
         self.event_manager: EventManager = None
         self.content: Content = None
@@ -46,7 +49,13 @@ class GameContext:
         self.input_event_callback = lambda event: []
         self.remote_clients: Dict[str, Any] = {}
         self.local_clients = []
+        self.server = None
         self.data = {}
+        self.event_handlers = {}
+        self.event_listeners = {}
+        self._event_handler_seq = 0
+        self._event_type_order = {}
+        self.profiler = TickProfiler()
 
     def initialize(self,
                    game_def: GameDef = None,
@@ -56,6 +65,7 @@ class GameContext:
         self.config = game_def.game_config
         self.physics_config = game_def.physics_config
         self.event_manager = EventManager()
+        self.register_default_event_handlers()
         self.object_manager = GObjectManager()
         self.physics_engine = GridPhysicsEngine(
             self.physics_config,
@@ -66,8 +76,13 @@ class GameContext:
         self.tick_rate = self.config.tick_rate
         clock.set_tick_rate(self.tick_rate)
         self.step_counter = 0
+        if self.config.profile_ticks:
+            self.profiler.enable(dump_path=self.config.profile_dump_path, dump_every=self.config.profile_dump_every)
 
         self.content = content
+        self.interest_index = InterestIndex(self.content.get_sector_coord_from_pos)
+        self.physics_engine.add_position_listener(self.interest_index.update_obj)
+        self.object_manager.add_listener(self.interest_index.update_membership)
 
         self.content.load(self.config.client_only_mode)
 
@@ -80,6 +95,12 @@ class GameContext:
     def add_local_client(self, client):
         self.local_clients.append(client)
 
+    def set_server(self, server):
+        """
+        Server whose queued requests are applied and answered by run_step, None to detach
+        """
+        self.server = server
+
     def get_remote_client(self, client_id):
         from .client import RemoteClient
         client = self.remote_clients.get(client_id, None)
@@ -95,22 +116,47 @@ class GameContext:
         register_base_cls(cls)
 
     # Snapshot Methods
-    def create_snapshot_for_client(self, client):
-        from .client import RemoteClient
-        client: RemoteClient = client
-        snapshot_timestamp = clock.get_ticks()
-        om_snapshot = self.object_manager.get_snapshot_update(
-            client.last_snapshot_time_ms)
-        # om_snapshot = self.object_manager.get_snapshot_full()
-        # TODO: Only send relevent Players
-        pm_snapshot = self.player_manager.get_snapshot()
-        eventsnapshot = client.pull_events_snapshot()
-        return snapshot_timestamp, {
-            'om': om_snapshot,
-            'pm': pm_snapshot,
-            'em': eventsnapshot,
-            'timestamp': snapshot_timestamp,
-        }
+    def get_view_distance(self, camera):
+        """
+        Camera distance clamped to the 5 to 100 tile range the Renderer draws
+        """
+        tile_size = self.physics_engine.tile_size
+        return min(max(camera.get_distance(), tile_size * 5), tile_size * 100)
+
+    def get_interest_group(self, client, distance_scale, margin, cell_size):
+        """
+        Clients whose camera centers fall in the same cell_size grid cell and who have the same view distance form
+        an interest group, all sent the objects of get_interest_group_objects. Returns None if the client has no camera.
+        """
+        player = self.player_manager.get_player(client.player_id)
+        camera = None if player is None else player.get_camera()
+        center = None if camera is None else camera.get_center()
+        if center is None:
+            return None
+        radius = self.get_view_distance(camera) * distance_scale + margin
+        return int(center.x // cell_size), int(center.y // cell_size), cell_size, radius
+
+    def get_interest_group_objects(self, group):
+        """
+        Ids of the objects within the group's radius of any point of its cell, and of all objects without a position
+        """
+        cell_x, cell_y, cell_size, radius = group
+        center = Vector2((cell_x + 0.5) * cell_size, (cell_y + 0.5) * cell_size)
+        return self.get_objects_near(center, radius + cell_size / 2)
+
+    def get_objects_near(self, center, radius):
+        """
+        Ids of the objects within radius of center on both axes, and of all objects without a position
+        """
+        obj_ids = set()
+        for obj_id in self.interest_index.get_objs_in_region(center, radius):
+            obj = self.object_manager.get_by_id(obj_id)
+            pos = None if obj is None else obj.get_position()
+            if pos is not None and abs(pos.x - center.x) <= radius and abs(pos.y - center.y) <= radius:
+                obj_ids.add(obj_id)
+        objects = self.object_manager.get_objects()
+        obj_ids.update(obj_id for obj_id in self.interest_index.unpositioned if obj_id in objects)
+        return obj_ids
 
     def create_full_snapshot(self):
 
@@ -130,12 +176,39 @@ class GameContext:
             obj_id = odata['data']['id']
             current_obj = self.object_manager.get_by_id(obj_id)
             if current_obj is None:
+                if odata.get('_delta'):
+                    # Diff without a local copy to apply it to
+                    continue
                 obj = Base.create_from_snapshot(odata)
                 self.add_object(obj)
             else:
                 current_obj.load_snapshot(odata)
+                if 'position' in odata['data']:
+                    self._sync_space_position(current_obj)
+
+    def _sync_space_position(self, obj: GObject):
+        """
+        Keeps the space coord of an object moved by a snapshot in sync, window queries rely on it
+        """
+        space = self.physics_engine.space
+        if obj.position is None:
+            space.remove_obj(obj.get_id())
+            return
+        coord = self.physics_engine.vec_to_coord(obj.position)
+        if space.obj_to_coord.get(obj.get_id()) != coord:
+            space.move_obj_to(coord, obj)
+
+    def remove_object_snapshot(self, obj_ids):
+        # Objects that left the client's area of interest, not removed from the game
+        for obj_id in obj_ids:
+            obj = self.object_manager.get_by_id(obj_id)
+            if obj is not None:
+                self.physics_engine.remove_object(obj)
+                self.object_manager.remove_by_id(obj_id)
 
     def load_snapshot(self, snapshot):
+        if 'rm' in snapshot:
+            self.remove_object_snapshot(snapshot['rm'])
         if 'om' in snapshot:
             self.load_object_snapshot(snapshot['om'])
         if 'pm' in snapshot:
@@ -190,26 +263,35 @@ class GameContext:
                 objs.append(obj)
         return objs
 
+    def get_objects_in_window(self,col_min,row_min,col_max,row_max)->List[GObject]:
+        """
+        Objects inside the coord window (inclusive), rows from row_max down to row_min, columns left to right
+        """
+        objs = []
+        for obj_id in self.physics_engine.space.get_objs_in_window(col_min,row_min,col_max,row_max):
+            obj = self.object_manager.get_by_id(obj_id)
+            if obj is not None:
+                objs.append(obj)
+        return objs
+
     # Event Methods
     def add_event(self, e: Event):
         self.event_manager.add_event(e)
         if e.is_client_event:
+            if self.server is not None:
+                self.server.add_client_event(e)
             for client_id, client in self.remote_clients.items():
-                client.add_event(e)
+                if not client.shared_memory:
+                    client.add_event(e)
 
     def remove_all_events(self):
         self.event_manager.clear()
 
     def get_sound_events(self):
-        events_to_remove = []
         sound_ids = []
-        for e in self.event_manager.get_events():
-            if type(e) == SoundEvent:
-                e: SoundEvent = e
-                sound_ids.append(e.sound_id)
-                events_to_remove.append(e)
-
-        for e in events_to_remove:
+        for e in self.event_manager.get_events_by_type(SoundEvent):
+            e: SoundEvent = e
+            sound_ids.append(e.sound_id)
             self.event_manager.remove_event_by_id(e.get_id())
         return sound_ids
 
@@ -230,65 +312,98 @@ class GameContext:
             pass
             # print(f"****Object not found, not deleting {clock.get_ticks()} {e.object_id}")
 
-        return True
+        return []
 
     def run_pre_event_processing(self):
         if self.pre_event_callback is not None:
             events = self.pre_event_callback()
             self.event_manager.add_events(events)
 
+    def register_event_handler(self, event_cls, handler, priority=0):
+        """
+        Sets the handler for events of exactly event_cls. handler(e) returns (new_events, remove_event).
+        Event types are processed in (priority, registration order), events of a type in the order they were added.
+        Events without a handler stay in the event manager.
+        """
+        self.event_handlers[event_cls] = (priority, self._event_handler_seq, handler)
+        self._event_handler_seq += 1
+        self._event_type_order = {
+            cls: i for i, cls in enumerate(sorted(self.event_handlers.keys(), key=lambda c: self.event_handlers[c][:2]))}
+
+    def add_event_listener(self, event_cls, listener):
+        """
+        listener(e) is called after the handler of each event_cls event and may return new events
+        """
+        self.event_listeners.setdefault(event_cls, []).append(listener)
+
+    def remove_event_listener(self, event_cls, listener):
+        listeners = self.event_listeners.get(event_cls, [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+    def register_default_event_handlers(self):
+        self.event_handlers = {}
+        self.event_listeners = {}
+        self._event_handler_seq = 0
+
+        def consume(func):
+            return lambda e: (func(e), True)
+
+        self.register_event_handler(InputEvent, consume(lambda e: self.content.process_input_event(e)), priority=0)
+        self.register_event_handler(AdminCommandEvent, consume(lambda e: self.content.process_admin_command_event(e)), priority=10)
+        self.register_event_handler(ContentEvent, consume(lambda e: self.content.process_event(e)), priority=20)
+        self.register_event_handler(ViewEvent, consume(self._process_view_event), priority=30)
+        self.register_event_handler(ObjectEvent, consume(self._process_object_event), priority=40)
+        self.register_event_handler(DelayedEvent, lambda e: e.run(), priority=50)
+        self.register_event_handler(PeriodicEvent, lambda e: e.run(), priority=60)
+        self.register_event_handler(PositionChangeEvent, consume(self._process_position_change_event), priority=70)
+        self.register_event_handler(RemoveObjectEvent, consume(self._process_remove_object_event), priority=80)
+
+    def _process_object_event(self, e: ObjectEvent):
+        obj = self.get_object_by_id(e.obj_id)
+        func = getattr(obj, e.obj_method_name)
+        return func(*e.args, **e.kwargs)
+
+    def _process_position_change_event(self, e: PositionChangeEvent):
+        self.content.process_position_change_event(e)
+        return []
+
+    def _order_events(self, events):
+        return sorted(
+            [e for e in events if type(e) in self._event_type_order],
+            key=lambda e: self._event_type_order[type(e)])
+
     def run_event_processing(self):
         # Main Event Processing Bus
-        all_new_events = []
-        events_to_remove = []
-        events_set = set(self.event_manager.get_events())
-        while len(events_set) > 0:
-            e = events_set.pop()
-            new_events = []
-            if type(e) == InputEvent:
-                new_events = self.content.process_input_event(e)
-                events_to_remove.append(e)
-            elif type(e) == AdminCommandEvent:
-                new_events = self.content.process_admin_command_event(e)
-                events_to_remove.append(e)
-            elif type(e) == ContentEvent:
-                new_events = self.content.process_event(e)
-                events_to_remove.append(e)
-            elif type(e) == ViewEvent:
-                new_events = self._process_view_event(e)
-                events_to_remove.append(e)
-            elif type(e) == RemoveObjectEvent:
-                self._process_remove_object_event(e)
-                events_to_remove.append(e)
-            elif type(e) == DelayedEvent:
-                e: DelayedEvent = e
-                new_events, remove_event = e.run()
-                if remove_event:
-                    events_to_remove.append(e)
-            elif type(e) == PeriodicEvent:
-                e: PeriodicEvent = e
-                new_events, remove_event = e.run()
+        # Timer events are only visited once due, the rest come from their type queues
+        tick = clock.get_ticks()
+        events = []
+        for event_cls in self._event_type_order.keys():
+            if not issubclass(event_cls, TimerEvent):
+                events.extend(self.event_manager.get_events_by_type(event_cls))
+        events = self._order_events(events + self.event_manager.pop_due_events(tick))
+        count_event = self.profiler.count_event if self.profiler.enabled else None
+
+        # Events created while processing are handled in the same tick, after the current batch
+        while len(events) > 0:
+            created = []
+            for e in events:
+                if count_event is not None:
+                    count_event(e)
+                _, _, handler = self.event_handlers[type(e)]
+                new_events, remove_event = handler(e)
+                new_events = list(new_events or [])
+                for listener in self.event_listeners.get(type(e), []):
+                    new_events.extend(listener(e) or [])
                 if remove_event:
-                    events_to_remove.append(e)
-            elif type(e) == PositionChangeEvent:
-                e: PositionChangeEvent = e
-                self.content.process_position_change_event(e)
-                events_to_remove.append(e)
-            elif type(e) == ObjectEvent:
-                e: ObjectEvent = e
-                obj = self.get_object_by_id(e.obj_id)
-                func = getattr(obj, e.obj_method_name)
-                # TODO: Add listeners
-                new_events = func(*e.args, **e.kwargs)
-                events_to_remove.append(e)
-            for new_e in new_events:
-                events_set.add(new_e)
-            all_new_events.extend(new_events)
-
-        self.event_manager.add_events(all_new_events)
-
-        for e in events_to_remove:
-            self.event_manager.remove_event_by_id(e.get_id())
+                    self.event_manager.remove_event_by_id(e.get_id())
+                elif isinstance(e, TimerEvent):
+                    # not before the next tick, so a kept timer can't run again in this one
+                    self.event_manager.reschedule_event(e, min_tick=tick + 1)
+                self.event_manager.add_events(new_events)
+                created.extend(new_events)
+            events = self._order_events(
+                [e for e in created if not isinstance(e, TimerEvent)] + self.event_manager.pop_due_events(tick))
 
     # Client Steps
     def process_client_step(self):
@@ -348,13 +463,27 @@ class GameContext:
         self.content.update()
 
     def run_step(self):
-
+        # update includes the content's objects and controllers phases
+        profiler = self.profiler
+        step_start = start = profiler.start()
+        # Remote client requests are applied before the events and answered after the update, the only points
+        # where the server touches the game state
+        if self.server is not None:
+            self.server.process_requests()
+            start = profiler.record("requests", start)
         self.run_event_processing()
+        start = profiler.record("events", start)
         if not self.config.client_only_mode:
             self.run_physics_processing()
+            start = profiler.record("physics", start)
             self.run_update()
+            profiler.record("update", start)
+        if self.server is not None:
+            self.server.send_snapshots()
         self.tick()
         self.step_counter += 1
+        profiler.record("step", step_start)
+        profiler.end_tick(self.object_manager)
 
     def run(self):
         done = True
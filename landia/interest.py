@@ -0,0 +1,69 @@
+from typing import Callable, Dict, Set, Tuple
+
+from .common import Vector2
+from .object import GObject
+
+
+class InterestIndex:
+    """
+    Sector index of positioned objects used to pick the objects relevant to a remote client, and the set of
+    objects without a position. Kept up to date by a physics engine position listener and an object manager
+    listener, objects created but never placed only reach the latter.
+    """
+
+    def __init__(self, sector_fn: Callable[[Vector2], Tuple[int, int]]):
+        self.sector_fn = sector_fn
+        self.sector_to_objs: Dict[Tuple[int, int], Set[str]] = {}
+        self.obj_to_sector: Dict[str, Tuple[int, int]] = {}
+        self.unpositioned: Set[str] = set()
+
+    def get_sector(self, pos):
+        sector = self.sector_fn(pos)
+        return int(sector[0]), int(sector[1])
+
+    def update_obj(self, obj: GObject, new_pos):
+        obj_id = obj.get_id()
+        if new_pos is None:
+            self.unpositioned.add(obj_id)
+        else:
+            self.unpositioned.discard(obj_id)
+        new_sector = None if new_pos is None else self.get_sector(new_pos)
+        old_sector = self.obj_to_sector.get(obj_id)
+        if old_sector == new_sector:
+            return
+        if old_sector is not None:
+            obj_ids = self.sector_to_objs[old_sector]
+            obj_ids.discard(obj_id)
+            if len(obj_ids) == 0:
+                del self.sector_to_objs[old_sector]
+            del self.obj_to_sector[obj_id]
+        if new_sector is not None:
+            self.sector_to_objs.setdefault(new_sector, set()).add(obj_id)
+            self.obj_to_sector[obj_id] = new_sector
+
+    def remove_obj(self, obj: GObject):
+        self.update_obj(obj, None)
+        self.unpositioned.discard(obj.get_id())
+
+    def update_membership(self, obj: GObject, added):
+        if added:
+            self.update_obj(obj, obj.get_position())
+        else:
+            self.remove_obj(obj)
+
+    def get_objs_in_region(self, center: Vector2, radius: float):
+        """
+        Ids of indexed objects in the sectors overlapping the square center +/- radius
+        """
+        smin = self.get_sector(Vector2(center.x - radius, center.y - radius))
+        smax = self.get_sector(Vector2(center.x + radius, center.y + radius))
+        obj_ids = set()
+        for sx in range(smin[0], smax[0] + 1):
+            for sy in range(smin[1], smax[1] + 1):
+                sector_objs = self.sector_to_objs.get((sx, sy))
+                if sector_objs is not None:
+                    obj_ids.update(sector_objs)
+        return obj_ids
+
+    def is_indexed(self, obj_id):
+        return obj_id in self.obj_to_sector
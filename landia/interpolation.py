@@ -0,0 +1,80 @@
+import math
+from typing import List
+
+import numpy as np
+from pygame import Vector2
+
+from .common import TimeLoggingContainer
+
+
+def get_xy(v):
+    if v is None:
+        return (math.nan, math.nan)
+    return (v[0], v[1])
+
+
+class InterpolationFrame:
+    """
+    Ids, positions, view positions and angles of the objects in one snapshot. Fields missing from the snapshot
+    (None, or left out of a delta) are NaN.
+    """
+    __slots__ = ["ids", "positions", "view_positions", "angles"]
+
+    def __init__(self, ids, positions, view_positions, angles):
+        self.ids = ids
+        self.positions = positions
+        self.view_positions = view_positions
+        self.angles = angles
+
+    @classmethod
+    def from_snapshot(cls, om_snapshot: List):
+        rows = [odata['data'] for odata in om_snapshot]
+        count = len(rows)
+        positions = np.array([get_xy(d.get('position')) for d in rows], dtype=np.float64).reshape(count, 2)
+        view_positions = np.array(
+            [get_xy(d.get('view_position')) for d in rows], dtype=np.float64).reshape(count, 2)
+        angles = np.array([math.nan if d.get('angle') is None else d['angle'] for d in rows], dtype=np.float64)
+        return cls(np.array([d['id'] for d in rows], dtype=np.int64), positions, view_positions, angles)
+
+    def get_targets(self):
+        """
+        View positions, falling back to positions as GObject.get_view_position does
+        """
+        return np.where(np.isnan(self.view_positions), self.positions, self.view_positions)
+
+
+class InterpolationBuffer:
+    """
+    Keeps an InterpolationFrame per snapshot timestamp and moves objects' view positions towards the next
+    snapshot's. Objects aren't rebuilt from the snapshot, so the cost per frame doesn't depend on their shapes or
+    other state.
+    """
+
+    def __init__(self, log_size=500):
+        self.frames = TimeLoggingContainer(log_size)
+
+    def add(self, timestamp, om_snapshot):
+        self.frames.add(timestamp, InterpolationFrame.from_snapshot(om_snapshot))
+
+    def interpolate(self, timestamp, object_manager):
+        """
+        Lerps the view position of every object in the snapshot after timestamp from its current view position
+        by the fraction of the time between the bordering snapshots elapsed. Returns the number of objects moved.
+        """
+        frame1, timestamp1, frame2, timestamp2 = self.frames.get_pair_by_timestamp(timestamp)
+        if frame1 is None or frame2 is None or len(frame2.ids) == 0:
+            return 0
+        fraction = (timestamp - timestamp1) / (timestamp2 - timestamp1)
+        objects = object_manager.get_objects()
+        objs = [objects.get(obj_id) for obj_id in frame2.ids.tolist()]
+        current = np.array([get_xy(None if obj is None else obj.get_view_position()) for obj in objs],
+                           dtype=np.float64).reshape(len(objs), 2)
+        targets = frame2.get_targets()
+        rows = np.flatnonzero(~(np.isnan(current).any(axis=1) | np.isnan(targets).any(axis=1)))
+        if len(rows) == 0:
+            return 0
+        p1 = current[rows]
+        blended = (targets[rows] - p1) * fraction + p1
+        for i, (x, y) in zip(rows.tolist(), blended.tolist()):
+            objs[i].view_position = Vector2(x, y)
+        return len(rows)
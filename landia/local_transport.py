@@ -0,0 +1,461 @@
+import logging
+import math
+import re
+import secrets
+import struct
+import sys
+from multiprocessing import shared_memory
+from typing import Dict, List
+
+import numpy as np
+
+from landia import gamectx
+from .clock import clock
+from .codec import get_codec
+
+try:
+    from multiprocessing import resource_tracker
+except ImportError:
+    resource_tracker = None
+
+COUNTER = struct.Struct("<Q")
+
+# Object table of each frame, objects without a position have nan coordinates
+OBJECT_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('last_change', '<i8'),
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('angle', '<f4'),
+    ('flags', '<u4')])
+FLAG_ENABLED = 1
+FLAG_VISIBLE = 2
+FLAG_SLEEPING = 4
+
+# Frame: tick, server time, keyframe flag, object count and snapshot size, followed by the object table and the
+# binary encoded snapshot
+FRAME_HEADER = struct.Struct("<qdIII4x")
+
+RING_MAGIC = 0x4C524E47
+# Ring: magic, slot count, slot size and the sequence number of the latest frame
+RING_HEADER = struct.Struct("<IIQQ")
+RING_HEADER_SIZE = 64
+# Slot: version (odd while being written), frame sequence number and frame size
+SLOT_HEADER = struct.Struct("<QQQ")
+
+QUEUE_MAGIC = 0x4C515545
+QUEUE_PREFIX = "landia_q_"
+QUEUE_NAME = re.compile(QUEUE_PREFIX + "[0-9a-f]+")
+# Queue: magic and data capacity, then the counters, written by one side each on separate cache lines
+QUEUE_INFO = struct.Struct("<IxxxxQ")
+QUEUE_HEAD = 64
+QUEUE_TAIL = 128
+QUEUE_HEADER_SIZE = 192
+RECORD_SIZE = struct.Struct("<I")
+
+
+def is_queue_name(name):
+    """
+    True for names SharedQueue generates
+    """
+    return isinstance(name, str) and QUEUE_NAME.fullmatch(name) is not None
+
+
+def attach_shared_memory(name):
+    """
+    Attaches to an existing block without registering it with a resource tracker, which would unlink it when
+    this process exits. The process which created the block unlinks it.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    if resource_tracker is None:
+        return shared_memory.SharedMemory(name=name)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedQueue:
+    """
+    Lock free single producer, single consumer queue of byte messages in shared memory.
+
+    The producer only writes the head counter and the consumer only the tail counter, both count bytes since the
+    start and wrap around the data area. put returns False instead of blocking when the queue is full.
+    Attaching to a block which isn't a queue, or reading counters or records which don't fit the queue, raises
+    ValueError.
+    """
+
+    def __init__(self, name=None, capacity=1 << 20, create=True):
+        if create:
+            name = name or f"{QUEUE_PREFIX}{secrets.token_hex(6)}"
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=QUEUE_HEADER_SIZE + capacity)
+            self.shm.buf[:QUEUE_HEADER_SIZE] = bytes(QUEUE_HEADER_SIZE)
+            QUEUE_INFO.pack_into(self.shm.buf, 0, QUEUE_MAGIC, capacity)
+        else:
+            self.shm = attach_shared_memory(name)
+            if self.shm.size >= QUEUE_HEADER_SIZE:
+                magic, capacity = QUEUE_INFO.unpack_from(self.shm.buf)
+            if self.shm.size < QUEUE_HEADER_SIZE or magic != QUEUE_MAGIC or \
+                    capacity == 0 or QUEUE_HEADER_SIZE + capacity > self.shm.size:
+                self.shm.close()
+                raise ValueError(f"{name} is not a queue")
+        self.name = name
+        self.created = create
+        self.buf = self.shm.buf
+        self.capacity = capacity
+
+    def get_counter(self, offset):
+        return COUNTER.unpack_from(self.buf, offset)[0]
+
+    def write_at(self, pos, data):
+        start = QUEUE_HEADER_SIZE + pos % self.capacity
+        first = min(len(data), QUEUE_HEADER_SIZE + self.capacity - start)
+        self.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self.buf[QUEUE_HEADER_SIZE:QUEUE_HEADER_SIZE + len(data) - first] = data[first:]
+
+    def read_at(self, pos, size):
+        start = QUEUE_HEADER_SIZE + pos % self.capacity
+        first = min(size, QUEUE_HEADER_SIZE + self.capacity - start)
+        data = bytes(self.buf[start:start + first])
+        if first < size:
+            data += bytes(self.buf[QUEUE_HEADER_SIZE:QUEUE_HEADER_SIZE + size - first])
+        return data
+
+    def put(self, data) -> bool:
+        head = self.get_counter(QUEUE_HEAD)
+        tail = self.get_counter(QUEUE_TAIL)
+        size = RECORD_SIZE.size + len(data)
+        if head - tail + size > self.capacity:
+            return False
+        self.write_at(head, RECORD_SIZE.pack(len(data)))
+        self.write_at(head + RECORD_SIZE.size, data)
+        # Publish the record after it is written
+        COUNTER.pack_into(self.buf, QUEUE_HEAD, head + size)
+        return True
+
+    def get_all(self) -> List[bytes]:
+        """
+        Messages put since the last call, at most the queue's capacity in bytes
+        """
+        head = self.get_counter(QUEUE_HEAD)
+        tail = self.get_counter(QUEUE_TAIL)
+        if head < tail or head - tail > self.capacity:
+            raise ValueError(f"Queue {self.name} has invalid counters")
+        results = []
+        while tail < head:
+            size, = RECORD_SIZE.unpack(self.read_at(tail, RECORD_SIZE.size))
+            if tail + RECORD_SIZE.size + size > head:
+                raise ValueError(f"Queue {self.name} has an invalid record")
+            results.append(self.read_at(tail + RECORD_SIZE.size, size))
+            tail += RECORD_SIZE.size + size
+        COUNTER.pack_into(self.buf, QUEUE_TAIL, tail)
+        return results
+
+    def close(self, unlink=None):
+        self.buf = None
+        self.shm.close()
+        if unlink if unlink is not None else self.created:
+            self.shm.unlink()
+
+
+class SnapshotRing:
+    """
+    Frames in a ring of fixed size slots in shared memory, written by one process and read by any number.
+
+    Slots are guarded by a version counter (a seqlock): the writer makes it odd while writing and readers discard
+    a copy if the version changed or was odd. Readers get a read-only view of the block.
+    """
+
+    def __init__(self, name, slot_count=64, slot_size=1 << 22, create=True):
+        if create:
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=RING_HEADER_SIZE + slot_count * slot_size)
+            self.buf = self.shm.buf
+            self.buf[:RING_HEADER_SIZE] = bytes(RING_HEADER_SIZE)
+            for i in range(slot_count):
+                offset = RING_HEADER_SIZE + i * slot_size
+                self.buf[offset:offset + SLOT_HEADER.size] = bytes(SLOT_HEADER.size)
+            RING_HEADER.pack_into(self.buf, 0, RING_MAGIC, slot_count, slot_size, 0)
+        else:
+            self.shm = attach_shared_memory(name)
+            self.buf = self.shm.buf.toreadonly()
+            magic, slot_count, slot_size, _ = RING_HEADER.unpack_from(self.buf, 0)
+            if magic != RING_MAGIC:
+                self.close()
+                raise ValueError(f"{name} is not a snapshot ring")
+        self.name = name
+        self.created = create
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.seq = 0
+
+    def get_latest(self):
+        return RING_HEADER.unpack_from(self.buf, 0)[3]
+
+    def slot_offset(self, seq):
+        return RING_HEADER_SIZE + (seq % self.slot_count) * self.slot_size
+
+    def write(self, data) -> int:
+        """
+        Writes a frame, returns its sequence number
+        """
+        if SLOT_HEADER.size + len(data) > self.slot_size:
+            raise ValueError(f"Frame of {len(data)} bytes does not fit slots of {self.slot_size} bytes")
+        seq = self.seq + 1
+        offset = self.slot_offset(seq)
+        version = COUNTER.unpack_from(self.buf, offset)[0]
+        COUNTER.pack_into(self.buf, offset, version + 1)
+        start = offset + SLOT_HEADER.size
+        self.buf[start:start + len(data)] = data
+        SLOT_HEADER.pack_into(self.buf, offset, version + 2, seq, len(data))
+        RING_HEADER.pack_into(self.buf, 0, RING_MAGIC, self.slot_count, self.slot_size, seq)
+        self.seq = seq
+        return seq
+
+    def read(self, seq):
+        """
+        A copy of frame seq, None if it was overwritten or is being written
+        """
+        offset = self.slot_offset(seq)
+        version, slot_seq, size = SLOT_HEADER.unpack_from(self.buf, offset)
+        if version % 2 == 1 or slot_seq != seq:
+            return None
+        start = offset + SLOT_HEADER.size
+        data = bytes(self.buf[start:start + size])
+        if COUNTER.unpack_from(self.buf, offset)[0] != version:
+            return None
+        return data
+
+    def close(self, unlink=None):
+        if not self.created:
+            self.buf.release()
+        self.buf = None
+        self.shm.close()
+        if unlink if unlink is not None else self.created:
+            self.shm.unlink()
+
+
+class SnapshotFrame:
+    """
+    A frame read from the ring: the object table as a structured array and the snapshot, decoded on first access.
+    Key frames hold every object in full, other frames field level diffs of the objects changed since the
+    previous frame and the ids of removed objects.
+    """
+
+    def __init__(self, seq, data, codec):
+        self.seq = seq
+        self.tick, self.server_time, keyframe, count, snapshot_size = FRAME_HEADER.unpack_from(data)
+        self.keyframe = keyframe == 1
+        offset = FRAME_HEADER.size
+        self.objects = np.frombuffer(data, dtype=OBJECT_DTYPE, count=count, offset=offset)
+        offset += self.objects.nbytes
+        self.snapshot_data = memoryview(data)[offset:offset + snapshot_size]
+        self.codec = codec
+        self._snapshot = None
+        # Objects that disappeared while the reader skipped frames, see SnapshotReader
+        self.dropped_ids = []
+
+    @property
+    def snapshot(self):
+        if self._snapshot is None:
+            self._snapshot = self.codec.decode(self.snapshot_data)
+            if len(self.dropped_ids) > 0:
+                self._snapshot['rm'] = self._snapshot.get('rm', []) + self.dropped_ids
+        return self._snapshot
+
+
+class SnapshotPublisher:
+    """
+    Publishes the world to a SnapshotRing once per tick for clients on the same host: an object table of ids,
+    positions, angles and state flags, and the binary encoded object, player and client event snapshots. A key
+    frame with every object in full is written every keyframe_interval frames, frames in between carry diffs
+    against the previous frame. The interval is capped below the ring's length so the ring always holds a key
+    frame for readers which fell behind.
+    """
+
+    def __init__(self, name, slot_count=64, slot_size=1 << 22, keyframe_interval=60):
+        self.ring = SnapshotRing(name, slot_count=slot_count, slot_size=slot_size, create=True)
+        self.name = name
+        self.codec = get_codec("binary")
+        self.keyframe_interval = max(min(keyframe_interval, slot_count - 1), 1)
+        # Client events since the last frame
+        self.outgoing_events = []
+        # Latest snapshot of every object, by id
+        self.published: Dict[int, Dict] = {}
+        self.last_tick = None
+        self.frames = 0
+
+    def add_event(self, e):
+        self.outgoing_events.append(e)
+
+    def get_object_table(self, objs):
+        table = np.zeros(len(objs), dtype=OBJECT_DTYPE)
+        rows = []
+        for obj in objs:
+            pos = obj.get_position()
+            flags = (FLAG_ENABLED if obj.enabled else 0) | (FLAG_VISIBLE if obj.visible else 0) | \
+                (FLAG_SLEEPING if obj.sleeping else 0)
+            rows.append((
+                obj.get_id(),
+                obj.get_last_change() or 0,
+                math.nan if pos is None else pos.x,
+                math.nan if pos is None else pos.y,
+                obj.angle or 0,
+                flags))
+        if len(rows) > 0:
+            table[:] = rows
+        return table
+
+    def publish(self, snapshots=None):
+        """
+        Writes the frame of the current tick, returns its sequence number or None if it did not fit a slot
+
+        :param snapshots: object snapshots by id already taken this tick, see ObjectManager.get_snapshot_update
+        """
+        from .client import RemoteClient
+        object_manager = gamectx.object_manager
+        tick = clock.get_ticks()
+        keyframe = self.last_tick is None or self.frames % self.keyframe_interval == 0
+        objs = list(object_manager.get_objects().values())
+
+        om_snapshot = []
+        if self.last_tick is None:
+            changed = object_manager.get_snapshot_update(
+                math.inf, include_ids=object_manager.get_objects().keys(), snapshots=snapshots)
+            self.published = {}
+        else:
+            changed = object_manager.get_snapshot_update(self.last_tick, snapshots=snapshots)
+        for snapshot in changed:
+            data = snapshot['data']
+            base = self.published.get(data['id'])
+            self.published[data['id']] = snapshot
+            if keyframe:
+                continue
+            if base is None:
+                om_snapshot.append(snapshot)
+                continue
+            delta = RemoteClient.diff_object(snapshot, base['data'], [])
+            if delta is not None:
+                om_snapshot.append(delta)
+        removed = []
+        if len(self.published) > len(objs):
+            current = object_manager.get_objects()
+            removed = [obj_id for obj_id in self.published.keys() if obj_id not in current]
+            for obj_id in removed:
+                del self.published[obj_id]
+        if keyframe:
+            # Unchanged objects are sent as last published rather than snapshotted again
+            om_snapshot = list(self.published.values())
+            removed = []
+
+        table = self.get_object_table(objs)
+        snapshot_data = self.codec.encode({
+            'om': om_snapshot,
+            'rm': removed,
+            'pm': gamectx.player_manager.get_snapshot(),
+            'em': [e.get_snapshot() for e in self.outgoing_events],
+            'timestamp': tick})
+        self.outgoing_events = []
+        header = FRAME_HEADER.pack(tick, clock.get_game_time(), 1 if keyframe else 0, len(table), len(snapshot_data))
+        try:
+            seq = self.ring.write(b"".join([header, table.tobytes(), snapshot_data]))
+        except ValueError as e:
+            logging.error(f"Dropping snapshot frame: {e}")
+            # Readers need a key frame to continue after a missing frame
+            self.last_tick = None
+            return None
+        self.last_tick = tick
+        self.frames += 1
+        return seq
+
+    def close(self):
+        self.ring.close()
+
+
+class SnapshotReader:
+    """
+    Reads the frames of a SnapshotRing in order. Frames are deltas, so after falling more than the ring's length
+    behind (or on attaching) the reader skips to the latest key frame.
+
+    With expand_deltas the reader keeps the state of every object and replaces the diffs in frame snapshots with
+    complete object snapshots, so a consumer which skips frames only misses objects changed in those frames.
+    """
+
+    def __init__(self, name, expand_deltas=False):
+        self.ring = SnapshotRing(name, create=False)
+        self.codec = get_codec("binary")
+        self.objects: Dict[int, Dict] = {} if expand_deltas else None
+        self.next_seq = None
+        self.object_ids = None
+        self.frames = 0
+        self.resyncs = 0
+
+    def find_keyframe(self, latest):
+        for seq in range(latest, max(latest - self.ring.slot_count, 0), -1):
+            data = self.ring.read(seq)
+            if data is not None and FRAME_HEADER.unpack_from(data)[2] == 1:
+                return seq
+        return None
+
+    def read_new(self) -> List[SnapshotFrame]:
+        """
+        Frames published since the last call
+        """
+        latest = self.ring.get_latest()
+        if latest == 0:
+            return []
+        results = []
+        resync = self.next_seq is None or latest - self.next_seq >= self.ring.slot_count
+        while True:
+            if resync:
+                self.next_seq = self.find_keyframe(latest)
+                if self.next_seq is None:
+                    return results
+                self.resyncs += 1
+            if self.next_seq > latest:
+                return results
+            data = self.ring.read(self.next_seq)
+            if data is None:
+                # Overwritten while behind
+                resync = True
+                latest = self.ring.get_latest()
+                continue
+            frame = SnapshotFrame(self.next_seq, data, self.codec)
+            object_ids = frame.objects['id']
+            if resync and self.object_ids is not None:
+                frame.dropped_ids = np.setdiff1d(self.object_ids, object_ids).tolist()
+            if self.objects is not None:
+                self.expand_deltas(frame)
+            resync = False
+            self.object_ids = object_ids
+            self.next_seq += 1
+            self.frames += 1
+            results.append(frame)
+
+    def expand_deltas(self, frame: SnapshotFrame):
+        snapshot = frame.snapshot
+        objects = self.objects
+        if frame.keyframe:
+            objects.clear()
+        for obj_id in snapshot['rm']:
+            objects.pop(obj_id, None)
+        om_snapshot = []
+        for odata in snapshot['om']:
+            data = odata['data']
+            if odata.get('_delta'):
+                base = objects.get(data['id'])
+                if base is None:
+                    continue
+                data = dict(base)
+                data.update(odata['data'])
+                odata = {'_type': odata['_type'], 'data': data}
+            objects[data['id']] = data
+            om_snapshot.append(odata)
+        snapshot['om'] = om_snapshot
+
+    def close(self):
+        self.ring.close()
@@ -0,0 +1,194 @@
+import csv
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+class Histogram:
+    """
+    Counts of values in geometric buckets (4 per doubling from 0.001), percentiles are bucket upper edges
+    """
+
+    edges = 0.001 * 2 ** (np.arange(110) / 4)
+
+    def __init__(self):
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        self.counts += np.bincount(np.searchsorted(self.edges, values), minlength=len(self.counts))
+        self.count += len(values)
+        self.total += float(values.sum())
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def percentile(self, p):
+        if self.count == 0:
+            return None
+        i = int(np.searchsorted(np.cumsum(self.counts), self.count * p / 100))
+        return min(float(self.edges[i]), self.max) if i < len(self.edges) else self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class TickProfiler:
+    """
+    Per tick phase timings, event counts by type and object counts by config_id.
+
+    Phases are timed by chaining start/record calls, both are no-ops returning 0 while disabled.
+    Times recorded for a phase during a tick (e.g. one client_step per client) are summed:
+
+        start = profiler.start()
+        run_physics()
+        start = profiler.record("physics", start)
+
+    end_tick closes a tick and samples object counts every sample_every ticks. Tick totals are added to the
+    histograms in batches of fold_every ticks, and get_stats() is written to dump_path every dump_every ticks
+    (CSV if the path ends with .csv, JSON otherwise).
+    """
+
+    def __init__(self, enabled=False, dump_path=None, dump_every=1000, sample_every=60, fold_every=256):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.dump_every = dump_every
+        self.sample_every = sample_every
+        self.fold_every = fold_every
+        self.reset()
+
+    def reset(self):
+        self.phases: Dict[str, Histogram] = {}
+        self.tick_times: Dict[str, float] = {}
+        self.pending_ticks: List[Dict[str, float]] = []
+        self.pending_events: List[int] = []
+        self.event_counts: Dict[str, int] = {}
+        self.events_per_tick = Histogram()
+        self.object_counts: Dict[str, int] = {}
+        self.max_object_counts: Dict[str, int] = {}
+        self.ticks = 0
+        self.tick_events = 0
+        self.started = time.time()
+
+    def enable(self, dump_path=None, dump_every=None):
+        self.enabled = True
+        if dump_path is not None:
+            self.dump_path = dump_path
+        if dump_every is not None:
+            self.dump_every = dump_every
+
+    def disable(self):
+        self.enabled = False
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0
+
+    def record(self, name, start):
+        """
+        Adds the time since start to the phase's total for this tick, returns now for timing the next phase
+        """
+        if not self.enabled:
+            return 0
+        now = time.perf_counter()
+        tick_times = self.tick_times
+        tick_times[name] = tick_times.get(name, 0.0) + now - start
+        return now
+
+    def count_event(self, event):
+        name = type(event).__name__
+        self.event_counts[name] = self.event_counts.get(name, 0) + 1
+        self.tick_events += 1
+
+    def sample_objects(self, object_manager):
+        counts = {str(k): len(v) for k, v in object_manager.configs_id_index.items() if len(v) > 0}
+        self.object_counts = counts
+        for k, v in counts.items():
+            if v > self.max_object_counts.get(k, 0):
+                self.max_object_counts[k] = v
+
+    def end_tick(self, object_manager=None):
+        if not self.enabled:
+            return
+        self.ticks += 1
+        self.pending_ticks.append(self.tick_times)
+        self.tick_times = {}
+        self.pending_events.append(self.tick_events)
+        self.tick_events = 0
+        if len(self.pending_ticks) >= self.fold_every:
+            self.fold()
+        if object_manager is not None and self.ticks % self.sample_every == 1:
+            self.sample_objects(object_manager)
+        if self.dump_path is not None and self.ticks % self.dump_every == 0:
+            self.dump()
+
+    def fold(self):
+        """
+        Adds the pending tick totals to the histograms
+        """
+        names = set()
+        for tick_times in self.pending_ticks:
+            names.update(tick_times.keys())
+        for name in names:
+            histogram = self.phases.get(name)
+            if histogram is None:
+                histogram = Histogram()
+                self.phases[name] = histogram
+            histogram.add([t[name] * 1000 for t in self.pending_ticks if name in t])
+        self.events_per_tick.add(self.pending_events)
+        self.pending_ticks = []
+        self.pending_events = []
+
+    def get_stats(self):
+        """
+        Per tick phase summaries in ms, events per tick summary, event totals by type and object counts by config_id
+        """
+        self.fold()
+        return {
+            'ticks': self.ticks,
+            'elapsed_sec': time.time() - self.started,
+            'phases_ms': {k: h.summary() for k, h in self.phases.items()},
+            'events_per_tick': self.events_per_tick.summary(),
+            'event_counts': dict(self.event_counts),
+            'object_counts': dict(self.object_counts),
+            'max_object_counts': dict(self.max_object_counts),
+        }
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        stats = self.get_stats()
+        tmp_path = f"{path}.tmp"
+        if path.endswith(".csv"):
+            with open(tmp_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["kind", "name", "count", "mean", "min", "p50", "p90", "p99", "max"])
+                rows = [("phase_ms", k, v) for k, v in stats['phases_ms'].items()]
+                rows.append(("events_per_tick", "all", stats['events_per_tick']))
+                for kind, name, s in rows:
+                    writer.writerow([kind, name, s['count'], s['mean'], s['min'], s['p50'], s['p90'], s['p99'], s['max']])
+                for k, v in stats['event_counts'].items():
+                    writer.writerow(["event_count", k, v])
+                for k, v in stats['object_counts'].items():
+                    writer.writerow(["object_count", k, v, "", "", "", "", "", stats['max_object_counts'].get(k)])
+        else:
+            with open(tmp_path, "w") as f:
+                json.dump(stats, f, indent=2)
+        # Readers never see a partially written file
+        os.replace(tmp_path, path)
+        return path
@@ -162,8 +162,10 @@ class GObject(Base):
         data = data_dict['data']
         
         # TODO: using word "data" too much!! rename somethings
-        for k,v in data['shape_group']['data'].items():
-            self.add_shape(get_shape_from_dict(v))
+        # Delta snapshots only include changed fields
+        if 'shape_group' in data:
+            for k,v in data['shape_group']['data'].items():
+                self.add_shape(get_shape_from_dict(v))
         
         if "data" in data:
             self.data = data['data']
@@ -9,17 +9,30 @@ class GObjectManager:
     def __init__(self):
         self.objects: Dict[str, GObject] = {}
         self.configs_id_index: Dict[str, set] = {}
+        self.listeners = []
         # self.obj_history: Dict[str,str] = {}
 
+    def add_listener(self, listener):
+        """
+        listener(obj, added) is called whenever an object is added to or removed from the manager
+        """
+        self.listeners.append(listener)
+
     def add(self, obj: GObject):
         self.objects[obj.get_id()] = obj
         obj_id_set = self.configs_id_index.get(obj.config_id, set())
         obj_id_set.add(obj.get_id())
         self.configs_id_index[obj.config_id] = obj_id_set
+        for listener in self.listeners:
+            listener(obj, True)
 
     def clear_objects(self):
+        objs = list(self.objects.values())
         self.objects: Dict[str, GObject] = {}
         self.configs_id_index: Dict[str, set] = {}
+        for obj in objs:
+            for listener in self.listeners:
+                listener(obj, False)
 
     def get_objects_by_config_id(self, config_id):
         return [self.objects[oid] for oid in self.configs_id_index.get(config_id, set())]
@@ -32,15 +45,33 @@ class GObjectManager:
         del self.objects[obj_id]
         obj_id_set = self.configs_id_index.get(obj.config_id, set())
         obj_id_set.discard(obj.get_id())
+        for listener in self.listeners:
+            listener(obj, False)
 
     def get_objects(self) -> Dict[str, GObject]:
         return self.objects
 
-    def get_snapshot_update(self, changed_since):
+    def get_snapshot_update(self, changed_since, obj_ids=None, include_ids=set(), snapshots=None):
+        """
+        Snapshots of objects changed since changed_since, limited to obj_ids if given.
+        Objects in include_ids are always included.
+        If given, snapshots caches object snapshots by id, for building several snapshots of the same state.
+        """
+        if obj_ids is None:
+            objs = list(self.get_objects().values())
+        else:
+            objs = [self.objects[obj_id] for obj_id in obj_ids if obj_id in self.objects]
         snapshot_list = []
-        for obj in list(self.get_objects().values()):
-            if obj.get_last_change() >= changed_since:
-                snapshot_list.append(obj.get_snapshot())
+        for obj in objs:
+            if obj.get_last_change() >= changed_since or obj.get_id() in include_ids:
+                if snapshots is None:
+                    snapshot_list.append(obj.get_snapshot())
+                    continue
+                snapshot = snapshots.get(obj.get_id())
+                if snapshot is None:
+                    snapshot = obj.get_snapshot()
+                    snapshots[obj.get_id()] = snapshot
+                snapshot_list.append(snapshot)
         return snapshot_list
 
     def get_snapshot_full(self):
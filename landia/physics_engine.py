@@ -20,9 +20,22 @@ class GridSpace:
         self.coord_to_obj= {}
         self.obj_to_coord = {}
         self.tracked_objs ={}
+        self.change_trackers = []
         # NOT USED
         self.sectors = {}
 
+    def track_changes(self):
+        """
+        Returns a set which collects every coord whose object list changes from now on
+        """
+        changes = set()
+        self.change_trackers.append(changes)
+        return changes
+
+    def _mark_changed(self,coord):
+        for changes in self.change_trackers:
+            changes.add(coord)
+
     def get_sector_id(self,coord):
         return coord[0] // 20, coord[1] // 20
 
@@ -37,6 +50,7 @@ class GridSpace:
         self.coord_to_obj[coord] = obj_ids
         self.obj_to_coord[obj_id] = coord
         self.tracked_objs[obj_id] = obj
+        self._mark_changed(coord)
 
     def remove_obj(self,obj_id):
         last_coord = self.obj_to_coord.get(obj_id)
@@ -54,14 +68,211 @@ class GridSpace:
                 pass
         del self.obj_to_coord[obj_id]
         del self.tracked_objs[obj_id]
+        self._mark_changed(last_coord)
 
     def get_obj_by_id(self,obj_id):
         return self.tracked_objs.get(obj_id)
 
+    def get_objs_in_window(self,col_min,row_min,col_max,row_max):
+        """
+        Object ids inside the window (inclusive), rows from row_max down to row_min, columns left to right
+        """
+        obj_ids = []
+        for r in range(row_max, row_min - 1, -1):
+            for c in range(col_min, col_max + 1):
+                obj_ids.extend(self.get_objs_at((c,r)))
+        return obj_ids
+
+    def set_bounds(self,xmin,ymin,xmax,ymax):
+        pass
+
     def debug_draw(self,*args,**kwargs):
         raise NotImplementedError("debug_draw Not supported for this space type")
 
 
+class ArrayGridSpace(GridSpace):
+    """
+    GridSpace backed by dense NumPy arrays over the map boundary.
+
+    obj_grid[layer,x,y] holds the object ids at a coord in the order they arrived (0 = empty), up to depth layers.
+    config_grid[x,y] holds the config index (see get_config_index) of the first object at a coord.
+    Objects beyond depth go to an overflow dict and coords outside the bounds use the GridSpace dicts.
+    Object ids must be positive ints (see gen_id).
+    """
+
+    def __init__(self, depth=8):
+        super().__init__()
+        self.depth = depth
+        self.bounds = None
+        self.obj_grid = None
+        self.count_grid = None
+        self.config_grid = None
+        self.config_index = {None:0}
+        self.overflow = {}
+
+    def set_bounds(self,xmin,ymin,xmax,ymax):
+        # Keep current per coord ordering when moving objects into the arrays
+        cells = {}
+        for obj_id, coord in self.obj_to_coord.items():
+            if coord not in cells:
+                cells[coord] = list(self.get_objs_at(coord))
+
+        self.bounds = (xmin,ymin,xmax,ymax)
+        width = xmax - xmin + 1
+        height = ymax - ymin + 1
+        self.obj_grid = numpy.zeros((self.depth,width,height),dtype=numpy.int64)
+        self.count_grid = numpy.zeros((width,height),dtype=numpy.int16)
+        self.config_grid = numpy.zeros((width,height),dtype=numpy.int32)
+        self.overflow = {}
+        self.coord_to_obj = {}
+        self.obj_to_coord = {}
+        tracked_objs = self.tracked_objs
+        self.tracked_objs = {}
+        for coord, obj_ids in cells.items():
+            for obj_id in obj_ids:
+                self.move_obj_to(coord,tracked_objs[obj_id])
+
+    def get_config_index(self,config_id):
+        idx = self.config_index.get(config_id)
+        if idx is None:
+            idx = len(self.config_index)
+            self.config_index[config_id] = idx
+        return idx
+
+    def _local(self,coord):
+        if self.bounds is None:
+            return None
+        x = coord[0] - self.bounds[0]
+        y = coord[1] - self.bounds[1]
+        if 0 <= x < self.obj_grid.shape[1] and 0 <= y < self.obj_grid.shape[2]:
+            return x,y
+        return None
+
+    def _update_config(self,x,y):
+        if self.count_grid[x,y] == 0:
+            self.config_grid[x,y] = 0
+        else:
+            obj = self.tracked_objs.get(int(self.obj_grid[0,x,y]))
+            self.config_grid[x,y] = self.get_config_index(None if obj is None else obj.config_id)
+
+    def get_objs_at(self,coord):
+        loc = self._local(coord)
+        if loc is None:
+            return super().get_objs_at(coord)
+        x,y = loc
+        n = self.count_grid[x,y]
+        if n == 0:
+            return []
+        obj_ids = self.obj_grid[:n,x,y].tolist()
+        if n == self.depth and coord in self.overflow:
+            obj_ids.extend(self.overflow[coord])
+        return obj_ids
+
+    def move_obj_to(self,coord,obj:GObject):
+        loc = self._local(coord)
+        if loc is None:
+            super().move_obj_to(coord,obj)
+            return
+        obj_id = obj.get_id()
+        self.remove_obj(obj_id)
+        x,y = loc
+        n = self.count_grid[x,y]
+        if n < self.depth:
+            self.obj_grid[n,x,y] = obj_id
+            self.count_grid[x,y] = n + 1
+            if n == 0:
+                self.config_grid[x,y] = self.get_config_index(obj.config_id)
+        else:
+            self.overflow.setdefault(coord,[]).append(obj_id)
+        self.obj_to_coord[obj_id] = coord
+        self.tracked_objs[obj_id] = obj
+        self._mark_changed(coord)
+
+    def remove_obj(self,obj_id):
+        last_coord = self.obj_to_coord.get(obj_id)
+        if last_coord is None:
+            return
+        loc = self._local(last_coord)
+        if loc is None:
+            super().remove_obj(obj_id)
+            return
+        x,y = loc
+        n = self.count_grid[x,y]
+        stack = self.obj_grid[:n,x,y]
+        found = numpy.flatnonzero(stack == obj_id)
+        if len(found) > 0:
+            pos = found[0]
+            self.obj_grid[pos:n-1,x,y] = self.obj_grid[pos+1:n,x,y]
+            overflow_ids = self.overflow.get(last_coord)
+            if overflow_ids:
+                # First overflow id comes next in arrival order
+                self.obj_grid[n-1,x,y] = overflow_ids.pop(0)
+                if len(overflow_ids) == 0:
+                    del self.overflow[last_coord]
+            else:
+                self.obj_grid[n-1,x,y] = 0
+                self.count_grid[x,y] = n - 1
+            if pos == 0:
+                self._update_config(x,y)
+        else:
+            overflow_ids = self.overflow.get(last_coord,[])
+            if obj_id in overflow_ids:
+                overflow_ids.remove(obj_id)
+                if len(overflow_ids) == 0:
+                    del self.overflow[last_coord]
+        del self.obj_to_coord[obj_id]
+        del self.tracked_objs[obj_id]
+        self._mark_changed(last_coord)
+
+    def _clip_window(self,col_min,row_min,col_max,row_max):
+        """
+        Window clipped to the bounds, or None if part of it must be read from the overflow or fallback dicts
+        """
+        if self.bounds is None:
+            return None
+        for coords in (self.overflow.keys(), self.coord_to_obj.keys()):
+            for (c,r) in coords:
+                if col_min <= c <= col_max and row_min <= r <= row_max:
+                    return None
+        xmin,ymin,xmax,ymax = self.bounds
+        return max(col_min,xmin),max(row_min,ymin),min(col_max,xmax),min(row_max,ymax)
+
+    def get_objs_in_window(self,col_min,row_min,col_max,row_max):
+        clipped = self._clip_window(col_min,row_min,col_max,row_max)
+        if clipped is None:
+            return super().get_objs_in_window(col_min,row_min,col_max,row_max)
+        c0,r0,c1,r1 = clipped
+        if c0 > c1 or r0 > r1:
+            return []
+        xmin,ymin = self.bounds[0],self.bounds[1]
+        window = self.obj_grid[:,c0-xmin:c1-xmin+1,r0-ymin:r1-ymin+1]
+        # (layer,col,row) -> (row desc,col,layer)
+        ordered = window[:,:,::-1].transpose(2,1,0).ravel()
+        return ordered[ordered != 0].tolist()
+
+    def get_config_window(self,col_min,row_min,col_max,row_max):
+        """
+        Config index of the first object per coord, shape (rows,cols), rows from row_max down to row_min
+        """
+        result = numpy.zeros((row_max-row_min+1,col_max-col_min+1),dtype=numpy.int32)
+        clipped = self._clip_window(col_min,row_min,col_max,row_max)
+        if clipped is not None:
+            c0,r0,c1,r1 = clipped
+            if c0 <= c1 and r0 <= r1:
+                xmin,ymin = self.bounds[0],self.bounds[1]
+                window = self.config_grid[c0-xmin:c1-xmin+1,r0-ymin:r1-ymin+1]
+                result[row_max-r1:row_max-r0+1,c0-col_min:c1-col_min+1] = window[:,::-1].T
+            return result
+
+        for i, r in enumerate(range(row_max, row_min - 1, -1)):
+            for j, c in enumerate(range(col_min, col_max + 1)):
+                obj_ids = self.get_objs_at((c,r))
+                if len(obj_ids) > 0:
+                    obj = self.tracked_objs.get(obj_ids[0])
+                    result[i,j] = self.get_config_index(None if obj is None else obj.config_id)
+        return result
+
+
 class GridPhysicsEngine:
     """
     Handles physics events and collision
@@ -70,8 +281,12 @@ class GridPhysicsEngine:
     def __init__(self,config:PhysicsConfig, em:EventManager):
         self.config = config
         self.tile_size = self.config.tile_size
-        self.space = GridSpace()
+        if self.config.space_type == "array":
+            self.space = ArrayGridSpace()
+        else:
+            self.space = GridSpace()
         self.position_updates = {}
+        self.position_listeners = []
         self.collision_callbacks ={}
         self.em  = em
 
@@ -113,14 +328,24 @@ class GridPhysicsEngine:
         else:
             self.position_updates[obj.get_id()] = (obj,new_pos,callback)
 
+    def add_position_listener(self,listener):
+        """
+        listener(obj,new_pos) is called whenever an object moves, new_pos is None on removal
+        """
+        self.position_listeners.append(listener)
+
     def create_change_position_event(self,obj:GObject,old_pos,new_pos):
         e = PositionChangeEvent(
             obj.get_id(),old_pos=old_pos,new_pos=new_pos,
             is_player_obj= obj.player_id is not None)
         self.em.add_event(e)
+        for listener in self.position_listeners:
+            listener(obj,new_pos)
 
     def remove_object(self,obj):
         self.space.remove_obj(obj.get_id())
+        for listener in self.position_listeners:
+            listener(obj,None)
 
     def update(self):
         obj:GObject
@@ -1,4 +1,5 @@
 from landia.utils import TickPerSecCounter
+from collections import OrderedDict
 from typing import Dict, Any
 
 import pygame
@@ -8,18 +9,18 @@ from .object_manager import GObjectManager
 from PIL import Image
 import numpy as np
 import os
+import sys
 
 from .config import RendererConfig
 from .asset_bundle import AssetBundle
+from .asset_store import AssetStore, get_asset_store
+from .background import Background
 from .player import Player
 from . import gamectx
 import math
-from math import ceil
 import time
-import pkg_resources
 import logging
 from .player import Camera
-from .spritesheet import Spritesheet
 from .utils import colormap
 import random
 
@@ -70,6 +71,49 @@ def scale(vec, vec2):
     return Vector2(vec.x * vec2.x, vec.y * vec2.y)
 
 
+class NullRenderer:
+    """
+    Renderer for headless clients (eg. agents using state observations). Never initializes pygame,
+    loads no assets and draws nothing, get_last_frame returns None.
+    """
+
+    def __init__(self, config: RendererConfig = None, asset_bundle: AssetBundle = None):
+        self.config: RendererConfig = config or RendererConfig()
+        self.asset_bundle = asset_bundle
+        self.full_resolution = self.config.resolution
+        self.resolution = self.config.resolution
+        self.view_port_offset = 0, 0
+        self.initialized = True
+        self.log_info = None
+
+    def set_log_info(self, log_info):
+        self.log_info = log_info
+
+    def initialize(self):
+        pass
+
+    def play_sounds(self, sound_ids):
+        pass
+
+    def play_music(self, music_id):
+        pass
+
+    def render_text(self, *args, **kwargs):
+        pass
+
+    def draw_rectangle(self, *args, **kwargs):
+        pass
+
+    def process_frame(self, player: Player = None):
+        pass
+
+    def render_frame(self):
+        pass
+
+    def get_last_frame(self, out=None):
+        return None
+
+
 class Renderer:
 
     def __init__(self, config: RendererConfig, asset_bundle: AssetBundle):
@@ -111,30 +155,39 @@ class Renderer:
         self.max_distance = self.config.tile_size*100
 
         self.images = {}
-        self.image_cache = {}
         self.sounds = {}
-        self.sprite_sheets = {}
+        if config.share_assets:
+            self.asset_store = get_asset_store(
+                asset_bundle,
+                max_scaled_images=config.max_scaled_images,
+                max_rotated_images=config.max_rotated_images)
+        else:
+            self.asset_store = AssetStore(
+                asset_bundle,
+                max_scaled_images=config.max_scaled_images,
+                max_rotated_images=config.max_rotated_images)
 
         self.log_info = None
+        # (font name, size) -> pygame.font.Font
         self.font = {}
+        # (text, size, color, font name) -> rendered text surface, LRU bounded by config.max_text_surfaces
+        self.text_cache: OrderedDict = OrderedDict()
+        self.text_hits = 0
+        self.text_misses = 0
         self.fps_clock = pygame.time.Clock()
-        self.background = None
-        self.background_center = None
-        self.background_size = None
-        self.background_updates = 0
-        self.background_screen_factor = None
+        self.background = Background(
+            self.config.tile_size, self.get_image_by_id, max_scaled_tiles=self.config.max_scaled_tiles)
+        self.info_filter = set(self.config.info_filter)
+        # (object id, infobox index) -> (size, renderable, surface)
+        self.infobox_cache = {}
+        self.infobox_hits = 0
+        self.infobox_misses = 0
 
     def set_log_info(self, log_info):
         self.log_info = log_info
 
     def get_asset_fullpath(self,path):
-        if path.startswith("/"):
-            return path
-        filepath = os.path.join(self.asset_bundle.path,path)
-        if os.path.exists(filepath):
-            return filepath
-        else:
-            return pkg_resources.resource_filename(__name__, path)
+        return self.asset_store.get_asset_fullpath(path)
 
     def load_sounds(self):
         if self.config.sound_enabled:
@@ -147,21 +200,7 @@ class Renderer:
                 self.sounds[k] = sound
 
     def load_images(self):
-        self.images = {}
-        for k, (path, frame_id) in self.asset_bundle.image_assets.items():
-            full_path = self.get_asset_fullpath(path)
-            try:
-
-                if frame_id is None:
-                    image = pygame.image.load(full_path).convert_alpha()
-                else:
-                    if path not in self.sprite_sheets:
-                        self.sprite_sheets[path] = Spritesheet(full_path)
-                    image = self.sprite_sheets[path].parse_sprite(frame_id)
-                self.images[k] = image
-            except Exception as e:
-                print(f"Error loading {path} {full_path}")
-                raise e
+        self.images = self.asset_store.load_images()
 
     def play_sounds(self, sound_ids):
         if self.config.sound_enabled:
@@ -181,20 +220,23 @@ class Renderer:
         return self.images.get(image_id)
 
     def get_scaled_image_by_id(self, image_id, scale_x, scale_y):
-        image_sizes = self.image_cache.get(image_id, {})
-        img = image_sizes.get((scale_x, scale_y))
-        if img is None:
-            img_orig = self.get_image_by_id(image_id)
-            if img_orig is None:
-                return None
-            body_w, body_h = img_orig.get_size()
-            image_size = ceil(body_w*scale_x), ceil(body_h*scale_y)
-            if image_size[0] > 500:
-                image_size = 500, 500
-            img = pygame.transform.scale(img_orig, image_size)
-            image_sizes[(scale_x, scale_y)] = img
-            self.image_cache[image_id] = image_sizes
-        return img
+        asset = self.asset_bundle.image_assets.get(image_id)
+        if asset is None:
+            return None
+        return self.asset_store.get_scaled_image(asset[0], asset[1], scale_x, scale_y)
+
+    def get_rotated_image_by_id(self, image_id, scale_x, scale_y, angle):
+        """
+        Scaled image rotated by angle rounded to config.rotation_step degrees
+        """
+        step = self.config.rotation_step
+        angle = (round((angle % 360) / step) * step) % 360
+        if angle == 0:
+            return self.get_scaled_image_by_id(image_id, scale_x, scale_y)
+        asset = self.asset_bundle.image_assets.get(image_id)
+        if asset is None:
+            return None
+        return self.asset_store.get_rotated_image(asset[0], asset[1], scale_x, scale_y, angle)
 
     def update_view(self, view_height):
         self.view_height = max(view_height, 10)
@@ -219,6 +261,9 @@ class Renderer:
 
                 
         else:
+            # convert_alpha needs a display mode, use a hidden one when nothing is shown
+            if pygame.display.get_surface() is None:
+                pygame.display.set_mode((1, 1), pygame.HIDDEN)
             self._final_surf = pygame.Surface(self.full_resolution)
 
         self._view_port_surf = pygame.Surface(self.resolution)
@@ -229,17 +274,39 @@ class Renderer:
 
         self.initialized = True
 
+    def get_font(self, fsize, name=None) -> pygame.font.Font:
+        key = (name, fsize)
+        font = self.font.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, fsize)
+            self.font[key] = font
+        return font
+
+    def get_text_surface(self, text, fsize, color=(255, 255, 255), font_name=None) -> pygame.Surface:
+        """
+        Antialiased rendering of text, reused while the same text is drawn with the same size, color and font
+        """
+        key = (text, fsize, tuple(color), font_name)
+        surface = self.text_cache.get(key)
+        if surface is not None:
+            self.text_hits += 1
+            self.text_cache.move_to_end(key)
+            return surface
+
+        self.text_misses += 1
+        surface = self.get_font(fsize, font_name).render(text, True, color)
+        self.text_cache[key] = surface
+        if len(self.text_cache) > self.config.max_text_surfaces:
+            self.text_cache.popitem(last=False)
+        return surface
+
     def render_text(self, lines, x, y, fsize=14, spacing=12, color=(255, 255, 255), use_view_port_surface=False):
 
         surface = self._view_port_surf if use_view_port_surface else self._final_surf
-        font = self.font.get(fsize)
         if fsize>spacing:
             spacing = fsize
-        if font is None:
-            font = pygame.font.SysFont("consolas", fsize)
-            self.font[fsize] = font
         for i, l in enumerate(lines):
-            surface.blit(font.render(l, True, color), (x, y + spacing * i))
+            surface.blit(self.get_text_surface(l, fsize, color, "consolas"), (x, y + spacing * i))
 
     def _draw_grid_line(self, p1, p2, angle, center, screen_view_center, color, screen_factor):
         p1 = (p1 - center).rotate(angle)
@@ -303,11 +370,12 @@ class Renderer:
         pygame.draw.rect(self._view_port_surf, color, rect)
 
     def _draw_image(self, pos, center, image_id, angle, screen_factor, screen_view_center, color=(255, 0, 0)):
-        image = self.get_scaled_image_by_id(image_id, screen_factor[0], screen_factor[1])
+        if angle != 0:
+            image = self.get_rotated_image_by_id(image_id, screen_factor[0], screen_factor[1], angle)
+        else:
+            image = self.get_scaled_image_by_id(image_id, screen_factor[0], screen_factor[1])
         image_loc = scale(screen_factor, pos - center) + screen_view_center
         if image is not None:
-            if angle != 0:
-                image = pygame.transform.rotate(image, angle % 360)
             rect = image.get_rect()
             rect.center = image_loc
             self._view_port_surf.blit(image, rect)
@@ -342,13 +410,10 @@ class Renderer:
             barw = x_max
             if label is not None:
                 fsize=row_h
-                font = self.font.get(fsize)
-                if font is None:
-                    font = pygame.font.SysFont(None, fsize)
-                    self.font[fsize] = font
-                twidth,_ = font.size(label)
+                text_surface = self.get_text_surface(label, fsize, (200,200,200))
+                twidth = text_surface.get_width()
 
-                surface.blit(font.render(label, True, (200,200,200)), loc)
+                surface.blit(text_surface, loc)
                 loc = x + twidth,y
                 barw = barw - twidth           
             
@@ -395,188 +460,211 @@ class Renderer:
                     surface.blit(image, rect)
             elif renderable.get("type") == "text":
                 fsize=row_h
-                font = self.font.get(fsize)
-                if font is None:
-                    font = pygame.font.SysFont(None, fsize)
-                    self.font[fsize] = font
-                text = renderable['value']
-                twidth,_ = font.size(text)
-                loc =  max(0,loc[0]+ barw/2 - twidth /2), loc[1]
                 color = renderable.get('color',(255,255,255))
+                text_surface = self.get_text_surface(renderable['value'], fsize, color)
+                twidth = text_surface.get_width()
+                loc =  max(0,loc[0]+ barw/2 - twidth /2), loc[1]
 
-                surface.blit(font.render(text, True, color), loc)
+                surface.blit(text_surface, loc)
  
 
-    def _draw_object(self, center, obj: GObject, screen_angle, screen_factor, screen_view_center, color=None):
+    def _draw_renderable(self, renderable, loc, screen_factor):
+        """
+        Draws text, bar and tag renderables with their top left at screen position loc
+        """
+        rtype = renderable.get("type")
+        if rtype == "text":
+            fsize = round(3 * screen_factor[0])
+            color = (255, 255, 255)
+            self._view_port_surf.blit(self.get_text_surface(renderable.get("value"), fsize, color), loc)
+        elif rtype == "bar":
+            color = renderable.get("color")
+            bg_color = renderable.get("bg_color")
+            barw = round(self.config.tile_size * screen_factor[0] /2)
+            barh = 1 * screen_factor[0]
+            # Bar BG
+            rect = pygame.Rect(loc[0], loc[1],
+                               barw,
+                               barh)
+
+            pygame.draw.rect(self._view_port_surf, bg_color, rect)
+            width = round(barw * renderable.get("value"))
+            # Bar
+            rect = pygame.Rect(loc[0], loc[1],
+                               width,
+                               barh)
 
-        renderables = obj.get_renderables(screen_angle,info_filter=set(self.config.info_filter))
-        for renderable in renderables:
-            if renderable.get("type") == "text":
-                fsize = round(3 * screen_factor[0])
-                color = (255, 255, 255)
-                pos = obj.get_view_position() - Vector2(self.config.tile_size/2, self.config.tile_size/2)
-                loc = scale(screen_factor, pos - center) + screen_view_center
-
-                font = self.font.get(fsize)
-                if font is None:
-                    font = pygame.font.SysFont(None, fsize)
-                    self.font[fsize] = font
-        # for i, l in enumerate(lines):
-                self._view_port_surf.blit(font.render(renderable.get("value"), True, color), loc)
-            elif renderable.get("type") == "infobox":
-                boxscale = renderable.get("scale",(1.0,1.0))
-                background_color = renderable.get("background_color",(0,0,0))
-                pos = obj.get_view_position() - Vector2(self.config.tile_size/2, self.config.tile_size/2)
-                loc = scale(screen_factor, pos - center) + screen_view_center
-                size = (self.config.tile_size * screen_factor[0] * boxscale[0],self.config.tile_size * screen_factor[1] * boxscale[1])                
-                surface_size = size[0]*2,size[1]*2
-                surface = pygame.Surface(surface_size)
-
-                if background_color is None:
-                    surface.set_colorkey((0,0,0))
-                else:               
-                    surface.fill(background_color)
-                self._draw_infobox(renderable, surface=surface, screen_factor=screen_factor,size = size)
-
-                self._view_port_surf.blit(surface,loc)
-
-            elif renderable.get("type") == "bar":
-                color = renderable.get("color")
-                bg_color = renderable.get("bg_color")
-                pos = obj.get_view_position() - Vector2(self.config.tile_size/2, self.config.tile_size/2)
-                loc = scale(screen_factor, pos - center) + screen_view_center
-                barw = round(self.config.tile_size * screen_factor[0] /2)
-                barh = 1 * screen_factor[0]
-                # Bar BG
-                rect = pygame.Rect(loc[0], loc[1],
-                                   barw,
-                                   barh)
+            pygame.draw.rect(self._view_port_surf, color, rect)
+        elif rtype == "tag":
+            color = renderable.get("color")
+            tw = 1.2 * screen_factor[0]
+            th = 1.2 * screen_factor[1]
+            rect = pygame.Rect(loc[0], loc[1],
+                               tw,
+                               th)
 
-                pygame.draw.rect(self._view_port_surf, bg_color, rect)
-                width = round(barw * renderable.get("value"))
-                # Bar
-                rect = pygame.Rect(loc[0], loc[1],
-                                   width,
-                                   barh)
+            pygame.draw.rect(self._view_port_surf, color, rect)
 
-                pygame.draw.rect(self._view_port_surf, color, rect)
-            elif renderable.get("type") == "tag":
-                color = renderable.get("color")
+    def _get_infobox_surface(self, obj: GObject, index, renderable, screen_factor, used):
+        """
+        Infobox surface of the index-th infobox of obj, reused while its size and renderable (value, colors,
+        padding) are the same
+        """
+        boxscale = renderable.get("scale",(1.0,1.0))
+        background_color = renderable.get("background_color",(0,0,0))
+        size = (self.config.tile_size * screen_factor[0] * boxscale[0],self.config.tile_size * screen_factor[1] * boxscale[1])
+        key = (obj.get_id(), index)
+        entry = self.infobox_cache.get(key)
+        if entry is not None:
+            cached_size, cached_renderable, surface = entry
+            if cached_size == size and cached_renderable == renderable:
+                used[key] = entry
+                self.infobox_hits += 1
+                return surface
+
+        surface_size = size[0]*2,size[1]*2
+        surface = pygame.Surface(surface_size)
+        if background_color is None:
+            surface.set_colorkey((0,0,0))
+        else:
+            surface.fill(background_color)
+        self._draw_infobox(renderable, surface=surface, screen_factor=screen_factor,size = size)
+        used[key] = (size, renderable, surface)
+        self.infobox_misses += 1
+        return surface
+
+    def _compile_object(self, records, center, obj: GObject, screen_angle, screen_factor, screen_view_center, used):
+        """
+        Appends the draw records of obj's renderables to records
+        """
+        renderables = obj.get_renderables(screen_angle,info_filter=self.info_filter)
+        view_position = obj.get_view_position()
+        half_tile = self.config.tile_size/2
+        sx, sy = screen_factor[0], screen_factor[1]
+        cx = screen_view_center[0] - center[0] * sx
+        cy = screen_view_center[1] - center[1] * sy
+        infobox_index = 0
+        for renderable in renderables:
+            rtype = renderable.get("type")
+            if rtype is None:
+                position = renderable['position']
+                offset = obj.image_offset
+                x = (view_position[0] - position[0] - offset[0]) * sx + cx
+                y = (view_position[1] - position[1] - offset[1]) * sy + cy
+                records.append((renderable['image_id'], x, y, renderable['angle']))
+            elif rtype == "infobox":
+                surface = self._get_infobox_surface(obj, infobox_index, renderable, screen_factor, used)
+                infobox_index += 1
+                x = (view_position[0] - half_tile) * sx + cx
+                y = (view_position[1] - half_tile) * sy + cy
+                records.append((surface, x, y, None))
+            elif rtype == "tag":
                 index = renderable.get("index",0)
-                # bg_color = renderable.get("bg_color")
-                tw = 1.2 * screen_factor[0]#round(self.config.tile_size * screen_factor[0] /2)
-                th = 1.2 * screen_factor[1]
-                pos = obj.get_view_position() - Vector2(self.config.tile_size/2 - 1.2 * index, 0)
-                loc = scale(screen_factor, pos - center) + screen_view_center
-
-                # Bar
-                rect = pygame.Rect(loc[0], loc[1],
-                                   tw,
-                                   th)
-
-                pygame.draw.rect(self._view_port_surf, color, rect)            
+                x = (view_position[0] - half_tile + 1.2 * index) * sx + cx
+                y = view_position[1] * sy + cy
+                records.append((renderable, x, y, None))
             else:
-                position = renderable['position']
-                image_id = renderable['image_id']
-                angle = renderable['angle']
-                pos = obj.get_view_position() - position - obj.image_offset
-                self._draw_image(pos, center, image_id, angle, screen_factor, screen_view_center)
+                x = (view_position[0] - half_tile) * sx + cx
+                y = (view_position[1] - half_tile) * sy + cy
+                records.append((renderable, x, y, None))
+
+    def compile_draw_list(self, obj_lists, center, screen_angle, screen_factor, screen_view_center):
+        """
+        Flat draw records per visheight layer, in draw order:
+        (image_id, x, y, angle) for sprites centered at screen position x, y,
+        (surface, x, y, None) for infobox surfaces and (renderable, x, y, None) for other renderables,
+        both with their top left at x, y
+        """
+        used = {}
+        layers = []
+        for obj_list in obj_lists:
+            records = []
+            for obj in obj_list:
+                if not obj.enabled or not obj.is_visible():
+                    continue
+                self._compile_object(records, center, obj, screen_angle, screen_factor, screen_view_center, used)
+            layers.append(records)
+        # Drops infoboxes of objects no longer drawn
+        self.infobox_cache = used
+        return layers
+
+    def draw_records(self, records, screen_factor, color=(255, 0, 0)):
+        """
+        Draws the records of one layer, blitting images and surfaces with a single Surface.blits call
+        where nothing else is drawn in between
+        """
+        surf = self._view_port_surf
+        blits = []
+        for image, x, y, angle in records:
+            if isinstance(image, str):
+                if angle != 0:
+                    scaled = self.get_rotated_image_by_id(image, screen_factor[0], screen_factor[1], angle)
+                else:
+                    scaled = self.get_scaled_image_by_id(image, screen_factor[0], screen_factor[1])
+                if scaled is not None:
+                    blits.append((scaled, scaled.get_rect(center=(x, y))))
+                    continue
+                rect = pygame.Rect(0, 0, self.config.tile_size * screen_factor[0], self.config.tile_size * screen_factor[1])
+                rect.center = (x, y)
+                if blits:
+                    surf.blits(blits, doreturn=False)
+                    blits = []
+                pygame.draw.rect(surf, color, rect)
+            elif isinstance(image, pygame.Surface):
+                blits.append((image, (x, y)))
+            else:
+                if blits:
+                    surf.blits(blits, doreturn=False)
+                    blits = []
+                self._draw_renderable(image, (x, y), screen_factor)
+        if blits:
+            surf.blits(blits, doreturn=False)
+
+    def get_objects_in_view(self, center, margin=2):
+        """
+        Objects on tiles inside the view around center plus margin tiles, from the physics space
+        """
+        tile_size = self.config.tile_size
+        half_w = self.view_width / 2
+        half_h = self.view_height / 2
+        return gamectx.get_objects_in_window(
+            math.floor((center.x - half_w) / tile_size) - margin,
+            math.floor((center.y - half_h) / tile_size) - margin,
+            math.ceil((center.x + half_w) / tile_size) + margin,
+            math.ceil((center.y + half_h) / tile_size) + margin)
 
     def filter_objects_for_rendering(self, objs, camera: Camera):
+        """
+        Visible objects per visheight, each list sorted by distance to a point below the camera center.
+        objs is only scanned when there is no physics space to query the view from.
+        """
         center = camera.get_center()
         object_list_visheight_sorted = [[], [], [], []]
         if center is None:
             return []
-        for k, o in objs.items():
-            o: GObject = o
-            if o is not None and o.is_enabled() and o.is_visible():
-                view_position = o.get_view_position()
-                if view_position is not None:
-                    within_range = o.get_view_position().distance_to(center) < self.view_width
-                    if within_range:
-                        object_list_visheight_sorted[o.visheight].append(o)
+        if gamectx.physics_engine is not None:
+            candidates = self.get_objects_in_view(center)
+        else:
+            candidates = [o for o in objs.values()
+                          if o is not None and o.get_view_position() is not None
+                          and o.get_view_position().distance_to(center) < self.view_width]
 
         # TODO: Need to adjust with angle
-        center_bottom = center - Vector2(0, 100)
+        # Ties are broken by id (creation order), the order objects were drawn in when scanning all of them
+        bx = center.x
+        by = center.y - 100
+        keyed = [[], [], [], []]
+        for o in candidates:
+            o: GObject = o
+            if o.is_enabled() and o.is_visible() and o.get_view_position() is not None:
+                pos = o.get_position()
+                keyed[o.visheight].append(((pos.x - bx) ** 2 + (pos.y - by) ** 2, o.get_id(), o))
 
-        for lst in object_list_visheight_sorted:
-            lst.sort(key=lambda o: o.get_position().distance_to(center_bottom))
+        for lst, keyed_lst in zip(object_list_visheight_sorted, keyed):
+            keyed_lst.sort()
+            lst.extend(o for _, _, o in keyed_lst)
         return object_list_visheight_sorted
 
-    def ta(self, val):
-        return int((val//self.config.tile_size) * self.config.tile_size)
-
-    def _draw_background_image(self, image, center,  angle, screen_factor, screen_view_center):
-
-        rect = image.get_rect()
-        image_loc = scale(
-            Vector2(self.background_center[0] - center.x,
-                    self.background_center[1] - center.y),
-            screen_factor) + screen_view_center
-        rect.center = image_loc
-        self._view_port_surf.blit(image, rect)
-
-    def check_bounds(self, cv, cs, bv, bs):
-        return ((bv - bs/2) >= (cv - cs/2)) or ((bv+bs/2) <= (cv + cs/2))
-
-    def get_background_image(self, center, screen_factor):
-        #TODO: occationally shows black areas when moving right or down, but only during movement
-
-        # Align with tile coords
-        center = Vector2(self.ta(center.x), self.ta(center.y))
-
-        # Align and make sure odd number of tiles so center can be a single tile
-        surface_width = self.ta(self.view_width/2) * 5 + self.config.tile_size
-        surface_height = self.ta(self.view_height/2) * 5 + self.config.tile_size
-
-        if screen_factor == self.background_screen_factor and self.background is not None:
-            need_update = self.check_bounds(
-                center.x,
-                self.view_width,
-                self.background_center[0],
-                self.background_size[0])
-            if not need_update:
-                need_update = self.check_bounds(
-                    center.y,
-                    self.view_height,
-                    self.background_center[1],
-                    self.background_size[1])
-                if not need_update:
-                    return self.background
-
-        gamemap = self.asset_bundle.maploader.get("")
-
-        # Center tile for tile image id lookup
-        sur_center_x = surface_width/2 - center.x
-        sur_center_y = surface_height/2 - center.y
-        sur_center_tile_x = sur_center_x // self.config.tile_size
-        sur_center_tile_y = sur_center_y // self.config.tile_size
-
-        tmp_surface = pygame.Surface((surface_width, surface_height))
-        for z in gamemap.get_layers():
-            for tile_x in range(surface_width//self.config.tile_size):
-                ltile_x = (tile_x - sur_center_tile_x)
-                for tile_y in range(surface_height//self.config.tile_size):
-                    ltile_y = (tile_y - sur_center_tile_y)
-                    background_image_id = gamemap.get_image_by_loc(ltile_x, ltile_y, z)
-                    if background_image_id is not None:
-                        tile_image = self.get_image_by_id(background_image_id)
-
-                        rect = tile_image.get_rect()
-                        tile_pos = (int(tile_x * self.config.tile_size), int(tile_y * self.config.tile_size))
-                        rect.topleft = tile_pos
-                        tmp_surface.blit(tile_image, rect)
-
-        image_size = int(surface_width*screen_factor[0]), int(surface_height*screen_factor[1])
-
-        tmp_surface = pygame.transform.scale(tmp_surface, image_size)
-        self.background = tmp_surface
-        self.background_center = center
-        self.background_size = surface_width, surface_height
-        self.background_screen_factor = screen_factor
-        self.background_updates += 1
-        return self.background
-
     # TODO: Clean this up
     def process_frame(self,
                       player: Player = None):
@@ -613,8 +701,13 @@ class Renderer:
         screen_factor = Vector2(self.width / self.view_width, self.height / self.view_height)
         screen_view_center = scale(screen_factor, Vector2(self.view_width, self.view_height) / 2.0)
 
-        background = self.get_background_image(center, screen_factor)
-        self._draw_background_image(background, center, 0, screen_factor, screen_view_center)
+        self.background.set_gamemap(self.asset_bundle.maploader.get(""))
+        self.background.draw(
+            self._view_port_surf,
+            center,
+            (self.view_width, self.view_height),
+            screen_factor,
+            screen_view_center)
 
         if self.config.draw_grid:
             self._draw_grid(center,
@@ -627,12 +720,9 @@ class Renderer:
 
         obj_list_sorted_by_visheight = self.filter_objects_for_rendering(gamectx.object_manager.get_objects(), camera)
 
-        for visheight, render_obj_dict in enumerate(obj_list_sorted_by_visheight):
-            obj: GObject
-            for obj in render_obj_dict:
-                if not obj.enabled or not obj.is_visible():
-                    continue
-                self._draw_object(center, obj, angle, screen_factor, screen_view_center, obj.shape_color)
+        draw_list = self.compile_draw_list(obj_list_sorted_by_visheight, center, angle, screen_factor, screen_view_center)
+        for records in draw_list:
+            self.draw_records(records, screen_factor)
 
         if self.debug:
             pygame.draw.rect(self._view_port_surf,
@@ -654,8 +744,33 @@ class Renderer:
         if self.config.render_to_screen:
             pygame.display.flip()
 
-    def get_last_frame(self):
-        img_st = pygame.image.tostring(self._final_surf, self.format)
-        data = Image.frombytes(self.format, self.config.resolution, img_st)
-        np_data = np.array(data)
-        return np_data
+    def get_last_frame(self, out=None):
+        """
+        Last frame as a (height, width, channels) uint8 array, written into out when given.
+        RGB frames are read from the surface pixel buffer without intermediate copies.
+        """
+        surf = self._final_surf
+        bytesize = surf.get_bytesize()
+        if self.format != 'RGB' or bytesize < 3:
+            img_st = pygame.image.tostring(surf, self.format)
+            data = Image.frombytes(self.format, self.config.resolution, img_st)
+            if out is None:
+                return np.array(data)
+            out[:] = np.asarray(data)
+            return out
+
+        width, height = surf.get_size()
+        if out is None:
+            out = np.empty((height, width, 3), dtype=np.uint8)
+        # The buffer locks the surface until released
+        buffer = surf.get_buffer()
+        try:
+            pixels = np.frombuffer(buffer, dtype=np.uint8).reshape(height, surf.get_pitch())
+            pixels = pixels[:, :width * bytesize].reshape(height, width, bytesize)
+            for channel, shift in enumerate(surf.get_shifts()[:3]):
+                byte = shift // 8 if sys.byteorder == 'little' else bytesize - 1 - shift // 8
+                out[..., channel] = pixels[..., byte]
+            del pixels
+        finally:
+            del buffer
+        return out
@@ -17,7 +17,7 @@ from landia.renderer import Renderer
 from landia.utils import gen_id
 import traceback
 from landia import gamectx
-from landia.server import GameUDPServer, UDPHandler 
+from landia.server import GameServer
 import signal
 import sys
 
@@ -38,13 +38,16 @@ def get_game_def(
         tick_rate=None,
         step_mode =False,
         config_filename="base_config.json",
-        content_overrides={}
+        content_overrides={},
+        shared_memory=False
 ) -> GameDef:
     game_def = load_game_def(game_id, config_filename, content_overrides)
 
     game_def.server_config.enabled = enable_server
     game_def.server_config.hostname = '0.0.0.0'
     game_def.server_config.port = port
+    if shared_memory:
+        game_def.server_config.shared_memory_name = f"landia_{port}"
     game_def.game_config.step_mode = step_mode
     game_def.game_config.config_filename =config_filename
 
@@ -76,7 +79,10 @@ def get_player_def(
         enable_resize=False,
         include_state_observation = False,
         render_to_screen=True,
-        disable_hud = False) -> PlayerDefinition:
+        disable_hud = False,
+        codec = "binary",
+        poll_snapshots = False,
+        local_transport = False) -> PlayerDefinition:
     player_def = PlayerDefinition()
 
     player_def.client_config.player_type = player_type
@@ -89,6 +95,9 @@ def get_player_def(
     player_def.client_config.is_remote = remote_client
     player_def.client_config.is_human = is_human
     player_def.client_config.include_state_observation = include_state_observation
+    player_def.client_config.codec = codec
+    player_def.client_config.poll_snapshots = poll_snapshots
+    player_def.client_config.local_transport = local_transport
 
     player_def.renderer_config.resolution = resolution
     player_def.renderer_config.render_shapes = render_shapes
@@ -144,10 +153,16 @@ def get_arguments(override_args=None):
 
     # Game Options
     parser.add_argument("--enable_profiler", action="store_true", help="Enable Performance profiler")
+    parser.add_argument("--tick_profile_file", default=None, help="Write per tick phase timings, event and object counts to this .json or .csv file")
+    parser.add_argument("--tick_profile_every", default=1000, type=int, help="Ticks between tick profile writes")
     parser.add_argument("--tick_rate", default=60, type=int, help="tick_rate")
     parser.add_argument("--game_id", default="survival", help="id of game")
     parser.add_argument("--content_overrides", default="{}", type=str,help="Content overrides in JSON format Eg: --content_overrides='{\"maps\":{\"main\":{\"static_layers\":[\"map_layer_test.txt\"]}}}'")
     parser.add_argument("--log_level",default="info",help=", ".join(list(LOG_LEVELS.keys())),type=str)
+    parser.add_argument("--codec", default="binary", help="Snapshot codec used by remote clients: binary, or json as a fallback")
+    parser.add_argument("--poll_snapshots", action="store_true", help="Remote client requests each snapshot instead of receiving the server's broadcast")
+    parser.add_argument("--shared_memory", action="store_true", help="Server also publishes snapshots to shared memory for clients on the same host")
+    parser.add_argument("--local_transport", action="store_true", help="Remote client reads snapshots from the server's shared memory (same host)")
     
     parser.add_argument("--step_mode", action="store_true", help="Step mode (requires input for game time to proceed)")
     
@@ -185,7 +200,12 @@ def run(args):
         step_mode = args.step_mode,
         config_filename=args.config_filename,
         content_overrides = json.loads(args.content_overrides),
+        shared_memory=args.shared_memory,
     )
+    if args.tick_profile_file is not None:
+        game_def.game_config.profile_ticks = True
+        game_def.game_config.profile_dump_path = args.tick_profile_file
+        game_def.game_config.profile_dump_every = args.tick_profile_every
 
     # Get resolution
     if args.enable_client and args.resolution == 'f':
@@ -219,7 +239,10 @@ def run(args):
         show_console= args.show_console,
         enable_resize = args.enable_resize,
         disable_hud = args.disable_hud,
-        player_name=args.player_name
+        player_name=args.player_name,
+        codec=args.codec,
+        poll_snapshots=args.poll_snapshots,
+        local_transport=args.local_transport
     )
 
     content: Content = load_game_content(game_def)
@@ -243,26 +266,25 @@ def run(args):
 
     def graceful_exit(signum=None, frame=None):
         print("Shutting down")
-        if game_def.server_config.enabled:
-            # server.shutdown()
-            server.server_close()
+        if server is not None:
+            gamectx.set_server(None)
+            server.close()
 
         if args.enable_profiler:
             profiler.stop()
             print(profiler.output_text(unicode=True, color=True))
+        if args.tick_profile_file is not None:
+            print(f"Tick profile written to {gamectx.profiler.dump()}")
         exit()
     signal.signal(signal.SIGINT, graceful_exit)
 
     try:
         if game_def.server_config.enabled:
             
-            server = GameUDPServer(
+            server = GameServer(
                 conn=(game_def.server_config.hostname, game_def.server_config.port),
-                config=game_def.server_config)
-
-            server_thread = threading.Thread(target=server.serve_forever)
-            server_thread.daemon = True
-            server_thread.start()
+                config=game_def.server_config).start()
+            gamectx.set_server(server)
             print("Server started at {} port {}".format(game_def.server_config.hostname, game_def.server_config.port))
 
 
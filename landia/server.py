@@ -1,59 +1,245 @@
-
-import json
+import asyncio
+import ipaddress
 import logging
 import math
-import socketserver
 import struct
 import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Tuple
 
 import lz4.frame
 
-from landia.config import  ServerConfig
-from landia.common import StateDecoder, StateEncoder
+from landia.config import ServerConfig
+from landia.codec import SnapshotCodec, detect_codec
 
 from landia import gamectx
 from .clock import clock
+from .local_transport import SharedQueue, SnapshotPublisher, is_queue_name
+from .transport import KIND_NACK, NACK_DELAY, Reassembler, SentMessages, pack_nacks, split_message, unpack_nack
+
+# Reply payload: length of the shared part, the shared part, then the client's own part
+SHARED_HEADER = struct.Struct("<I")
+
 
-class UDPHandler(socketserver.BaseRequestHandler):
+class GameServerProtocol(asyncio.DatagramProtocol):
+    """
+    Decodes client requests on the server's event loop and queues them for the game loop
+    """
 
-    def handle(self):
-        config: ServerConfig = self.server.config
+    def __init__(self, server):
+        self.server = server
 
-        # Process Request data
-        request_st = self.request[0]
-        request_st = lz4.frame.decompress(request_st)
-        request_st = request_st.decode('utf-8').strip()
+    def connection_made(self, transport):
+        self.server.transport = transport
+
+    def datagram_received(self, data, addr):
         try:
-            request_data = json.loads(request_st, cls=StateDecoder)
+            if data[0] == KIND_NACK:
+                self.server.resend(data, addr)
+                return
+            message = self.server.reassembler.add(data, addr)
+            if message is None:
+                return
+            request_st = lz4.frame.decompress(message)
+            # Reply with the codec the client used
+            codec = detect_codec(request_st)
+            request_data = codec.decode(request_st)
         except Exception as e:
-            print(request_st)
-            raise e
+            logging.warning(f"Dropping request from {addr}: {e}")
+            return
+        self.server.requests.append((request_data, codec, addr))
 
-        request_info = request_data['info']
+    def error_received(self, exc):
+        logging.debug(f"Server socket error: {exc}")
+
+
+class GameServer:
+    """
+    UDP game server with an asyncio event loop in its own thread.
+
+    The event loop only decodes requests and sends replies, the game state is only touched by the game loop:
+    gamectx.run_step calls process_requests before the tick's events and send_snapshots after the update.
+    Clients either poll, each "UPDATE" request is answered after the tick it arrived in, or stream: their "STREAM"
+    messages carry inputs and acks only, and the server broadcasts snapshots to their endpoints at snapshot_rate.
+
+    With shared_memory_name set, every tick is also published to a shared memory ring (see SnapshotPublisher)
+    for clients on the same host. They join with a "LOCAL" request from a loopback address naming their input
+    queue, answered like an "UPDATE", and from then on send their inputs through that queue.
+
+    Object and player snapshots are taken once per tick. Clients in the same interest group
+    (see GameContext.get_interest_group) which last received the same tick share one encoded snapshot part.
+    With delta_snapshots each client gets diffs against its own baseline, so only the object snapshots are shared.
+    """
+
+    def __init__(self, conn, config: ServerConfig):
+        self.conn = conn
+        self.config = config
+        self.requests = deque()
+        self.replies: Dict[str, Tuple[Any, Any, SnapshotCodec, List]] = {}
+        # Streaming clients: client, codec, address and time of the last message
+        self.subscribers: Dict[str, Tuple[Any, SnapshotCodec, Any, float]] = {}
+        self.next_broadcast = 0.0
+        # Shared memory clients: input queue and time of the last message
+        self.local_clients: Dict[str, Tuple[SharedQueue, float]] = {}
+        self.publisher: SnapshotPublisher = None
+        if config.shared_memory_name is not None:
+            self.publisher = SnapshotPublisher(
+                config.shared_memory_name,
+                slot_count=config.shared_memory_slots,
+                slot_size=config.shared_memory_slot_size,
+                keyframe_interval=config.keyframe_interval)
+        # Messages are numbered by the server, not per client, chunks of recent replies are kept for retransmits
+        self.next_seq = 0
+        self.sent = SentMessages(config.resend_buffer_size)
+        self.reassembler = Reassembler(max_pending=256)
+        self.retransmits = 0
+        self.loop: asyncio.AbstractEventLoop = None
+        self.transport: asyncio.DatagramTransport = None
+        self.thread: threading.Thread = None
+        self.server_address = None
+        self.requests_received = 0
+        self.replies_sent = 0
+        self.broadcasts = 0
+        self.encodes = 0
+        self.shared_encodes = 0
+        # Snapshots, objects and diffs of one tick, shared by its replies
+        self.clear_tick_state()
 
-        request_message = request_info['message']
+    def start(self):
+        loop = asyncio.new_event_loop()
+        self.loop = loop
+        started = threading.Event()
+        errors = []
+
+        def run_loop():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(loop.create_datagram_endpoint(
+                    lambda: GameServerProtocol(self),
+                    local_addr=self.conn))
+            except Exception as e:
+                errors.append(e)
+                return
+            finally:
+                started.set()
+            loop.call_soon(self.send_nacks)
+            loop.run_forever()
+            loop.close()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True)
+        self.thread.start()
+        started.wait()
+        if len(errors) > 0:
+            raise errors[0]
+        self.server_address = self.transport.get_extra_info('sockname')
+        return self
+
+    def close(self):
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+        for client_id in list(self.local_clients.keys()):
+            self.detach_local_client(client_id)
+        if self.loop is None:
+            return
+        loop = self.loop
+        self.loop = None
+
+        def stop():
+            self.transport.close()
+            loop.stop()
+        loop.call_soon_threadsafe(stop)
+        self.thread.join(timeout=5)
+
+    def send_all(self, messages):
+        """
+        Splits and sends reply payloads to their addresses, on the event loop
+        """
+        chunk_size = self.config.outgoing_chunk_size
+        for payload, addrs in messages:
+            seq = self.next_seq
+            self.next_seq = (seq + 1) & 0xFFFFFFFF
+            chunks = split_message(seq, payload, chunk_size)
+            self.sent.add(seq, chunks, set(addrs))
+            for addr in addrs:
+                for chunk in chunks:
+                    self.transport.sendto(chunk, addr)
+
+    def resend(self, data, addr):
+        seq, indexes = unpack_nack(data)
+        for chunk in self.sent.get_chunks(seq, indexes, addr):
+            self.transport.sendto(chunk, addr)
+            self.retransmits += 1
+
+    def send_nacks(self):
+        """
+        Requests the missing chunks of stalled multi chunk requests, rescheduled on the event loop
+        """
+        if self.loop is None:
+            return
+        for addr, seq, missing in self.reassembler.get_nacks():
+            for nack in pack_nacks(seq, missing):
+                self.transport.sendto(nack, addr)
+        self.loop.call_later(NACK_DELAY, self.send_nacks)
+
+    def process_requests(self):
+        """
+        Applies the queued requests: acks, client events and new players. Called by the game loop.
+        """
+        if len(self.local_clients) > 0:
+            self.read_local_requests()
+        while len(self.requests) > 0:
+            request_data, codec, addr = self.requests.popleft()
+            self.requests_received += 1
+            self.apply_request(request_data, codec, addr)
+
+    def read_local_requests(self):
+        """
+        Queues the requests of shared memory clients, dropping clients which timed out
+        """
+        expired = time.time() - self.config.client_timeout
+        for client_id, (queue, last_seen) in list(self.local_clients.items()):
+            try:
+                messages = queue.get_all()
+            except ValueError as e:
+                logging.warning(f"Dropping local client {client_id}: {e}")
+                self.detach_local_client(client_id)
+                continue
+            if len(messages) == 0:
+                if last_seen < expired:
+                    self.detach_local_client(client_id)
+                continue
+            self.local_clients[client_id] = (queue, time.time())
+            for data in messages:
+                try:
+                    self.requests.append((self.publisher.codec.decode(data), self.publisher.codec, None))
+                except Exception as e:
+                    logging.warning(f"Dropping local request from {client_id}: {e}")
+
+    def apply_request(self, request_data, codec, addr):
+        config = self.config
+        request_info = request_data['info']
+        message = request_info.get('message', "UPDATE")
         client = gamectx.get_remote_client(request_info['client_id'])
         player = gamectx.get_player(
-            client, 
+            client,
             player_type=request_info['player_type'],
             is_human=request_info['is_human'],
-            name=request_info['name'])
+            name=request_info.get('name'))
+        client.conn_info = addr
         snapshots_received = request_info['snapshots_received']
 
-        # simulate missing parts
-        skip_remove = False  # random.random() < 0.01
-
         # Reconnect?
         if len(snapshots_received) == 0:
-            client.last_snapshot_time_ms = 0 
+            client.last_snapshot_time_ms = 0
+            client.reset_object_baseline()
+            client.reset_interest()
 
         for t in snapshots_received:
             if t in client.unconfirmed_messages:
-                if skip_remove:
-                    print("Skipping remove confirmation")
-                    continue
-                else:
-                    client.unconfirmed_messages.remove(t)
+                client.unconfirmed_messages.remove(t)
+                client.confirm_snapshot(t)
 
         # Load events from client
         all_events_data = []
@@ -66,12 +252,216 @@ class UDPHandler(socketserver.BaseRequestHandler):
         if len(client.unconfirmed_messages) >= config.max_unconfirmed_messages_before_new_snapshot:
             client.last_snapshot_time_ms = 0
             client.unconfirmed_messages = set()
-        
-        snapshot_timestamp, snapshot = gamectx.create_snapshot_for_client(client)
-        
-        client.unconfirmed_messages.add(snapshot_timestamp)
+            client.reset_object_baseline()
+
+        if message == "STREAM":
+            self.subscribers[client.get_id()] = (client, codec, addr, time.time())
+            return
+
+        if message == "LOCAL":
+            if addr is None:
+                # From the input queue
+                return
+            self.attach_local_client(client.get_id(), request_info.get('input_queue'), addr)
+
+        # One reply per tick, sent to every address the client asked from
+        reply = self.replies.get(client.get_id())
+        addrs = [] if reply is None else reply[3]
+        if addr not in addrs:
+            addrs.append(addr)
+        self.replies[client.get_id()] = (client, player, codec, addrs)
+
+    def attach_local_client(self, client_id, queue_name, addr):
+        """
+        Reads client_id's inputs from the shared memory queue queue_name, if the request came from this host
+        """
+        if self.publisher is None or queue_name is None:
+            return
+        try:
+            loopback = ipaddress.ip_address(addr[0]).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback or not is_queue_name(queue_name):
+            logging.warning(f"Ignoring local join of {client_id} from {addr} with queue {queue_name!r}")
+            return
+        local_client = self.local_clients.get(client_id)
+        if local_client is not None:
+            if local_client[0].name == queue_name:
+                return
+            self.detach_local_client(client_id)
+        try:
+            queue = SharedQueue(queue_name, create=False)
+        except (FileNotFoundError, ValueError) as e:
+            logging.warning(f"Can't attach input queue of {client_id}: {e}")
+            return
+        self.local_clients[client_id] = (queue, time.time())
+        gamectx.get_remote_client(client_id).shared_memory = True
+
+    def detach_local_client(self, client_id):
+        queue, _ = self.local_clients.pop(client_id)
+        queue.close()
+        client = gamectx.remote_clients.get(client_id)
+        if client is not None:
+            client.shared_memory = False
+
+    def add_client_event(self, e):
+        """
+        Client events for the shared memory clients, published with the next frame
+        """
+        if self.publisher is not None and len(self.local_clients) > 0:
+            self.publisher.add_event(e)
 
-        # Build response data
+    def send_snapshots(self):
+        """
+        Answers the requests applied this tick, broadcasts to the streaming clients when due and publishes
+        the tick to shared memory. Called by the game loop.
+        """
+        if self.publisher is not None:
+            profiler = gamectx.profiler
+            start = profiler.start()
+            self.publisher.publish(snapshots=self.obj_snapshots)
+            profiler.record("publish", start)
+        targets = self.replies
+        if len(self.subscribers) > 0 and time.perf_counter() >= self.next_broadcast:
+            targets = dict(targets)
+            self.add_broadcast_targets(targets)
+        if len(targets) == 0:
+            if self.publisher is not None:
+                self.clear_tick_state()
+            return
+        snapshot_timestamp = clock.get_ticks()
+        messages = []
+        for client, player, codec, addrs in targets.values():
+            payload = self.create_reply(client, player, codec, snapshot_timestamp)
+            client.unconfirmed_messages.add(snapshot_timestamp)
+            client.last_snapshot_time_ms = snapshot_timestamp
+            messages.append((payload, addrs))
+            self.replies_sent += 1
+        self.replies = {}
+        self.clear_tick_state()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.send_all, messages)
+
+    def add_broadcast_targets(self, targets):
+        """
+        Adds the streaming clients to the tick's reply targets, dropping those which timed out
+        """
+        now = time.perf_counter()
+        period = 1.0 / self.config.snapshot_rate
+        self.next_broadcast += period
+        if self.next_broadcast < now:
+            self.next_broadcast = now + period
+        expired = time.time() - self.config.client_timeout
+        for client_id, (client, codec, addr, last_seen) in list(self.subscribers.items()):
+            player = gamectx.player_manager.get_player(client.player_id)
+            if last_seen < expired or player is None:
+                del self.subscribers[client_id]
+                continue
+            if client_id not in targets:
+                targets[client_id] = (client, player, codec, [addr])
+        self.broadcasts += 1
+
+    def clear_tick_state(self):
+        self.obj_snapshots = {}
+        self.player_snapshots = {}
+        self.group_objects = {}
+        self.group_players = {}
+        self.shared_parts = {}
+        self.diff_cache = {}
+
+    def get_player_snapshots(self, group, obj_ids):
+        """
+        Snapshots of the players with an object in obj_ids or without an object, all players if obj_ids is None.
+        Cached by interest group for the tick, callers copy before adding to it.
+        """
+        results = self.group_players.get(group)
+        if results is None:
+            results = {}
+            for player in gamectx.player_manager.players_map.values():
+                obj_id = player.get_object_id()
+                if obj_ids is None or obj_id is None or obj_id in obj_ids:
+                    results[player.get_id()] = self.get_player_snapshot(player)
+            self.group_players[group] = results
+        return results
+
+    def get_player_snapshot(self, player):
+        snapshot = self.player_snapshots.get(player.get_id())
+        if snapshot is None:
+            snapshot = player.get_snapshot()
+            self.player_snapshots[player.get_id()] = snapshot
+        return snapshot
+
+    def get_shared_part(self, codec: SnapshotCodec, group, obj_ids, changed_since):
+        """
+        Encoded snapshot of the group's objects changed since changed_since and of its players, once per tick.
+        Returns the encoded part, its object snapshots and its player ids.
+        """
+        key = (codec.name, group, changed_since)
+        shared_part = self.shared_parts.get(key)
+        if shared_part is None:
+            profiler = gamectx.profiler
+            start = profiler.start()
+            om_snapshot = gamectx.object_manager.get_snapshot_update(
+                changed_since, obj_ids=obj_ids, snapshots=self.obj_snapshots)
+            pm_snapshot = self.get_player_snapshots(group, obj_ids)
+            start = profiler.record("snapshot", start)
+            shared_part = (
+                lz4.frame.compress(codec.encode({'om': om_snapshot, 'pm': pm_snapshot})),
+                om_snapshot,
+                pm_snapshot.keys())
+            profiler.record("snapshot_encode", start)
+            self.encodes += 1
+            self.shared_encodes += 1
+            self.shared_parts[key] = shared_part
+        return shared_part
+
+    def create_reply(self, client, player, codec: SnapshotCodec, snapshot_timestamp):
+        config = self.config
+        object_manager = gamectx.object_manager
+        profiler = gamectx.profiler
+        start = profiler.start()
+
+        group = None
+        obj_ids = None
+        entered = set()
+        if config.interest_distance_scale is not None:
+            group = gamectx.get_interest_group(
+                client, config.interest_distance_scale, config.interest_margin, config.interest_group_size)
+            obj_ids = self.group_objects.get(group)
+            if obj_ids is None:
+                if group is None:
+                    # Clients without a camera get every object
+                    obj_ids = set(object_manager.get_objects().keys())
+                else:
+                    obj_ids = gamectx.get_interest_group_objects(group)
+                self.group_objects[group] = obj_ids
+            entered = client.update_interest(snapshot_timestamp, obj_ids)
+
+        shared = b""
+        if config.delta_snapshots and len(client.acked_objects) > 0:
+            om_snapshot = object_manager.get_snapshot_update(
+                client.last_snapshot_time_ms,
+                obj_ids=obj_ids,
+                include_ids=entered,
+                snapshots=self.obj_snapshots)
+            om_snapshot = client.create_object_deltas(snapshot_timestamp, om_snapshot, diff_cache=self.diff_cache)
+            pm_snapshot = dict(self.get_player_snapshots(group, obj_ids))
+            pm_snapshot[player.get_id()] = self.get_player_snapshot(player)
+        else:
+            start = profiler.record("snapshot", start)
+            shared, shared_om, shared_player_ids = self.get_shared_part(
+                codec, group, obj_ids, client.last_snapshot_time_ms)
+            start = profiler.start()
+            # Objects which entered the client's region unchanged aren't in the shared part
+            missing = entered.difference(s['data']['id'] for s in shared_om)
+            om_snapshot = object_manager.get_snapshot_update(
+                math.inf, obj_ids=missing, include_ids=missing, snapshots=self.obj_snapshots)
+            if config.delta_snapshots:
+                # Without a baseline every object is sent in full, as in the shared part, this records what was sent
+                client.create_object_deltas(snapshot_timestamp, shared_om + om_snapshot)
+            pm_snapshot = {}
+            if player.get_id() not in shared_player_ids:
+                pm_snapshot[player.get_id()] = self.get_player_snapshot(player)
 
         response_data = {}
         response_data['info'] = {
@@ -80,33 +470,18 @@ class UDPHandler(socketserver.BaseRequestHandler):
             'message': "UPDATE",
             'client_id': client.get_id(),
             'player_id': player.get_id(),
-            'snapshot_timestamp': snapshot_timestamp}
-        response_data['snapshot'] = snapshot
-
-        # Convert response to json then compress and send in chunks
-        response_data_st = json.dumps(response_data, cls=StateEncoder)
-        response_data_st = bytes(response_data_st, 'utf-8')
-        response_data_st = lz4.frame.compress(response_data_st)
-
-        chunk_size = config.outgoing_chunk_size
-        chunks = math.ceil(len(response_data_st)/chunk_size)
-        socket = self.request[1]
-        for i in range(chunks+1):  # TODO: +1 ??? why
-            header = struct.pack('ll', i+1, chunks)
-            data_chunk = header + response_data_st[i*chunk_size:(i+1)*chunk_size]
-            # current_thread = threading.current_thread()
-            # Simulate packet loss
-            # if random.random() < 0.01:
-            #     print("random skip chunk")
-            #     continue
-            socket.sendto(data_chunk, self.client_address)
-
-        client.last_snapshot_time_ms = snapshot_timestamp
-
-
-# TODO: Have a thread snapshot at regular intervals
-class GameUDPServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
-
-    def __init__(self, conn, config, handler = UDPHandler):
-        socketserver.UDPServer.__init__(self, conn, handler)
-        self.config = config
\ No newline at end of file
+            'snapshot_timestamp': snapshot_timestamp,
+            'snapshot_ring': None if self.publisher is None else self.publisher.name}
+        response_data['snapshot'] = {
+            'om': om_snapshot,
+            'rm': list(client.unconfirmed_removals.keys()),
+            'pm': pm_snapshot,
+            'em': client.pull_events_snapshot(),
+            'timestamp': snapshot_timestamp,
+        }
+        start = profiler.record("snapshot", start)
+
+        response_data_st = lz4.frame.compress(codec.encode(response_data))
+        self.encodes += 1
+        profiler.record("snapshot_encode", start)
+        return SHARED_HEADER.pack(len(shared)) + shared + response_data_st
@@ -37,6 +37,9 @@ class SurvivalContent(Content):
     def create_object_from_config_id(self, config_id):
         pass
 
+    def tags_changed(self, obj):
+        pass
+
     @abstractmethod
     def create_behavior(self, name):
         pass
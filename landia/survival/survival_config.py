@@ -125,5 +125,6 @@ def game_def(config_filename ='base_config.json',content_overrides={}):
     )
     game_def.physics_config.tile_size = content_config.get("tile_size")
     game_def.physics_config.engine = "grid"
+    game_def.physics_config.space_type = content_config.get("physics_space_type","dict")
     
     return game_def
\ No newline at end of file
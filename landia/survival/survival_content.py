@@ -18,6 +18,7 @@ from landia.event import (AdminCommandEvent, DelayedEvent, Event, InputEvent,
                           SoundEvent, ViewEvent)
 from landia.object import GObject
 from landia.player import Player
+from landia.asset_store import get_asset_store
 from landia.renderer import Renderer
 from landia.utils import gen_id, getsize, getsizewl, merged_dict
 
@@ -27,6 +28,7 @@ from .survival_controllers import (FoodCollectController, InfectionController,
                                    ObjectCollisionController, CTFController,
                                    PlayerSpawnController, TagController)
 from .survival_map import GameMap
+from .survival_observation import ObservationGrid, TileRasterizer
 from .survival_objects import *
 from .survival_utils import (int_map_to_onehot_map, ints_to_multi_hot,
                              vec_to_coord)
@@ -69,6 +71,8 @@ class GameContent(SurvivalContent):
         self.max_obs_id = len(self.obj_int_map)
         self.obj_vec_map = int_map_to_onehot_map(self.obj_int_map)
         self.vision_radius = 2  # Vision info should be moved to objects, possibly predifined
+        self.observation_grid: ObservationGrid = None
+        self.tile_rasterizer: TileRasterizer = None
 
         self.player_count = 0
 
@@ -257,6 +261,16 @@ class GameContent(SurvivalContent):
     # **********************************
     # GAME LOAD
     # **********************************
+    def load_space_bounds(self):
+        boundary = self.gamemap.boundary
+        if boundary is None or 'x' not in boundary or 'y' not in boundary:
+            return
+        gamectx.physics_engine.space.set_bounds(
+            boundary['x'][0],
+            boundary['y'][0],
+            boundary['x'][1],
+            boundary['y'][1])
+
     def load(self, is_client_only=False):
         self.loaded = False
         if not is_client_only:
@@ -269,6 +283,7 @@ class GameContent(SurvivalContent):
                 logging.info("Loading from new game")
                 self.gamemap.initialize((0, 0))
 
+            self.load_space_bounds()
             self.load_controllers()
 
         gamectx.physics_engine.set_collision_callback(
@@ -297,7 +312,99 @@ class GameContent(SurvivalContent):
         return spaces.Discrete(len(self.agent_key_list))
 
     def get_observation(self, obj: GObject):
-        return obj.get_observation()
+        return self.get_observations([obj])[0]
+
+    def get_observation_grid(self) -> ObservationGrid:
+        space = gamectx.physics_engine.space
+        if self.observation_grid is None or self.observation_grid.space is not space:
+            boundary = self.gamemap.boundary
+            if boundary is None or 'x' not in boundary or 'y' not in boundary:
+                return None
+            self.observation_grid = ObservationGrid(self, self.vision_radius)
+            self.observation_grid.attach(
+                space,
+                (boundary['x'][0], boundary['y'][0], boundary['x'][1], boundary['y'][1]))
+        return self.observation_grid
+
+    def get_observations(self, objs: List[GObject]):
+        grid = self.get_observation_grid()
+        if grid is None:
+            return [obj.get_observation() for obj in objs]
+
+        coords = [gamectx.physics_engine.vec_to_coord(obj.get_position()) for obj in objs]
+        inside = [i for i, coord in enumerate(coords) if grid.in_grid(coord)]
+        observations = [None] * len(objs)
+        if len(inside) > 0:
+            windows = grid.get_windows([coords[i] for i in inside])
+            for i, window in zip(inside, windows):
+                observations[i] = window
+        for i, obj in enumerate(objs):
+            if observations[i] is None:
+                observations[i] = obj.get_observation()
+        return observations
+
+    def get_tile_rasterizer(self) -> TileRasterizer:
+        space = gamectx.physics_engine.space
+        if self.tile_rasterizer is None or self.tile_rasterizer.space is not space:
+            boundary = self.gamemap.boundary
+            if boundary is None or 'x' not in boundary or 'y' not in boundary:
+                return None
+            self.tile_rasterizer = TileRasterizer(
+                self,
+                get_asset_store(self.get_asset_bundle()),
+                tile_size=self.tile_size,
+                pad=16)
+            self.tile_rasterizer.attach(
+                space,
+                (boundary['x'][0], boundary['y'][0], boundary['x'][1], boundary['y'][1]),
+                self.gamemap)
+        return self.tile_rasterizer
+
+    def get_symbolic_observations(self, players: List[Player], out):
+        """
+        Views of the players' cameras rasterized into out, black for players without a camera.
+        Raises ValueError for maps without a boundary and for rotating cameras, which aren't rasterized.
+        """
+        rasterizer = self.get_tile_rasterizer()
+        if rasterizer is None:
+            raise ValueError("Symbolic observations require a map with an x and y boundary")
+        rows, cols = out.shape[1], out.shape[2]
+        tile_size = self.tile_size
+        centers = []
+        view_sizes = []
+        blank = []
+        for i, player in enumerate(players):
+            camera = None if player is None else player.get_camera()
+            if camera is None:
+                blank.append(i)
+                centers.append((0, 0))
+                view_sizes.append((cols, rows))
+                continue
+            if camera.get_view_type() != 1 or camera.angle != 0:
+                raise ValueError(
+                    f"Symbolic observations require unrotated cameras (view_type 1), player {player.get_id()} has "
+                    f"view_type {camera.get_view_type()} and angle {camera.angle}")
+            # Same view as Renderer.process_frame
+            distance = min(max(camera.get_distance(), tile_size * 5), tile_size * 100)
+            view_height = max(distance, 10)
+            view_width = view_height * cols / rows
+            center = camera.get_center()
+            if center is None:
+                center = Vector2(view_width/2, view_height/2)
+            center = center - camera.position_offset
+            centers.append((center.x, center.y))
+            view_sizes.append((view_width, view_height))
+        rasterizer.rasterize(centers, view_sizes, out)
+        for i in blank:
+            out[i] = 0
+        return out
+
+    def get_sector_coord_from_pos(self, pos):
+        return self.gamemap.get_sector_coord_from_pos(pos)
+
+    def tags_changed(self, obj):
+        if self.observation_grid is not None:
+            self.observation_grid.mark_object(obj)
 
     def get_step_info(self, player: Player, include_state_observation=True) -> Tuple[np.ndarray, float, bool, Dict[str, Any], bool]:
         observation = None
@@ -620,12 +727,16 @@ class GameContent(SurvivalContent):
 
     # Main UPDATE Function
     def update(self):
+        profiler = gamectx.profiler
+        start = profiler.start()
         objs = list(gamectx.object_manager.get_objects().values())
         for o in objs:
             if not o.enabled or o.sleeping:
                 continue
             o.update()
+        start = profiler.record("objects", start)
         self.update_controllers()
+        profiler.record("controllers", start)
 
         if self.debug_memory:
             cur_tick = clock.get_ticks()
@@ -22,6 +22,54 @@ def get_tile_image_id(x, y, seed):
     return f"grass{v}"
 
 
+class TileVariants:
+    """
+    Memoized rand_int_from_coord for one seed. The bounded map is precomputed into a numpy grid,
+    coords outside of it are computed a chunk at a time and cached.
+    The coord mix is vectorized; each distinct value is hashed with sha1 once, so results are unchanged.
+    """
+
+    def __init__(self, seed=123, chunk_size=32):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.origin = (0, 0)
+        self.grid: np.ndarray = np.zeros((0, 0), dtype=np.int32)
+        # Nested lists of the same values, indexing them is much faster than numpy scalar access
+        self.grid_rows = []
+        self.chunks = {}
+
+    def compute(self, x0, y0, width, height) -> np.ndarray:
+        xs = np.arange(x0, x0 + width, dtype=np.int64)[:, None]
+        ys = np.arange(y0, y0 + height, dtype=np.int64)[None, :]
+        values = (xs + ys * self.seed) % 12783723
+        unique_values, inverse = np.unique(values, return_inverse=True)
+        hashes = np.fromiter(
+            (int(hashlib.sha1(str.encode(f"{v}")).hexdigest(), 16) % 172837 for v in unique_values.tolist()),
+            dtype=np.int32, count=len(unique_values))
+        return hashes[inverse].reshape(width, height)
+
+    def precompute(self, xrange, yrange):
+        """
+        Fills the grid for tile coords xrange[0]..xrange[1], yrange[0]..yrange[1] (inclusive)
+        """
+        self.origin = (xrange[0], yrange[0])
+        self.grid = self.compute(xrange[0], yrange[0], xrange[1] - xrange[0] + 1, yrange[1] - yrange[0] + 1)
+        self.grid_rows = self.grid.tolist()
+
+    def get(self, x, y) -> int:
+        gx = x - self.origin[0]
+        gy = y - self.origin[1]
+        if 0 <= gx < self.grid.shape[0] and 0 <= gy < self.grid.shape[1]:
+            return self.grid_rows[gx][gy]
+        key = (x // self.chunk_size, y // self.chunk_size)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.compute(
+                key[0] * self.chunk_size, key[1] * self.chunk_size, self.chunk_size, self.chunk_size).tolist()
+            self.chunks[key] = chunk
+        return chunk[x % self.chunk_size][y % self.chunk_size]
+
+
 class Sector:
 
     def __init__(self, scoord, height, width):
@@ -70,6 +118,7 @@ class GameMap:
         self.sectors_loaded = set()
         self.loaded = False
         self.spawn_points = {}
+        self.tile_variants = TileVariants(seed)
 
     def get_sector_coord(self, coord):
         if coord is None:
@@ -184,6 +233,7 @@ class GameMap:
                 self.boundary['x']=[4,20]
             if "y" not in self.boundary:
                 self.boundary['y']=[4,20]
+        self.tile_variants.precompute(self.boundary['x'], self.boundary['y'])
         self.load_sectors_near_coord(self.get_sector_coord(coord))
 
     def get_neigh_coords(self, scoord) -> set:
@@ -234,9 +284,8 @@ class GameMap:
 
     def get_image_by_loc(self, x, y, layer_id):
         if layer_id == 0:
-            return get_tile_image_id(x, y, self.seed)
+            return f"grass{self.tile_variants.get(x, y) % 3 + 1}"
 
-        loc_id = rand_int_from_coord(x, y, self.seed)
         if x == 0 and y == 0:
             return "baby_tree"
         if x == 2 and y == 3:
@@ -189,12 +189,14 @@ class PhysicalObject(GObject):
 
     def add_tag(self, tag, overrides={}):
         self.tags.add(tag)
+        self._l_content.tags_changed(self)
         effect = self._l_content.get_effect_by_tag_id(tag, overrides)
         if effect is not None:
             self.add_effect(effect)
 
     def remove_tag(self, tag):
         self.tags.discard(tag)
+        self._l_content.tags_changed(self)
         self.remove_effect(self._l_content.tag_effect_map.get(tag))
 
     def add_effect(self, effect: Effect):
@@ -865,10 +867,10 @@ class AnimateObject(PhysicalObject):
         obj_vec = self._l_content.obj_vec_map.get(
             None
         )  # np.zeros(self._l_content.max_obs_id)
-        group_vec = ints_to_multi_hot(None, 3)
+        group_vec = ints_to_multi_hot(None, self._l_content.max_tags)
         return np.concatenate([obj_vec, group_vec])
 
-    # TODO: not in use
+    # Reference implementation, GameContent.get_observations builds the same windows in batch
     def get_observation(self):
         # Additional Info to add
         # Health
@@ -911,16 +913,13 @@ class AnimateObject(PhysicalObject):
         row_min = obj_coord[1] - self.vision_radius
         row_max = obj_coord[1] + self.vision_radius
         obj_list = []
-        for r in range(row_max, row_min - 1, -1):
-            for c in range(col_min, col_max + 1):
-                objs = gamectx.get_objects_by_coord((c, r))
-                for obj_seen in objs:
-                    if (
-                        obj_seen is not None
-                        and obj_seen.is_visible()
-                        and obj_seen.is_enabled()
-                    ):
-                        obj_list.append(obj_seen)
+        for obj_seen in gamectx.get_objects_in_window(col_min, row_min, col_max, row_max):
+            if (
+                obj_seen is not None
+                and obj_seen.is_visible()
+                and obj_seen.is_enabled()
+            ):
+                obj_list.append(obj_seen)
 
         return obj_list
 
@@ -0,0 +1,220 @@
+import numpy as np
+from landia import gamectx
+
+
+class ObservationGrid:
+    """
+    Persistent observation channels (config one-hot + tags multi-hot) of the first object at every coord
+    inside the map boundary, padded by the vision radius so each agent window is a slice of the grid.
+
+    Coords are refreshed lazily: the physics space reports coords whose object list changed and
+    objects report tag changes through mark_object.
+    """
+
+    def __init__(self, content, vision_radius):
+        self.content = content
+        self.vision_radius = vision_radius
+        self.channels = content.max_obs_id + content.max_tags
+        self.offsets = np.arange(vision_radius * 2 + 1)
+        self.space = None
+        self.dirty = set()
+        self.grid = None
+        self.origin = None
+
+    def attach(self, space, bounds):
+        """
+        Builds the grid over bounds (xmin,ymin,xmax,ymax) and starts tracking changes in space
+        """
+        xmin, ymin, xmax, ymax = bounds
+        pad = self.vision_radius
+        self.space = space
+        self.dirty = space.track_changes()
+        self.origin = (xmin - pad, ymin - pad)
+        self.grid = np.zeros((xmax - xmin + 1 + pad * 2, ymax - ymin + 1 + pad * 2, self.channels))
+        self.dirty.update(space.obj_to_coord.values())
+
+    def mark_object(self, obj):
+        if self.space is None:
+            return
+        coord = self.space.obj_to_coord.get(obj.get_id())
+        if coord is not None:
+            self.dirty.add(coord)
+
+    def get_object_vector(self, obj):
+        obj_vec = self.content.obj_vec_map[obj.config_id]
+        return np.concatenate([obj_vec, self.content.create_tags_vec(obj.tags)])
+
+    def refresh(self):
+        width, height = self.grid.shape[0], self.grid.shape[1]
+        for coord in self.dirty:
+            x = coord[0] - self.origin[0]
+            y = coord[1] - self.origin[1]
+            if x < 0 or y < 0 or x >= width or y >= height:
+                continue
+            objs = gamectx.get_objects_by_coord(coord)
+            if len(objs) > 0:
+                self.grid[x, y] = self.get_object_vector(objs[0])
+            else:
+                self.grid[x, y] = 0
+        self.dirty.clear()
+
+    def in_grid(self, coord):
+        r = self.vision_radius
+        x = coord[0] - self.origin[0]
+        y = coord[1] - self.origin[1]
+        return x >= r and y >= r and x + r < self.grid.shape[0] and y + r < self.grid.shape[1]
+
+    def get_windows(self, coords):
+        """
+        Observation windows centred on coords, shape (N, rows, cols, channels), rows from top (max y) to bottom
+        """
+        self.refresh()
+        r = self.vision_radius
+        centres = np.asarray(coords, dtype=np.int64).reshape(-1, 2)
+        xs = centres[:, 0:1] - self.origin[0] - r + self.offsets
+        ys = centres[:, 1:2] - self.origin[1] + r - self.offsets
+        return self.grid[xs[:, None, :], ys[:, :, None]]
+
+
+class TileRasterizer:
+    """
+    Draws agent camera views straight into numpy arrays (no pygame). Every map coord holds a tile texture,
+    its background layer images with the image of its top visible object composited on top (one texture
+    per distinct combination), views are gathered from the textures in one vectorized pass.
+    Objects are drawn with their default image at their coord (no animation, movement offsets or info overlays).
+
+    Coords are refreshed lazily from the physics space change set like ObservationGrid.
+    """
+
+    def __init__(self, content, asset_store, tile_size, pad):
+        self.content = content
+        self.asset_store = asset_store
+        self.tile_size = tile_size
+        self.pad = pad
+        self.image_index = {None: 0}
+        self.images = [np.zeros((tile_size, tile_size, 4), dtype=np.uint8)]
+        self.texture_index = {}
+        self.textures = []
+        self.texture_array = None
+        self.space = None
+        self.dirty = set()
+        self.layers = None
+        self.tiles = None
+        self.origin = None
+
+    def get_image_index(self, image_id):
+        idx = self.image_index.get(image_id)
+        if idx is None:
+            asset = self.asset_store.asset_bundle.image_assets.get(image_id)
+            image = np.zeros((self.tile_size, self.tile_size, 4), dtype=np.uint8)
+            if asset is not None:
+                # Crop or pad to the tile, centred like the renderer draws it
+                full_image = self.asset_store.get_image_array(asset[0], asset[1])
+                h = min(full_image.shape[0], self.tile_size)
+                w = min(full_image.shape[1], self.tile_size)
+                iy, ix = (full_image.shape[0] - h) // 2, (full_image.shape[1] - w) // 2
+                ty, tx = (self.tile_size - h) // 2, (self.tile_size - w) // 2
+                image[ty:ty + h, tx:tx + w] = full_image[iy:iy + h, ix:ix + w]
+            idx = len(self.images)
+            self.images.append(image)
+            self.image_index[image_id] = idx
+        return idx
+
+    def get_texture_index(self, image_idxs):
+        """
+        Texture of images (indices) drawn in order
+        """
+        idx = self.texture_index.get(image_idxs)
+        if idx is None:
+            texture = np.zeros((self.tile_size, self.tile_size, 4), dtype=np.uint8)
+            for image_idx in image_idxs:
+                image = self.images[image_idx]
+                np.copyto(texture, image, where=image[:, :, 3:] > 127)
+            idx = len(self.textures)
+            self.textures.append(texture)
+            self.texture_index[image_idxs] = idx
+            self.texture_array = None
+        return idx
+
+    def update_tile(self, x, y):
+        self.tiles[x, y] = self.get_texture_index(tuple(self.layers[:, x, y]))
+
+    def attach(self, space, bounds, gamemap):
+        """
+        Builds the tiles over bounds (xmin,ymin,xmax,ymax) padded by pad coords and starts tracking changes in space
+        """
+        xmin, ymin, xmax, ymax = bounds
+        pad = self.pad
+        self.space = space
+        self.dirty = space.track_changes()
+        self.origin = (xmin - pad, ymin - pad)
+        width, height = xmax - xmin + 1 + pad * 2, ymax - ymin + 1 + pad * 2
+        background_layers = list(gamemap.get_layers())
+        # Image indices per layer, the last layer holds objects
+        self.layers = np.zeros((len(background_layers) + 1, width, height), dtype=np.int64)
+        self.tiles = np.zeros((width, height), dtype=np.int64)
+        for x in range(width):
+            for y in range(height):
+                for i, layer_id in enumerate(background_layers):
+                    self.layers[i, x, y] = self.get_image_index(
+                        gamemap.get_image_by_loc(x + self.origin[0], y + self.origin[1], layer_id))
+                self.update_tile(x, y)
+        self.dirty.update(space.obj_to_coord.values())
+
+    def get_object_image_id(self, objs):
+        top = None
+        for obj in objs:
+            if obj.is_enabled() and obj.is_visible() and (top is None or obj.visheight >= top.visheight):
+                top = obj
+        if top is None:
+            return None
+        images = top.get_default_image()
+        return images[0] if images else None
+
+    def refresh(self):
+        width, height = self.tiles.shape
+        for coord in self.dirty:
+            x = coord[0] - self.origin[0]
+            y = coord[1] - self.origin[1]
+            if x < 0 or y < 0 or x >= width or y >= height:
+                continue
+            self.layers[-1, x, y] = self.get_image_index(
+                self.get_object_image_id(gamectx.get_objects_by_coord(coord)))
+            self.update_tile(x, y)
+        self.dirty.clear()
+        if self.texture_array is None:
+            # RGB texel rows, textures are already composited
+            self.texture_array = np.ascontiguousarray(np.stack(self.textures)[..., :3]).reshape(-1, 3)
+
+    def rasterize(self, centers, view_sizes, out):
+        """
+        Fills out (N, rows, cols, 3) uint8 with the views of width/height view_sizes (N, 2) around world
+        positions centers (N, 2), matching Renderer.process_frame for the same camera
+        """
+        self.refresh()
+        n, rows, cols = out.shape[0], out.shape[1], out.shape[2]
+        tile_size = self.tile_size
+        centers = np.asarray(centers, dtype=np.float64).reshape(n, 2)
+        view_sizes = np.asarray(view_sizes, dtype=np.float64).reshape(n, 2)
+        # World position at every pixel centre, shifted by half a tile so tiles start at 0
+        wx = centers[:, 0:1] + (np.arange(cols) + 0.5 - cols / 2) * (view_sizes[:, 0:1] / cols) + tile_size / 2
+        wy = centers[:, 1:2] + (np.arange(rows) + 0.5 - rows / 2) * (view_sizes[:, 1:2] / rows) + tile_size / 2
+        tx = np.floor_divide(wx, tile_size)
+        ty = np.floor_divide(wy, tile_size)
+        px = (wx - tx * tile_size).astype(np.int64)
+        py = (wy - ty * tile_size).astype(np.int64)
+        width, height = self.tiles.shape
+        tx = np.clip(tx.astype(np.int64) - self.origin[0], 0, width - 1)
+        ty = np.clip(ty.astype(np.int64) - self.origin[1], 0, height - 1)
+
+        # Flat indices of the tile and of the texel in its texture
+        tile_idx = tx[:, None, :] * height + ty[:, :, None]
+        texel_idx = py[:, :, None] * tile_size + px[:, None, :]
+        texture_idx = self.tiles.reshape(-1).take(tile_idx)
+        texture_idx *= tile_size * tile_size
+        texture_idx += texel_idx
+        if out.flags.c_contiguous:
+            np.take(self.texture_array, texture_idx.reshape(-1), axis=0, out=out.reshape(-1, 3))
+        else:
+            out[:] = self.texture_array[texture_idx]
+        return out
@@ -0,0 +1,283 @@
+import socket
+import struct
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Tuple
+
+# Every datagram starts with: kind, message sequence number, chunk index, chunk count and message size
+CHUNK_HEADER = struct.Struct("<BIHHI")
+NACK_INDEX = struct.Struct("<H")
+
+KIND_DATA = 0
+KIND_NACK = 1
+
+DEFAULT_CHUNK_SIZE = 2048
+MAX_CHUNKS = 0xFFFF
+RECV_SIZE = 65536
+# Chunk indexes per NACK datagram
+MAX_NACK_INDEXES = 512
+NACK_DELAY = 0.02
+
+
+def split_message(seq, data, chunk_size=DEFAULT_CHUNK_SIZE) -> List[bytes]:
+    """
+    Datagrams carrying data, all chunks but the last are chunk_size long
+    """
+    size = len(data)
+    count = max((size + chunk_size - 1) // chunk_size, 1)
+    if count > MAX_CHUNKS:
+        raise ValueError(f"Message of {size} bytes needs more than {MAX_CHUNKS} chunks of {chunk_size} bytes")
+    view = memoryview(data)
+    return [
+        CHUNK_HEADER.pack(KIND_DATA, seq, i, count, size) + view[i * chunk_size:(i + 1) * chunk_size]
+        for i in range(count)]
+
+
+def pack_nacks(seq, indexes) -> List[bytes]:
+    """
+    Retransmit requests for the chunks of a message
+    """
+    results = []
+    for i in range(0, len(indexes), MAX_NACK_INDEXES):
+        batch = indexes[i:i + MAX_NACK_INDEXES]
+        results.append(CHUNK_HEADER.pack(KIND_NACK, seq, 0, len(batch), 0) +
+                       struct.pack(f"<{len(batch)}H", *batch))
+    return results
+
+
+def unpack_nack(datagram) -> Tuple[int, List[int]]:
+    _, seq, _, count, _ = CHUNK_HEADER.unpack_from(datagram)
+    return seq, list(struct.unpack_from(f"<{count}H", datagram, CHUNK_HEADER.size))
+
+
+class PartialMessage:
+    __slots__ = ["data", "received", "remaining", "last_time", "nacks"]
+
+    def __init__(self, size, count, now):
+        self.data = bytearray(size)
+        self.received = bytearray(count)
+        self.remaining = count
+        self.last_time = now
+        self.nacks = 0
+
+    def missing(self):
+        return [i for i, r in enumerate(self.received) if not r]
+
+
+class Reassembler:
+    """
+    Reassembles messages from chunks arriving in any order, each chunk is copied once into a buffer of the
+    message's size. Duplicates and chunks of messages already completed are dropped.
+
+    Messages stalled for nack_delay are reported by get_nacks, the delay doubles with each report so retransmits
+    queued behind other data aren't requested again. After max_nacks reports a stalled message is dropped.
+    Only messages with at least one chunk received can be recovered. At most max_pending messages are
+    reassembled at a time, the oldest is dropped to make room.
+    """
+
+    def __init__(self, max_pending=32, max_message_size=1 << 26, nack_delay=NACK_DELAY, max_nacks=5,
+                 completed_size=1024):
+        self.max_pending = max_pending
+        self.max_message_size = max_message_size
+        self.nack_delay = nack_delay
+        self.max_nacks = max_nacks
+        self.pending: Dict[Tuple, PartialMessage] = OrderedDict()
+        self.completed_size = completed_size
+        self.completed = set()
+        self.completed_order = deque()
+        self.messages = 0
+        self.duplicates = 0
+        self.dropped = 0
+
+    def mark_completed(self, key):
+        self.completed.add(key)
+        self.completed_order.append(key)
+        if len(self.completed_order) > self.completed_size:
+            self.completed.discard(self.completed_order.popleft())
+        self.messages += 1
+
+    def add(self, datagram, source=None, now=None):
+        """
+        Adds a data chunk from source, returns the message if it is complete
+        """
+        _, seq, index, count, size = CHUNK_HEADER.unpack_from(datagram)
+        key = (source, seq)
+        if key in self.completed:
+            self.duplicates += 1
+            return None
+        chunk = memoryview(datagram)[CHUNK_HEADER.size:]
+        if count == 1:
+            if len(chunk) != size:
+                return None
+            self.mark_completed(key)
+            return bytes(chunk)
+        if index >= count or size > self.max_message_size:
+            return None
+        # All chunks but the last have the same length, any chunk gives the offset
+        if index < count - 1:
+            offset = index * len(chunk)
+        else:
+            offset = size - len(chunk)
+            if offset % (count - 1) != 0:
+                return None
+            offset = offset // (count - 1) * index
+        if offset + len(chunk) > size:
+            return None
+
+        if now is None:
+            now = time.perf_counter()
+        message = self.pending.get(key)
+        if message is None:
+            if len(self.pending) >= self.max_pending:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            message = PartialMessage(size, count, now)
+            self.pending[key] = message
+        elif len(message.received) != count or len(message.data) != size:
+            return None
+        if message.received[index]:
+            self.duplicates += 1
+            return None
+        message.data[offset:offset + len(chunk)] = chunk
+        message.received[index] = 1
+        message.remaining -= 1
+        message.last_time = now
+        if message.remaining > 0:
+            return None
+        del self.pending[key]
+        self.mark_completed(key)
+        return message.data
+
+    def get_nacks(self, now=None):
+        """
+        Source, sequence number and missing chunk indexes of the stalled messages
+        """
+        if len(self.pending) == 0:
+            return []
+        if now is None:
+            now = time.perf_counter()
+        results = []
+        for key, message in list(self.pending.items()):
+            if now - message.last_time < self.nack_delay * (1 << message.nacks):
+                continue
+            if message.nacks >= self.max_nacks:
+                del self.pending[key]
+                self.dropped += 1
+                continue
+            message.nacks += 1
+            message.last_time = now
+            results.append((key[0], key[1], message.missing()))
+        return results
+
+
+class SentMessages:
+    """
+    Chunks of the last size messages sent, for retransmits. Messages added with their destinations are only
+    retransmitted to those.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.messages: Dict[int, Tuple[List[bytes], Any]] = OrderedDict()
+
+    def add(self, seq, chunks, destinations=None):
+        self.messages[seq] = (chunks, destinations)
+        if len(self.messages) > self.size:
+            self.messages.popitem(last=False)
+
+    def get_chunks(self, seq, indexes, destination=None):
+        message = self.messages.get(seq)
+        if message is None:
+            return []
+        chunks, destinations = message
+        if destinations is not None and destination not in destinations:
+            return []
+        return [chunks[i] for i in indexes if i < len(chunks)]
+
+
+class Connection:
+    """
+    One UDP socket to a remote endpoint, kept for the whole session. Messages are split into sequence numbered
+    chunks, lost chunks of messages partly received are requested again with NACKs.
+
+    send may be called from one thread while another calls receive, retransmit requests are answered by receive.
+    """
+
+    def __init__(self, remote_address, local_address=None, chunk_size=DEFAULT_CHUNK_SIZE, history_size=64,
+                 nack_delay=NACK_DELAY):
+        self.remote_address = remote_address
+        self.chunk_size = chunk_size
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if local_address is not None:
+            self.sock.bind(local_address)
+        self.next_seq = 0
+        self.sent = SentMessages(history_size)
+        self.reassembler = Reassembler(nack_delay=nack_delay)
+        self.retransmits = 0
+        self.nacks_sent = 0
+
+    def get_address(self):
+        return self.sock.getsockname()
+
+    def sendto(self, datagram):
+        self.sock.sendto(datagram, self.remote_address)
+
+    def send(self, data):
+        """
+        Sends a message, returns the number of bytes sent
+        """
+        seq = self.next_seq
+        self.next_seq = (seq + 1) & 0xFFFFFFFF
+        chunks = split_message(seq, data, self.chunk_size)
+        self.sent.add(seq, chunks)
+        for chunk in chunks:
+            self.sendto(chunk)
+        return sum(len(c) for c in chunks)
+
+    def handle_datagram(self, datagram):
+        """
+        Answers retransmit requests and adds data chunks, returns a message if one was completed
+        """
+        if len(datagram) < CHUNK_HEADER.size:
+            return None
+        try:
+            if datagram[0] == KIND_NACK:
+                seq, indexes = unpack_nack(datagram)
+                for chunk in self.sent.get_chunks(seq, indexes):
+                    self.sendto(chunk)
+                    self.retransmits += 1
+                return None
+            return self.reassembler.add(datagram)
+        except struct.error:
+            return None
+
+    def send_nacks(self):
+        for _, seq, missing in self.reassembler.get_nacks():
+            for nack in pack_nacks(seq, missing):
+                self.sendto(nack)
+                self.nacks_sent += 1
+
+    def receive(self, timeout=1.0):
+        """
+        Waits for the next complete message, raises socket.timeout if none arrives within timeout
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise socket.timeout("timed out")
+            if len(self.reassembler.pending) > 0:
+                remaining = min(remaining, self.reassembler.nack_delay)
+            self.sock.settimeout(remaining)
+            try:
+                datagram, _ = self.sock.recvfrom(RECV_SIZE)
+            except socket.timeout:
+                self.send_nacks()
+                continue
+            message = self.handle_datagram(datagram)
+            self.send_nacks()
+            if message is not None:
+                return message
+
+    def close(self):
+        self.sock.close()
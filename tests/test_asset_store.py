@@ -0,0 +1,59 @@
+from landia.env import LandiaEnv
+from landia.asset_store import AssetStore, clear_asset_stores, get_asset_store
+from landia.config import RendererConfig
+from landia.renderer import Renderer
+
+
+def test_renderers_share_assets():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    asset_bundle = env.content.get_asset_bundle()
+    clear_asset_stores()
+
+    renderers = []
+    for _ in range(2):
+        config = RendererConfig()
+        config.render_to_screen = False
+        config.sound_enabled = False
+        config.max_scaled_images = 2
+        renderer = Renderer(config, asset_bundle=asset_bundle)
+        renderer.initialize()
+        renderers.append(renderer)
+
+    store = renderers[0].asset_store
+    assert renderers[1].asset_store is store
+    image_id = next(iter(asset_bundle.image_assets))
+    assert renderers[0].get_image_by_id(image_id) is renderers[1].get_image_by_id(image_id)
+    assert renderers[0].get_scaled_image_by_id(image_id, 2, 2) is renderers[1].get_scaled_image_by_id(image_id, 2, 2)
+
+    for scale in [3, 4]:
+        renderers[0].get_scaled_image_by_id(image_id, scale, scale)
+    stats = store.stats()
+    assert stats['users'] == 2 and stats['saved_bytes'] == stats['frame_bytes']
+    assert stats['scaled_images'] == 2 and stats['scaled_evictions'] == 1
+
+    # A renderer asking for larger caches raises the shared limits, smaller requests keep them
+    assert get_asset_store(asset_bundle, max_scaled_images=8, max_rotated_images=1) is store
+    assert store.max_scaled_images == 8 and store.max_rotated_images == renderers[0].config.max_rotated_images
+
+    private = AssetStore(asset_bundle)
+    assert private.get_frame(*asset_bundle.image_assets[image_id]) is not renderers[0].get_image_by_id(image_id)
+    clear_asset_stores()
+
+
+def test_rotated_images_cached_by_quantized_angle():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    config = RendererConfig()
+    config.render_to_screen = False
+    config.sound_enabled = False
+    config.share_assets = False
+    config.rotation_step = 10
+    renderer = Renderer(config, asset_bundle=env.content.get_asset_bundle())
+    renderer.initialize()
+    image_id = next(iter(env.content.get_asset_bundle().image_assets))
+
+    rotated = renderer.get_rotated_image_by_id(image_id, 2, 2, 44)
+    assert renderer.get_rotated_image_by_id(image_id, 2, 2, 38) is rotated
+    assert renderer.get_rotated_image_by_id(image_id, 2, 2, 400) is rotated
+    assert renderer.get_rotated_image_by_id(image_id, 2, 2, 356) is renderer.get_scaled_image_by_id(image_id, 2, 2)
+    stats = renderer.asset_store.stats()
+    assert stats['rotated_misses'] == 1 and stats['rotated_hits'] == 2
@@ -0,0 +1,58 @@
+import gc
+
+import numpy as np
+import pygame
+from landia.env import LandiaEnv
+from landia.background import Background, get_tile_id_grid, tile_id_grids
+from landia.asset_store import get_asset_store
+
+
+def test_scrolled_background_matches_rebuild():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    env.reset()
+    pygame.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    images = get_asset_store(env.content.get_asset_bundle()).load_images()
+    gamemap = env.content.gamemap
+
+    target = pygame.Surface((200, 150))
+    scrolled = Background(16, images.get)
+    scrolled.set_gamemap(gamemap)
+    screen_factor = (200 / 300, 150 / 225)
+    for i in range(60):
+        center = (100 + i * 7.3, 50 - i * 5.1)
+        scrolled.draw(target, center, (300, 225), screen_factor, (100, 75))
+        rebuilt = Background(16, images.get)
+        rebuilt.set_gamemap(gamemap)
+        rebuilt.draw(target, center, (300, 225), screen_factor, (100, 75))
+        assert rebuilt.origin == scrolled.origin
+        width, height = (n - 1 for n in rebuilt.surface.get_size())
+        assert np.array_equal(
+            pygame.surfarray.array3d(scrolled.surface)[:width - 1, :height - 1],
+            pygame.surfarray.array3d(rebuilt.surface)[:width - 1, :height - 1])
+    assert scrolled.full_updates == 1 and scrolled.strip_updates > 0
+
+
+def test_background_caches_are_bounded():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    env.reset()
+    pygame.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    images = get_asset_store(env.content.get_asset_bundle()).load_images()
+
+    background = Background(16, images.get, max_scaled_tiles=2)
+    for size in range(4, 8):
+        background.get_scaled_tile((), size, size)
+    assert list(background.scaled_tiles) == [((), 6, 6), ((), 7, 7)]
+    assert background.scaled_tile_evictions == 2
+
+    class Map:
+        def get_layers(self):
+            return [0]
+
+    gamemap = Map()
+    get_tile_id_grid(gamemap)
+    assert gamemap in tile_id_grids
+    del gamemap
+    gc.collect()
+    assert not any(isinstance(m, Map) for m in tile_id_grids.keys())
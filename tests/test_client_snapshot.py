@@ -0,0 +1,177 @@
+import random
+from landia.env import LandiaEnv
+from landia import gamectx
+from landia.client import RemoteClient, decode_response
+from landia.clock import clock
+from landia.codec import get_codec
+from landia.config import ServerConfig
+from landia.common import Base, Vector2
+from landia.interpolation import InterpolationBuffer
+from landia.server import GameServer
+from landia.survival.survival_utils import coord_to_vec, vec_to_coord
+
+
+def apply_snapshot(state, om_snapshot):
+    for odata in om_snapshot:
+        obj_id = odata['data']['id']
+        if odata.get('_delta'):
+            if obj_id in state:
+                state[obj_id].update(odata['data'])
+        else:
+            state[obj_id] = odata['data']
+
+
+def create_reply(server, client, codec):
+    # A reply as the server sends it at the end of a tick
+    server.clear_tick_state()
+    snapshot_timestamp = clock.get_ticks()
+    player = gamectx.player_manager.get_player(client.player_id)
+    response = decode_response(server.create_reply(client, player, codec, snapshot_timestamp), codec)
+    return snapshot_timestamp, response['snapshot']
+
+
+def test_delta_snapshots_rebuild_object_state():
+    codec = get_codec("json")
+    rng = random.Random(3)
+    agent_map = {str(i): {} for i in range(4)}
+    env = LandiaEnv(agent_map=agent_map, include_state_observation=True)
+    obs = env.reset()
+
+    config = ServerConfig()
+    config.interest_distance_scale = None
+    server = GameServer(conn=("127.0.0.1", 0), config=config)
+    client = RemoteClient("delta_test")
+    client.player_id = env.agent_clients["0"].player.get_id()
+    state = {}
+    received = []
+    delta_count = 0
+    for i in range(100):
+        obs, rewards, dones, infos = env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+
+        for t in received:
+            client.confirm_snapshot(t)
+        # Resend every object so lost messages are recovered by the deltas alone
+        client.last_snapshot_time_ms = 0
+        snapshot_timestamp, snapshot = create_reply(server, client, codec)
+        delta_count += sum(1 for odata in snapshot['om'] if odata.get('_delta'))
+
+        if rng.random() < 0.3:
+            # Lost response, the client keeps confirming its last snapshot
+            continue
+        apply_snapshot(state, snapshot['om'])
+        received = [snapshot_timestamp]
+
+        if i % 10 == 9:
+            full = codec.decode(codec.encode(gamectx.object_manager.get_snapshot_full()))
+            for odata in full:
+                expected = dict(odata['data'])
+                actual = dict(state[expected['id']])
+                del expected['last_change'], actual['last_change']
+                assert actual == expected
+
+    assert delta_count > 0
+
+
+def test_interest_snapshots_follow_camera():
+    codec = get_codec("json")
+    rng = random.Random(5)
+    agent_map = {str(i): {} for i in range(4)}
+    env = LandiaEnv(agent_map=agent_map, include_state_observation=True)
+    obs = env.reset()
+
+    config = ServerConfig()
+    config.interest_distance_scale = 1.0
+    config.interest_margin = 48
+    server = GameServer(conn=("127.0.0.1", 0), config=config)
+    client = RemoteClient("interest_test")
+    client.player_id = env.agent_clients["0"].player.get_id()
+    state = {}
+    received = []
+    removal_count = 0
+    for i in range(150):
+        obs, rewards, dones, infos = env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+        if i == 75:
+            # random walks can stay in one area, so move the camera across the map once
+            player_obj = gamectx.object_manager.get_by_id(env.agent_clients["0"].player.get_object_id())
+            boundary = gamectx.content.gamemap.boundary
+            coord = vec_to_coord(player_obj.get_position())
+            far_coord = (boundary['x'][1] - 2 if coord[0] < sum(boundary['x']) / 2 else boundary['x'][0] + 2,
+                         boundary['y'][1] - 2 if coord[1] < sum(boundary['y']) / 2 else boundary['y'][0] + 2)
+            player_obj.update_position(coord_to_vec(far_coord), skip_collision_check=True)
+
+        for t in received:
+            client.confirm_snapshot(t)
+        client.last_snapshot_time_ms = 0
+        snapshot_timestamp, snapshot = create_reply(server, client, codec)
+        removal_count += len(snapshot['rm'])
+
+        if rng.random() < 0.3:
+            continue
+        for obj_id in snapshot['rm']:
+            state.pop(obj_id, None)
+        apply_snapshot(state, snapshot['om'])
+        received = [snapshot_timestamp]
+
+        interest_objs = client.interest_objects
+        assert 1 < len(interest_objs) < len(gamectx.object_manager.get_objects())
+        assert set(state.keys()) == interest_objs
+        # The sector index and its set of unpositioned objects match a scan of every object near the group's cell
+        cell_x, cell_y, cell_size, radius = gamectx.get_interest_group(client, 1.0, 48, config.interest_group_size)
+        center = Vector2((cell_x + 0.5) * cell_size, (cell_y + 0.5) * cell_size)
+        radius += cell_size / 2
+        assert interest_objs == {
+            obj_id for obj_id, obj in gamectx.object_manager.get_objects().items()
+            if obj.get_position() is None or (
+                abs(obj.get_position().x - center.x) <= radius and abs(obj.get_position().y - center.y) <= radius)}
+        full = codec.decode(codec.encode(gamectx.object_manager.get_snapshot_full()))
+        for odata in full:
+            if odata['data']['id'] in interest_objs:
+                expected = dict(odata['data'])
+                actual = dict(state[expected['id']])
+                del expected['last_change'], actual['last_change']
+                assert actual == expected
+
+    assert removal_count > 0
+
+    # Without a camera the client's interest is every object
+    player = env.agent_clients["0"].player
+    camera, player.camera = player.camera, None
+    try:
+        snapshot_timestamp, snapshot = create_reply(server, client, codec)
+    finally:
+        player.camera = camera
+    assert client.interest_objects == set(gamectx.object_manager.get_objects().keys())
+
+
+def test_interpolation_buffer_matches_object_lerp():
+    codec = get_codec("binary")
+    agent_map = {str(i): {} for i in range(4)}
+    env = LandiaEnv(agent_map=agent_map)
+    obs = env.reset()
+    buffer = InterpolationBuffer()
+    buffer.add(0, codec.decode(codec.encode(gamectx.object_manager.get_snapshot_full())))
+    for i in range(5):
+        obs, rewards, dones, infos = env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+    om_snapshot = codec.decode(codec.encode(gamectx.object_manager.get_snapshot_update(0)))
+    buffer.add(10, om_snapshot)
+    # Move the objects away so the blend has something to do
+    for obj in gamectx.object_manager.get_objects().values():
+        if obj.get_view_position() is not None:
+            obj.view_position = obj.get_view_position() + (3, -2)
+
+    expected = {}
+    for odata in om_snapshot:
+        obj2 = Base.create_from_snapshot(odata)
+        obj1 = gamectx.get_object_by_id(obj2.get_id())
+        if obj1 is not None:
+            p1 = obj1.get_view_position()
+            p2 = obj2.get_view_position()
+            if p1 is not None and p2 is not None:
+                expected[obj1.get_id()] = (p2 - p1) * 0.4 + p1
+
+    assert buffer.interpolate(4, gamectx.object_manager) == len(expected) > 0
+    for obj_id, position in expected.items():
+        actual = gamectx.get_object_by_id(obj_id).view_position
+        assert actual.distance_to(position) < 1e-6
+    # No blend before the first snapshot or after the last
+    assert buffer.interpolate(11, gamectx.object_manager) == 0
@@ -0,0 +1,21 @@
+from landia.env import LandiaEnv
+from landia import gamectx
+from landia.codec import get_codec, detect_codec
+
+
+def test_binary_codec_matches_json():
+    agent_map = {str(i): {} for i in range(2)}
+    env = LandiaEnv(agent_map=agent_map, include_state_observation=True)
+    obs = env.reset()
+    for i in range(20):
+        obs, rewards, dones, infos = env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+
+    snapshot = gamectx.create_full_snapshot()
+    snapshot['extra'] = {1: (1, 2), 'flags': [True, False, None, True], 'big': [2**70, 1, 2, 3], 'nested': [[], (1.5,), [None, "a"]]}
+
+    json_codec = get_codec("json")
+    binary_codec = get_codec("binary")
+    encoded = binary_codec.encode(snapshot)
+    assert detect_codec(encoded) is binary_codec
+    assert detect_codec(json_codec.encode(snapshot)) is json_codec
+    assert binary_codec.decode(encoded) == json_codec.decode(json_codec.encode(snapshot))
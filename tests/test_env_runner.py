@@ -1,7 +1,9 @@
 import pytest
-from landia.env import LandiaEnv, LandiaEnvSingle
+import numpy as np
+from landia.env import LandiaEnv, LandiaEnvSingle, VectorLandiaEnv
 import time
 from landia.clock import clock
+from landia.renderer import NullRenderer
 
 
 def test_env():
@@ -63,4 +65,53 @@ def test_gym_env():
     single_run(config_filename="ctf.json")
     single_run(config_filename="infection.json")
     single_run(config_filename="forager.json")
-    assert True
\ No newline at end of file
+    assert True
+
+def test_headless_env():
+    agent_map = {str(i):{} for i in range(2)}
+    env = LandiaEnv(agent_map=agent_map, include_state_observation=True)
+    obs = env.reset()
+    for i in range(10):
+        obs, rewards, dones, infos = env.step({agent_id:env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+    assert all(isinstance(client.renderer, NullRenderer) for client in env.agent_clients.values())
+    assert env.admin_client is None
+    assert env.render().shape == (720, 1280, 3)
+    assert env.admin_client is not None
+    # Agent views are drawn by the admin renderer, at its resolution
+    frame = env.render(player_id="0")
+    assert frame.shape == (720, 1280, 3) and frame.any()
+
+
+def test_reused_observation_buffer():
+    agent_map = {str(i):{} for i in range(2)}
+    env = LandiaEnv(agent_map=agent_map, reuse_observation_buffer=True)
+    obs = env.reset()
+    for i in range(5):
+        obs, rewards, dones, infos = env.step({agent_id:env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+    for i, (agent_id, client) in enumerate(env.agent_clients.items()):
+        assert obs[agent_id].base is env.observation_buffer
+        assert np.array_equal(obs[agent_id], env.observation_buffer[i])
+        assert np.array_equal(obs[agent_id], client.get_rgb_array())
+
+
+def test_vector_env():
+    env = VectorLandiaEnv(num_envs=2, env_kwargs={'agent_map': {str(i): {} for i in range(2)}})
+    try:
+        assert env.agent_ids == ["0", "1"]
+        assert env.observation_shape == (42, 42, 3)
+        obs = env.reset()
+        assert obs.shape == (2, 2) + env.observation_shape
+        assert env.valid.all()
+        for i in range(5):
+            obs, rewards, dones, infos = env.step(env.sample_actions())
+            assert obs.shape == (2, 2) + env.observation_shape
+            assert rewards.shape == (2, 2) and dones.shape == (2, 2)
+            assert len(infos) == 2
+            for world, info in enumerate(infos):
+                assert np.array_equal(info['valid'], env.valid[world])
+            # Live players always have an observation
+            assert env.valid.all()
+            assert obs.any()
+    finally:
+        env.close()
+    assert env.closed
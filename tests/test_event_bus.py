@@ -0,0 +1,78 @@
+from landia.env import LandiaEnv
+from landia import gamectx
+from landia.clock import clock
+from landia.event import DelayedEvent, Event, EventScheduler, PeriodicEvent
+
+
+class FirstEvent(Event):
+    pass
+
+
+class SecondEvent(Event):
+    pass
+
+
+def test_event_bus_order_and_listeners():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    env.reset()
+    gamectx.remove_all_events()
+
+    handled = []
+    gamectx.register_event_handler(SecondEvent, lambda e: (handled.append(("second", e.get_id())), True), priority=-1)
+    gamectx.register_event_handler(FirstEvent, lambda e: ([SecondEvent()], True), priority=-2)
+    gamectx.add_event_listener(FirstEvent, lambda e: handled.append(("listener", e.get_id())))
+
+    first_events = [FirstEvent() for _ in range(3)]
+    second = SecondEvent()
+    unhandled = Event()
+    for e in [second, unhandled] + first_events:
+        gamectx.add_event(e)
+
+    gamectx.run_event_processing()
+
+    # FirstEvents (lower priority value) run first in the order added, their listener runs after each,
+    # then the SecondEvent already queued, then the SecondEvents they created
+    assert handled[:4] == [
+        ("listener", first_events[0].get_id()),
+        ("listener", first_events[1].get_id()),
+        ("listener", first_events[2].get_id()),
+        ("second", second.get_id())]
+    assert len(handled) == 7
+    assert len(gamectx.event_manager.get_events_by_type(FirstEvent)) == 0
+    assert len(gamectx.event_manager.get_events_by_type(SecondEvent)) == 0
+    assert gamectx.event_manager.get_events_by_type(Event) == [unhandled]
+
+
+def test_scheduler_due_cancel_rearm():
+    scheduler = EventScheduler()
+    for event_id, due in [("a", 5), ("b", 3), ("c", 5), ("d", 9)]:
+        scheduler.schedule(event_id, due)
+    scheduler.cancel("c")
+    scheduler.schedule("d", 4)
+    assert scheduler.pop_due(2) == []
+    assert scheduler.pop_due(5) == ["b", "d", "a"]
+    assert len(scheduler) == 0 and scheduler.next_due_tick() is None
+
+
+def test_timer_events_fire_when_due():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    env.reset()
+    gamectx.remove_all_events()
+
+    fired = []
+    start_tick = clock.get_ticks()
+    gamectx.add_event(DelayedEvent(lambda e, data: fired.append(("delayed", clock.get_ticks())) or [], 3))
+    gamectx.add_event(PeriodicEvent(lambda e, data: (fired.append(("periodic", clock.get_ticks())), False),
+                                    execution_step_interval=2))
+    cancelled = DelayedEvent(lambda e, data: fired.append(("cancelled", clock.get_ticks())) or [], 1)
+    gamectx.add_event(cancelled)
+    gamectx.event_manager.remove_event_by_id(cancelled.get_id())
+
+    for _ in range(5):
+        clock.tick()
+        gamectx.run_event_processing()
+
+    assert fired == [
+        ("periodic", start_tick + 2),
+        ("delayed", start_tick + 3),
+        ("periodic", start_tick + 4)]
@@ -0,0 +1,159 @@
+import secrets
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from landia import gamectx
+from landia.client import ClientConnector
+from landia.config import ClientConfig, ServerConfig
+from landia.env import LandiaEnv
+from landia.event import SoundEvent
+from landia.local_transport import COUNTER, QUEUE_HEAD, SharedQueue, SnapshotPublisher, SnapshotReader
+from landia.server import GameServer
+
+
+def test_shared_queue_wraps_around():
+    producer = SharedQueue(capacity=256)
+    consumer = SharedQueue(producer.name, create=False)
+    try:
+        received = []
+        sent = []
+        for i in range(100):
+            data = bytes([i]) * (i % 37)
+            if not producer.put(data):
+                received.extend(consumer.get_all())
+                assert producer.put(data)
+            sent.append(data)
+        received.extend(consumer.get_all())
+        assert received == sent
+        assert not producer.put(bytes(300))
+    finally:
+        consumer.close()
+        producer.close()
+
+
+def test_server_only_attaches_local_queues():
+    foreign = shared_memory.SharedMemory(name=f"landia_q_{secrets.token_hex(6)}", create=True, size=4096)
+    queue = SharedQueue()
+    config = ServerConfig()
+    config.shared_memory_name = f"landia_test_{secrets.token_hex(4)}"
+    server = GameServer(conn=("127.0.0.1", 0), config=config)
+    try:
+        with pytest.raises(ValueError):
+            SharedQueue(foreign.name, create=False)
+        server.attach_local_client("remote", queue.name, ("192.168.1.2", 5000))
+        server.attach_local_client("other", "psm_0123", ("127.0.0.1", 5000))
+        server.attach_local_client("foreign", foreign.name, ("127.0.0.1", 5000))
+        assert len(server.local_clients) == 0
+
+        server.attach_local_client("local", queue.name, ("127.0.0.1", 5000))
+        assert list(server.local_clients.keys()) == ["local"]
+        # A head counter past the capacity drops the client instead of reading garbage
+        COUNTER.pack_into(queue.buf, QUEUE_HEAD, 1 << 60)
+        server.read_local_requests()
+        assert len(server.local_clients) == 0
+    finally:
+        server.close()
+        queue.close()
+        foreign.close()
+        foreign.unlink()
+
+
+def test_reader_resyncs_on_keyframe_and_expands_deltas():
+    env = LandiaEnv(agent_map={"0": {}, "1": {}})
+    obs = env.reset()
+    publisher = SnapshotPublisher(f"landia_test_{secrets.token_hex(4)}", slot_count=4, keyframe_interval=3)
+    reader = SnapshotReader(publisher.name, expand_deltas=True)
+    try:
+        def step():
+            env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+            publisher.publish()
+
+        step()
+        frames = reader.read_new()
+        assert len(frames) == 1 and frames[0].keyframe
+        for _ in range(2):
+            step()
+        frames = reader.read_new()
+        assert [f.keyframe for f in frames] == [False, False]
+        # Fall behind by more than the ring's length
+        for _ in range(6):
+            step()
+        frames = reader.read_new()
+        assert frames[0].keyframe
+        assert reader.resyncs == 2
+        for _ in range(2):
+            step()
+        reader.read_new()
+
+        for obj_id, obj in gamectx.object_manager.get_objects().items():
+            data = reader.objects[obj_id]
+            assert data['position'] == obj.get_position()
+            assert data['angle'] == obj.angle
+        row = frames[-1].objects[0]
+        obj = gamectx.object_manager.get_by_id(int(row['id']))
+        assert np.isclose(row['angle'], obj.angle)
+    finally:
+        reader.close()
+        publisher.close()
+        env.close()
+
+
+def test_local_client_reads_shared_memory():
+    env = LandiaEnv(agent_map={"0": {}})
+    env.reset()
+    config = ServerConfig()
+    config.shared_memory_name = f"landia_test_{secrets.token_hex(4)}"
+    server = GameServer(conn=("127.0.0.1", 0), config=config).start()
+    gamectx.set_server(server)
+    client_config = ClientConfig()
+    client_config.client_id = "local_test"
+    client_config.is_human = False
+    client_config.local_transport = True
+    client_config.server_hostname, client_config.server_port = server.server_address
+    connector = ClientConnector(client_config)
+    connector_thread = threading.Thread(target=connector.start_connection, daemon=True)
+    connector_thread.start()
+    try:
+        end_time = time.time() + 10
+        while connector.request_counter < 10 and time.time() < end_time:
+            gamectx.run_step()
+            time.sleep(0.005)
+        # Keep alives arrive through the input queue
+        requests_received = server.requests_received
+        end_time = time.time() + 5
+        while server.requests_received == requests_received and time.time() < end_time:
+            gamectx.run_step()
+            time.sleep(0.005)
+        # Client events go out with the next frame instead of piling up on the remote client
+        gamectx.add_event(SoundEvent(sound_id="local_test_sound"))
+        outgoing_events = len(gamectx.remote_clients["local_test"].outgoing_events)
+        request_counter = connector.request_counter
+        end_time = time.time() + 5
+        while connector.request_counter < request_counter + 3 and time.time() < end_time:
+            gamectx.run_step()
+            time.sleep(0.005)
+    finally:
+        connector.running = False
+        connector_thread.join(timeout=5)
+        gamectx.set_server(None)
+        server.close()
+        env.close()
+
+    assert connector.request_counter >= 10
+    assert server.requests_received > requests_received
+    assert server.replies_sent == 1
+    # The join reply then frames, starting with a key frame
+    connector.incomming_buffer.get()
+    response = connector.incomming_buffer.get()
+    assert len(response['snapshot']['om']) > 0
+    assert response['info']['player_id'] == gamectx.remote_clients["local_test"].player_id
+    assert outgoing_events == 0
+    sound_ids = []
+    while not connector.incomming_buffer.empty():
+        for e in connector.incomming_buffer.get()['snapshot']['em']:
+            sound_ids.append(e['data'].get('sound_id'))
+    assert "local_test_sound" in sound_ids
@@ -0,0 +1,39 @@
+import csv
+import json
+from landia.env import LandiaEnv
+from landia import gamectx
+from landia.metrics import Histogram
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    histogram.add([1.0] * 90 + [100.0] * 10)
+    summary = histogram.summary()
+    assert summary['count'] == 100 and summary['max'] == 100.0 and summary['min'] == 1.0
+    assert 1.0 <= summary['p50'] < 1.2
+    assert summary['p99'] == 100.0
+
+
+def test_tick_profiler_stats_and_dumps(tmp_path):
+    env = LandiaEnv(agent_map={str(i): {} for i in range(2)}, include_state_observation=True)
+    obs = env.reset()
+    profiler = gamectx.profiler
+    profiler.reset()
+    profiler.enable(dump_path=str(tmp_path / "ticks.json"), dump_every=20)
+    try:
+        for _ in range(40):
+            obs, _, _, _ = env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+    finally:
+        profiler.disable()
+
+    stats = json.loads((tmp_path / "ticks.json").read_text())
+    assert stats['ticks'] == 40
+    for phase in ["events", "physics", "update", "objects", "controllers", "client_step", "step"]:
+        assert stats['phases_ms'][phase]['count'] == 40
+    assert stats['event_counts']['InputEvent'] > 0
+    assert stats['object_counts']['human1'] == 2
+
+    profiler.dump(str(tmp_path / "ticks.csv"))
+    with open(tmp_path / "ticks.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert {"phase_ms", "events_per_tick", "event_count", "object_count"} == {r['kind'] for r in rows}
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from landia.env import LandiaEnv
+from landia import gamectx
+
+
+def check_observation_parity(config_filename, steps=300):
+    agent_map = {str(i): {} for i in range(4)}
+    env = LandiaEnv(agent_map=agent_map, include_state_observation=True, config_filename=config_filename)
+    obs = env.reset()
+    for i in range(steps):
+        actions = {agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()}
+        obs, rewards, dones, infos = env.step(actions)
+        objs = [gamectx.object_manager.get_by_id(client.player.get_object_id())
+                for client in env.agent_clients.values() if client.player is not None]
+        objs = [obj for obj in objs if obj is not None]
+        for obj, ob in zip(objs, env.content.get_observations(objs)):
+            expected = obj.get_observation()
+            assert ob.dtype == expected.dtype
+            assert np.array_equal(ob, expected)
+        if dones.get('__all__'):
+            obs = env.reset()
+
+
+def test_observation_parity():
+    check_observation_parity("base_config.json")
+    check_observation_parity("infection.json")
+
+
+def test_state_observation_without_player():
+    agent_map = {str(i): {} for i in range(2)}
+    env = LandiaEnv(agent_map=agent_map, include_state_observation=True)
+    obs = env.reset()
+    env.agent_clients["0"].player = None
+    obs, rewards, dones, infos = env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+    assert obs["0"] is None
+    assert infos["0"]['msg'] == "no player found"
+    assert obs["1"].shape == env.observation_spaces["1"].shape
+
+
+def test_symbolic_observation_close_to_rendered():
+    agent_map = {str(i): {} for i in range(4)}
+    env = LandiaEnv(agent_map=agent_map, symbolic_observation=True, headless=False)
+    obs = env.reset()
+    diffs = []
+    for i in range(50):
+        obs, rewards, dones, infos = env.step({agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()})
+        for agent_id, ob in obs.items():
+            assert ob.shape == env.observation_spaces[agent_id].shape and ob.dtype == np.uint8
+            client = env.agent_clients[agent_id]
+            client.render()
+            diffs.append(np.abs(ob.astype(np.int16) - client.get_rgb_array()).mean())
+    assert np.mean(diffs) < 20
+
+
+def test_symbolic_observation_checks_players_and_cameras():
+    agent_map = {str(i): {} for i in range(2)}
+    env = LandiaEnv(agent_map=agent_map, symbolic_observation=True)
+    obs = env.reset()
+    env.agent_clients["0"].player = None
+    actions = {agent_id: env.action_spaces[agent_id].sample() for agent_id in obs.keys()}
+    obs, rewards, dones, infos = env.step(actions)
+    assert obs["0"] is None
+    assert obs["1"].shape == env.observation_spaces["1"].shape
+    # The rasterizer doesn't rotate, so cameras following their object's angle are rejected
+    env.agent_clients["1"].player.get_camera().view_type = 0
+    with pytest.raises(ValueError):
+        env.step(actions)
@@ -0,0 +1,49 @@
+import random
+from landia.physics_engine import GridSpace, ArrayGridSpace
+from landia.object import GObject
+
+
+def test_array_space_matches_grid_space():
+    rng = random.Random(7)
+    grid = GridSpace()
+    array = ArrayGridSpace(depth=2)
+    array.set_bounds(0, 0, 9, 9)
+
+    objs = []
+    for i in range(40):
+        obj = GObject()
+        obj.config_id = rng.choice(["grass", "rock", "tree"])
+        objs.append(obj)
+
+    for _ in range(2000):
+        obj = rng.choice(objs)
+        if rng.random() < 0.2:
+            grid.remove_obj(obj.get_id())
+            array.remove_obj(obj.get_id())
+        else:
+            # Include coords outside the bounds
+            coord = (rng.randint(-2, 11), rng.randint(-2, 11))
+            grid.move_obj_to(coord, obj)
+            array.move_obj_to(coord, obj)
+
+    for x in range(-2, 12):
+        for y in range(-2, 12):
+            assert grid.get_objs_at((x, y)) == array.get_objs_at((x, y))
+
+    assert grid.get_objs_in_window(1, 2, 8, 7) == array.get_objs_in_window(1, 2, 8, 7)
+    assert grid.get_objs_in_window(-2, -2, 11, 11) == array.get_objs_in_window(-2, -2, 11, 11)
+
+    # Once the outside coords are emptied windows are served from the arrays
+    for obj in objs:
+        x, y = array.obj_to_coord.get(obj.get_id(), (0, 0))
+        if not (0 <= x <= 9 and 0 <= y <= 9):
+            grid.remove_obj(obj.get_id())
+            array.remove_obj(obj.get_id())
+    assert grid.get_objs_in_window(-2, -2, 11, 11) == array.get_objs_in_window(-2, -2, 11, 11)
+
+    config_window = array.get_config_window(-1, 0, 9, 10)
+    for i, r in enumerate(range(10, -1, -1)):
+        for j, c in enumerate(range(-1, 10)):
+            obj_ids = grid.get_objs_at((c, r))
+            expected = 0 if len(obj_ids) == 0 else array.get_config_index(grid.get_obj_by_id(obj_ids[0]).config_id)
+            assert config_window[i, j] == expected
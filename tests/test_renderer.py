@@ -0,0 +1,72 @@
+import numpy as np
+from landia.env import LandiaEnv
+from landia.config import RendererConfig
+from landia.renderer import Renderer
+from landia import gamectx
+from landia.survival.survival_utils import coord_to_vec, vec_to_coord
+
+
+def test_infobox_surfaces_reused():
+    env = LandiaEnv(agent_map={str(i): {} for i in range(2)}, include_state_observation=True)
+    env.reset()
+    config = RendererConfig()
+    config.resolution = (200, 150)
+    config.render_to_screen = False
+    config.sound_enabled = False
+    config.info_filter = {'state', 'label'}
+    renderer = Renderer(config, asset_bundle=env.content.get_asset_bundle())
+    renderer.initialize()
+    player = next(iter(env.agent_clients.values())).player
+
+    renderer.process_frame(player)
+    renderer.render_frame()
+    first = renderer.get_last_frame()
+    misses = renderer.infobox_misses
+    assert misses > 0
+
+    renderer.process_frame(player)
+    renderer.render_frame()
+    assert renderer.infobox_misses == misses
+    assert renderer.infobox_hits >= misses
+    assert np.array_equal(first, renderer.get_last_frame())
+
+    # A changed value is redrawn even though the object's last_change is the same
+    obj = gamectx.object_manager.get_by_id(player.get_object_id())
+    obj.info_label = "changed"
+    renderer.process_frame(player)
+    assert renderer.infobox_misses == misses + 1
+
+
+def test_snapshot_moves_update_space():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    env.reset()
+    player = next(iter(env.agent_clients.values())).player
+    obj = gamectx.object_manager.get_by_id(player.get_object_id())
+    coord = vec_to_coord(obj.get_position())
+    target = (coord[0] + 30, coord[1] + 20)
+
+    odata = obj.get_snapshot()
+    obj.position = coord_to_vec(target)
+    odata['data']['position'] = obj.get_snapshot()['data']['position']
+    obj.position = coord_to_vec(coord)
+    gamectx.load_object_snapshot([odata])
+
+    assert obj in gamectx.get_objects_in_window(target[0] - 1, target[1] - 1, target[0] + 1, target[1] + 1)
+    assert obj not in gamectx.get_objects_in_window(coord[0] - 1, coord[1] - 1, coord[0] + 1, coord[1] + 1)
+
+
+def test_text_surfaces_cached():
+    env = LandiaEnv(agent_map={"0": {}}, include_state_observation=True)
+    config = RendererConfig()
+    config.render_to_screen = False
+    config.sound_enabled = False
+    config.max_text_surfaces = 2
+    renderer = Renderer(config, asset_bundle=env.content.get_asset_bundle())
+    renderer.initialize()
+
+    renderer.render_text(["a", "b"], 0, 0)
+    renderer.render_text(["a", "b"], 0, 0)
+    assert renderer.text_misses == 2 and renderer.text_hits == 2
+    assert renderer.get_text_surface("a", 14, (255, 255, 255)) is not renderer.get_text_surface("a", 14, (255, 0, 0))
+    assert len(renderer.text_cache) == 2
+    assert ("consolas", 14) in renderer.font and (None, 14) in renderer.font
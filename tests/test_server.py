@@ -0,0 +1,126 @@
+import threading
+import time
+
+import lz4.frame
+
+from landia import gamectx
+from landia.client import ClientConnector, decode_response, send_request
+from landia.codec import get_codec
+from landia.config import ClientConfig, ServerConfig
+from landia.env import LandiaEnv
+from landia.server import GameServer
+from landia.transport import Connection
+
+
+def make_request(client_id, snapshots_received=[]):
+    return {
+        'info': {
+            'client_id': client_id,
+            'meta': {},
+            'snapshots_received': snapshots_received,
+            'player_type': "default",
+            'is_human': False,
+            'name': client_id,
+            'message': "UPDATE"},
+        'items': []}
+
+
+def test_requests_answered_by_game_loop():
+    env = LandiaEnv(agent_map={"0": {}})
+    env.reset()
+    server = GameServer(conn=("127.0.0.1", 0), config=ServerConfig()).start()
+    gamectx.set_server(server)
+    responses = []
+
+    def send_requests():
+        received = []
+        for _ in range(5):
+            response, _, _ = send_request(make_request("server_test", received), server_address=server.server_address)
+            received = [response['info']['snapshot_timestamp']]
+            responses.append(response)
+
+    client_thread = threading.Thread(target=send_requests, daemon=True)
+    client_thread.start()
+    try:
+        end_time = time.time() + 10
+        while client_thread.is_alive() and time.time() < end_time:
+            gamectx.run_step()
+    finally:
+        gamectx.set_server(None)
+        server.close()
+        env.close()
+
+    assert len(responses) == 5
+    assert server.requests_received == 5
+    player_id = responses[0]['info']['player_id']
+    assert str(player_id) in responses[0]['snapshot']['pm']
+    assert len(responses[0]['snapshot']['om']) > 0
+
+
+def test_interest_group_snapshot_encoded_once():
+    codec = get_codec("json")
+    env = LandiaEnv(agent_map={"0": {}})
+    env.reset()
+    config = ServerConfig()
+    config.delta_snapshots = False
+    # One interest group for all clients
+    config.interest_distance_scale = None
+    server = GameServer(conn=("127.0.0.1", 0), config=config).start()
+    gamectx.set_server(server)
+    connections = [Connection(server.server_address) for _ in range(2)]
+    try:
+        for i, connection in enumerate(connections):
+            connection.send(lz4.frame.compress(codec.encode(make_request(f"group_test_{i}"))))
+        end_time = time.time() + 5
+        while len(server.requests) < 2 and time.time() < end_time:
+            time.sleep(0.01)
+        gamectx.run_step()
+        responses = [decode_response(connection.receive(), codec) for connection in connections]
+    finally:
+        for connection in connections:
+            connection.close()
+        gamectx.set_server(None)
+        server.close()
+        env.close()
+
+    assert server.replies_sent == 2
+    assert server.shared_encodes == 1
+    obj_ids = set(gamectx.object_manager.get_objects().keys())
+    for response in responses:
+        assert {odata['data']['id'] for odata in response['snapshot']['om']} == obj_ids
+        assert str(response['info']['player_id']) in response['snapshot']['pm']
+
+
+def test_streaming_client_receives_broadcast():
+    env = LandiaEnv(agent_map={"0": {}})
+    env.reset()
+    config = ServerConfig()
+    config.snapshot_rate = 50
+    server = GameServer(conn=("127.0.0.1", 0), config=config).start()
+    gamectx.set_server(server)
+    client_config = ClientConfig()
+    client_config.client_id = "stream_test"
+    client_config.is_human = False
+    client_config.server_hostname, client_config.server_port = server.server_address
+    connector = ClientConnector(client_config)
+    connector_thread = threading.Thread(target=connector.start_connection, daemon=True)
+    connector_thread.start()
+    try:
+        end_time = time.time() + 10
+        while connector.request_counter < 10 and time.time() < end_time:
+            gamectx.run_step()
+            time.sleep(0.005)
+    finally:
+        connector.running = False
+        connector_thread.join(timeout=5)
+        gamectx.set_server(None)
+        server.close()
+        env.close()
+
+    assert connector.request_counter >= 10
+    assert server.replies_sent >= 10
+    assert "stream_test" in server.subscribers
+    # Snapshots were confirmed, so later ones are deltas against a baseline
+    assert len(gamectx.remote_clients["stream_test"].acked_objects) > 0
+    response = connector.incomming_buffer.get()
+    assert len(response['snapshot']['om']) > 0
@@ -0,0 +1,13 @@
+from landia.survival.survival_map import TileVariants, get_tile_image_id, rand_int_from_coord
+
+
+def test_tile_variants_match_sha1():
+    for seed in [123, 7, 100003]:
+        variants = TileVariants(seed, chunk_size=8)
+        variants.precompute([-3, 20], [-1, 15])
+        # Inside the precomputed grid, on its edges and in chunks around and far away from it
+        coords = [(x, y) for x in range(-12, 30) for y in range(-10, 25)]
+        coords += [(-5000, 123456), (12783723, -1), (10 ** 9, 10 ** 9)]
+        for x, y in coords:
+            assert variants.get(x, y) == rand_int_from_coord(x, y, seed)
+            assert f"grass{variants.get(x, y) % 3 + 1}" == get_tile_image_id(x, y, seed)
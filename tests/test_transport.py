@@ -0,0 +1,72 @@
+import random
+import threading
+
+from landia.transport import Connection, Reassembler, SentMessages, split_message
+
+
+def test_reassembly_out_of_order_with_duplicates():
+    data = random.Random(1).randbytes(10000)
+    chunks = split_message(7, data, chunk_size=1024)
+    assert len(chunks) == 10
+    shuffled = chunks + chunks[:3]
+    random.Random(2).shuffle(shuffled)
+    reassembler = Reassembler()
+    messages = [m for m in (reassembler.add(c, "peer") for c in shuffled) if m is not None]
+    assert messages == [data]
+    assert len(reassembler.pending) == 0
+
+    # Single chunk messages, including empty ones
+    assert reassembler.add(split_message(8, b"", 1024)[0]) == b""
+    assert reassembler.add(split_message(9, b"abc", 1024)[0]) == b"abc"
+
+
+def test_retransmits_only_to_destinations():
+    sent = SentMessages(size=2)
+    chunks = split_message(1, bytes(3000), chunk_size=1024)
+    sent.add(1, chunks, {("127.0.0.1", 5000)})
+    assert sent.get_chunks(1, [0, 2], ("127.0.0.1", 5000)) == [chunks[0], chunks[2]]
+    assert sent.get_chunks(1, [0, 2], ("127.0.0.1", 5001)) == []
+    # Without destinations, as for a Connection, anyone asking gets the chunks
+    sent.add(2, chunks)
+    assert sent.get_chunks(2, [1]) == [chunks[1]]
+    sent.add(3, chunks)
+    assert sent.get_chunks(1, [0], ("127.0.0.1", 5000)) == []
+
+
+def test_lost_chunks_are_retransmitted():
+    receiver = Connection(None, local_address=("127.0.0.1", 0), nack_delay=0.01)
+    sender = Connection(receiver.get_address(), local_address=("127.0.0.1", 0), chunk_size=1024)
+    receiver.remote_address = sender.get_address()
+    data = random.Random(1).randbytes(5000)
+    dropped = []
+
+    def sendto(datagram, send=sender.sendto):
+        # Drop the first transmission of two chunks
+        if len(dropped) < 2 and datagram[5] in (1, 4):
+            dropped.append(datagram)
+            return
+        send(datagram)
+
+    sender.sendto = sendto
+    running = True
+
+    def serve_nacks():
+        while running:
+            try:
+                sender.receive(timeout=0.05)
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=serve_nacks, daemon=True)
+    thread.start()
+    try:
+        sender.send(data)
+        assert receiver.receive(timeout=5) == data
+    finally:
+        running = False
+        thread.join()
+        sender.close()
+        receiver.close()
+    assert len(dropped) == 2
+    assert receiver.nacks_sent >= 1
+    assert sender.retransmits == 2